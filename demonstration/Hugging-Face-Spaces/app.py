@@ -1,23 +1,105 @@
 # app.py - HuggingFace Spaces 用 Gradio UI（日本語/英語対応）
 
+import asyncio
 import json
+import os
+import urllib.error
+import urllib.request
 from pathlib import Path
 
 import gradio as gr
 
-from py.mini_os_demo import MiniMeaningOS, answer_ja_question, answer_en_question
+from py.mini_os_demo import (
+    ERA_YEAR_RANGES,
+    SNAPSHOT_PATH,
+    MiniMeaningOS,
+    snapshot_is_fresh,
+)
+from py.mini_os_service import MiniOSService, ServiceError, create_app
 
 
 BASE_DIR = Path(__file__).parent
 
-# OS 本体を 1 回ロードして使い回す
-os_instance = MiniMeaningOS()
+# UI は質問サービス（py/mini_os_service.py）の薄いクライアント。
+# MINI_OS_SERVICE_URL があればそのサービスへ HTTP で問い合わせ、
+# 無ければこのプロセス内でサービスを立て、同じアプリの /mini-os にも公開する。
+SERVICE_URL = os.environ.get("MINI_OS_SERVICE_URL", "").rstrip("/")
+SERVICE_TIMEOUT = float(os.environ.get("MINI_OS_SERVICE_TIMEOUT", "10"))
+
+service = None
+if not SERVICE_URL:
+    # OS 本体を 1 回ロードして使い回す
+    # CSV と一致するスナップショットがあればそこから起動する（CSV の再 parse を省略）
+    if snapshot_is_fresh(SNAPSHOT_PATH):
+        os_instance = MiniMeaningOS.from_snapshot(SNAPSHOT_PATH)
+    else:
+        os_instance = MiniMeaningOS()
+    service = MiniOSService(os_instance)
+
+
+def _post_json(url: str, payload: dict) -> dict:
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=SERVICE_TIMEOUT) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+        except ValueError:
+            message = e.reason
+        raise ServiceError(e.code, message)
+    except OSError as e:
+        raise ServiceError(503, str(e))
+
+
+async def ask_service(text: str, lang: str, context: dict = None) -> dict:
+    """質問サービスの /ask を呼ぶ（同一プロセスなら直接、そうでなければ HTTP）。"""
+    if service is not None:
+        return await service.ask(text, lang, context)
+    payload = {"question": text, "lang": lang, "context": context}
+    return await asyncio.to_thread(_post_json, f"{SERVICE_URL}/ask", payload)
+
+
+def era_choices() -> list:
+    """時代ドロップダウンの選択肢（先頭は「指定なし」）。Public UI も /eras API で同じものを取る。"""
+    return [""] + list(ERA_YEAR_RANGES)
+
+
+def make_context(domain: str, region: str, era: str, year, min_trust=None, include_evidence: bool = True) -> dict:
+    """
+    UI の入力から問い合わせの文脈を作る。
+    domain を空にすると分野で絞らない。region はカンマ区切りで複数指定できる。
+    min_trust を入れると evidence の trust で絞り、trust の高い順に並べる。
+    """
+    regions = [r.strip() for r in (region or "").split(",") if r.strip()]
+    return {
+        "domain": (domain or "").strip() or None,
+        "region": regions or None,
+        "era": era or None,
+        "year": int(year) if year not in (None, "") else None,
+        "min_trust": float(min_trust) if min_trust not in (None, "") else None,
+        "include_evidence": bool(include_evidence),
+    }
 
 
-def query_fn(text: str, lang: str):
+async def query_fn(
+    text: str,
+    lang: str,
+    domain: str = "cooking",
+    region: str = "",
+    era: str = "",
+    year=None,
+    min_trust=None,
+    include_evidence: bool = True,
+):
     """
     Gradio から呼ばれる 1 回分のクエリ処理。
     lang が "ja" なら日本語質問として、"en" なら英語質問として処理する。
+    domain 以降は問い合わせの文脈（make_context 参照）。
     戻り値:
       - answer_text: 人間向けの短い答え
       - pretty_json: OS から返ってきた JSON の整形文字列
@@ -26,11 +108,11 @@ def query_fn(text: str, lang: str):
     if not text:
         return "質問 / Question を入力してください。", "{}"
 
-    # 言語ごとに質問ハンドラを切り替え
-    if lang == "ja":
-        ans = answer_ja_question(os_instance, text)
-    else:
-        ans = answer_en_question(os_instance, text)
+    try:
+        context = make_context(domain, region, era, year, min_trust, include_evidence)
+        ans = await ask_service(text, lang, context)
+    except ServiceError as e:
+        return f"サービスエラー / service error ({e.status}): {e.message}", "{}"
 
     p_id = ans.get("pattern_id")
     results = ans.get("results", [])
@@ -143,6 +225,36 @@ with gr.Blocks() as demo:
             label="Language / 言語",
         )
 
+    with gr.Accordion("文脈 / Context", open=False):
+        with gr.Row():
+            domain_input = gr.Textbox(
+                label="分野 / Domain（空なら絞らない）",
+                value="cooking",
+            )
+            region_input = gr.Textbox(
+                label="地域 / Region",
+                placeholder="例: JP, JP-Kyoto（カンマ区切り）",
+            )
+            era_input = gr.Dropdown(
+                era_choices(),
+                value="",
+                label="時代 / Era",
+            )
+            year_input = gr.Number(
+                label="年 / Year",
+                value=None,
+                precision=0,
+            )
+        with gr.Row():
+            min_trust_input = gr.Number(
+                label="最低 trust / Min trust（-1〜1、空なら絞らない）",
+                value=None,
+            )
+            evidence_input = gr.Checkbox(
+                label="evidence を全件表示 / Show all evidence",
+                value=True,
+            )
+
     btn = gr.Button("実行 / Run")
 
     out_answer = gr.Textbox(
@@ -157,9 +269,38 @@ with gr.Blocks() as demo:
 
     btn.click(
         fn=query_fn,
-        inputs=[inp, lang_select],
+        inputs=[
+            inp,
+            lang_select,
+            domain_input,
+            region_input,
+            era_input,
+            year_input,
+            min_trust_input,
+            evidence_input,
+        ],
         outputs=[out_answer, out_json],
+        # Public UI（Public-UI-Space）の BackendClient はこの名前（QUERY_API）で呼ぶ
+        api_name="query",
     )
 
+    # Public UI（Public-UI-Space）が時代の選択肢を取りに来る API
+    gr.Button(visible=False).click(fn=era_choices, outputs=gr.JSON(visible=False), api_name="eras")
+
 if __name__ == "__main__":
-    demo.launch()
+    if service is None:
+        demo.launch()
+    else:
+        # Gradio UI（/）と質問サービス（/mini-os）を 1 つのサーバで公開する
+        import uvicorn
+        from fastapi import FastAPI
+
+        # mount した子アプリの lifespan は呼ばれないので、stats の定期 flush などは親の lifespan で動かす
+        server = FastAPI(lifespan=service.lifespan)
+        server.mount("/mini-os", create_app(service))
+        server = gr.mount_gradio_app(server, demo, path="/")
+        uvicorn.run(
+            server,
+            host=os.environ.get("GRADIO_SERVER_NAME", "0.0.0.0"),
+            port=int(os.environ.get("GRADIO_SERVER_PORT", "7860")),
+        )
@@ -0,0 +1,479 @@
+# bench_mini_os.py - MiniMeaningOS の簡易ベンチマーク
+#
+# 使い方（Hugging-Face-Spaces/ 直下で）:
+#   python py/bench_mini_os.py --triples 200000
+#
+# 合成データ（CSV）を一時ディレクトリに書き出し、MiniMeaningOS(data_dir=...) で
+# ロードしてから各クエリ経路の時間を計測する。
+
+import argparse
+import csv
+import json
+import random
+import gc
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from mini_os_demo import (
+    CategoryClosure,
+    MiniMeaningOS,
+    Triple,
+    answer_batch,
+    answer_ja_question,
+    condition_cache_stats,
+)
+
+
+RELATIONS = [
+    ("core:use-purpose-001", "core:use-purpose-for-001"),
+    ("core:material-001", "core:material-for-001"),
+    ("core:category-001", "core:category-of-001"),
+    ("core:domain-001", "core:domain-of-001"),
+]
+
+CONDITION_VARIANTS = [
+    {"domain": ["cooking"], "region": ["JP"], "freq": 1.0},
+    {"domain": ["cooking"], "region": ["JP", "US", "UK"], "freq": 0.7},
+    {"domain": ["cooking"], "region": ["JP"], "era": ["Showa", "Heisei"], "freq": 0.8},
+    {"domain": ["medicine"], "region": ["US"], "freq": 0.5},
+    {"domain": ["cooking"], "region": ["JP-Kyoto"], "era": ["Edo"], "freq": 0.3},
+    {},
+]
+
+
+# ========== 合成データ生成 ==========
+
+def write_synthetic_data(data_dir: Path, n_triples: int, seed: int = 0) -> None:
+    """
+    n_triples 件の順方向 triple（＋同数の逆向き triple）と、
+    core ごとの日英ラベルを持つ合成データを data_dir に書き出す。
+    """
+    rng = random.Random(seed)
+    n_cores = max(10, n_triples // 10)
+    cores = [f"core:syn-{i:07d}" for i in range(n_cores)]
+
+    with (data_dir / "core_concepts.csv").open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["core_id", "can_be_relation", "status_view", "core_conditions_json", "note"])
+        for c in cores:
+            w.writerow([c, 0, "active", "{}", ""])
+        for fwd, rev in RELATIONS:
+            w.writerow([fwd, 1, "active", "{}", ""])
+            w.writerow([rev, 1, "active", "{}", ""])
+
+    header = [
+        "triple_id", "src_core_id", "rel_core_id", "dst_core_id", "conditions_json",
+        "polarity", "status", "is_reverse", "reverse_of", "created_at", "note",
+    ]
+    with (data_dir / "meaning_triples_with_reverse.csv").open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        for i in range(n_triples):
+            src = rng.choice(cores)
+            dst = rng.choice(cores)
+            fwd, rev = rng.choice(RELATIONS)
+            cond = json.dumps(rng.choice(CONDITION_VARIANTS), ensure_ascii=False)
+            polarity = "negative" if rng.random() < 0.05 else "positive"
+            w.writerow([f"t{i:08d}", src, fwd, dst, cond, polarity, "active", 0, "", "", ""])
+            w.writerow([f"r{i:08d}", dst, rev, src, cond, polarity, "active", 1, f"t{i:08d}", "", ""])
+
+    with (data_dir / "expr_links.csv").open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow([
+            "expr_id", "expr_label", "core_id", "conditions_json", "source_kind",
+            "source_detail", "status", "created_at", "updated_at", "note",
+        ])
+        n = 0
+        for i, c in enumerate(cores):
+            for lang, label in (("ja", f"合成{i}"), ("en", f"synthetic {i}")):
+                n += 1
+                cond = json.dumps({"lang": lang, "freq": round(rng.random(), 2)})
+                w.writerow([f"e{n:08d}", label, c, cond, "corpus", "synthetic", "active", "", "", ""])
+
+    with (data_dir / "triple_evidence.csv").open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow([
+            "evidence_id", "triple_id", "evidence_type", "source_kind", "stance",
+            "weight", "source_detail", "note", "created_at",
+        ])
+        for i in range(0, n_triples, 3):
+            stance = "negative" if rng.random() < 0.2 else "positive"
+            w.writerow([f"ev{i:08d}", f"t{i:08d}", "corpus", "corpus", stance,
+                        round(rng.random(), 2), "synthetic", "", ""])
+
+
+def timed(fn, repeat: int) -> float:
+    """fn を repeat 回呼び、1 回あたりの平均秒数を返す。"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def report(name: str, sec: float) -> None:
+    print(f"  {name:<48} {sec * 1e6:12.1f} us/op")
+
+
+# ========== 各ベンチマーク ==========
+
+def bench_find_triples(os: MiniMeaningOS, repeat: int) -> None:
+    """find_triples のインデックス経路と全件走査を比較する。"""
+    print("[find_triples] indexed vs scan")
+    rng = random.Random(1)
+    sample = [os.triples[rng.randrange(len(os.triples))] for _ in range(repeat)]
+
+    queries = {
+        "src+rel+domain": lambda t: dict(src=t.src, rel=t.rel, domain="cooking"),
+        "rel+dst+domain": lambda t: dict(rel=t.rel, dst=t.dst, domain="cooking"),
+        "src": lambda t: dict(src=t.src),
+    }
+    for name, make in queries.items():
+        kwargs_list = [make(t) for t in sample]
+
+        def run_indexed():
+            for kw in kwargs_list:
+                os.find_triples(**kw)
+
+        def run_scan():
+            for kw in kwargs_list:
+                wanted = {"domain": [kw["domain"]]} if kw.get("domain") else {}
+                os._scan_triples(kw.get("src"), kw.get("rel"), kw.get("dst"), wanted, "positive")
+
+        # 結果が一致することを確認してから計測する
+        for kw in kwargs_list[:20]:
+            wanted = {"domain": [kw["domain"]]} if kw.get("domain") else {}
+            assert os.find_triples(**kw) == os._scan_triples(
+                kw.get("src"), kw.get("rel"), kw.get("dst"), wanted, "positive"
+            )
+
+        indexed = timed(run_indexed, 1) / len(kwargs_list)
+        scan = timed(run_scan, 1) / len(kwargs_list)
+        report(f"{name} (indexed)", indexed)
+        report(f"{name} (scan)", scan)
+        print(f"  {'speedup':<48} {scan / indexed:12.1f} x")
+
+
+def bench_conditions(os: MiniMeaningOS, repeat: int) -> None:
+    """条件だけの検索：転置インデックス + コンパイル済み述語 vs cond_match による全件走査。"""
+    print("[conditions] posting lists vs scan")
+    wanted_list = [
+        {"domain": ["medicine"]},
+        {"domain": ["cooking"], "region": ["JP-Kyoto"]},
+        {"region": ["US"], "era": ["Heisei"]},
+        {"region": ["JP"]},
+        {"year_range": [1700, 1750]},
+    ]
+    n = max(1, repeat // 20)
+    for wanted in wanted_list:
+        rows = os._query_rows(None, None, None, wanted, "positive")
+        assert [os.triples[r] for r in rows] == os._scan_triples(None, None, None, wanted, "positive")
+        indexed = timed(lambda: os._query_rows(None, None, None, wanted, "positive"), n)
+        scan = timed(lambda: os._scan_triples(None, None, None, wanted, "positive"), n)
+        name = ",".join(f"{k}={v[0]}" for k, v in wanted.items())
+        report(f"{name} (indexed, {len(rows)} rows)", indexed)
+        report(f"{name} (scan)", scan)
+
+
+def bench_render_profile(os: MiniMeaningOS, repeat: int) -> None:
+    """render_profile の 1 件ずつ呼び出しと render_profiles のバッチ呼び出しを比較する。"""
+    print("[render_profile] single vs batch")
+    rng = random.Random(2)
+    labels = [e.expr_label for e in os.exprs if e.conditions.get("lang") == "ja"]
+    sample = [rng.choice(labels) for _ in range(repeat)]
+
+    single = timed(lambda: [os.render_profile(x, lang="ja") for x in sample], 1) / len(sample)
+    batch = timed(lambda: os.render_profiles(sample, lang="ja"), 1) / len(sample)
+    report("render_profile (per call)", single)
+    report("render_profiles (batch, per label)", batch)
+
+
+def bench_labels_for_core(os: MiniMeaningOS, repeat: int) -> None:
+    """事前計算済みラベル表からの labels_for_core を計測する。"""
+    print("[labels_for_core] ranked table lookup")
+    rng = random.Random(3)
+    cores = list(os.labels_by_core)
+    sample = [rng.choice(cores) for _ in range(repeat)]
+    sec = timed(lambda: [os.labels_for_core(c, lang="en") for c in sample], 1) / len(sample)
+    report("labels_for_core(lang=en)", sec)
+
+
+def bench_expr_lookup(os: MiniMeaningOS, repeat: int) -> None:
+    """find_cores_by_expr：完全一致 / 表記ゆれ（正規化キー）/ 誤記（削除辞書）の各経路。"""
+    print("[expr_lookup] exact vs normalized vs fuzzy")
+    rng = random.Random(5)
+    labels = [label for label in os.expr_index if label.startswith("synthetic")]
+    sample = [rng.choice(labels) for _ in range(repeat)]
+
+    def typo(label: str) -> str:
+        i = rng.randrange(1, len(label) - 1)
+        return label[:i] + label[i + 1:]
+
+    variants = {
+        "exact": sample,
+        "normalized (Title-Case, hyphen)": [x.title().replace(" ", "-") for x in sample],
+        "fuzzy (1 deletion)": [typo(x) for x in sample],
+    }
+    for name, queries in variants.items():
+        hits = sum(1 for q in queries if os.find_cores_by_expr(q, lang="en"))
+        sec = timed(lambda: [os.find_cores_by_expr(q, lang="en") for q in queries], 1) / len(queries)
+        report(f"{name} ({hits}/{len(queries)} resolved)", sec)
+
+
+def bench_traversal(os: MiniMeaningOS, repeat: int) -> None:
+    """多段ホップ：k_hop / 双方向 BFS の shortest_path / キャッシュありの reachable。"""
+    print("[traversal] k-hop, shortest path, cached reachability")
+    rng = random.Random(6)
+    cores = [t.src for t in os.triples[:: max(1, len(os.triples) // 1000)]]
+    n = max(1, repeat // 10)
+    pairs = [(rng.choice(cores), rng.choice(cores)) for _ in range(n)]
+
+    report("k_hop(k=2)", timed(lambda: [os.k_hop(a, 2) for a, _ in pairs], 1) / n)
+    found = sum(1 for a, b in pairs if os.shortest_path(a, b, max_depth=6) is not None)
+    sec = timed(lambda: [os.shortest_path(a, b, max_depth=6) for a, b in pairs], 1) / n
+    report(f"shortest_path ({found}/{n} connected)", sec)
+
+    rel = "core:category-001"
+    os.reach_cache.invalidate()
+    cold = timed(lambda: [os.reachable(a, rel) for a, _ in pairs], 1) / n
+    warm = timed(lambda: [os.reachable(a, rel) for a, _ in pairs], 1) / n
+    report("reachable(category-001) cold", cold)
+    report("reachable(category-001) cached", warm)
+
+    build = timed(lambda: CategoryClosure.build(os._category_edges()), 1)
+    report("category closure build", build)
+    report("is_kind_of (closure)", timed(lambda: [os.is_kind_of(a, b) for a, b in pairs], 1) / n)
+
+
+def bench_evidence(os: MiniMeaningOS, repeat: int) -> None:
+    """trust による絞り込み：集約済み EvidenceSummary vs evidence 全件からの集計。"""
+    print("[evidence] trust filter: summaries vs raw evidence")
+    rng = random.Random(7)
+    cores = [t.src for t in os.triples[:: max(1, len(os.triples) // 1000)]]
+    sample = [rng.choice(cores) for _ in range(max(1, repeat // 10))]
+
+    def raw_trust(triple_id):
+        evs = os.get_evidence_for_triple(triple_id)
+        support = sum(e["weight"] for e in evs if e["stance"] == "positive")
+        oppose = sum(e["weight"] for e in evs if e["stance"] == "negative")
+        return (support - oppose) / (support + oppose + 1.0)
+
+    def by_raw():
+        for c in sample:
+            found = [t for t in os.find_triples(src=c) if raw_trust(t.triple_id) >= 0.2]
+            found.sort(key=lambda t: -raw_trust(t.triple_id))
+
+    def by_summary():
+        for c in sample:
+            os.find_triples(src=c, min_trust=0.2)
+
+    report("find_triples + trust from raw evidence", timed(by_raw, 1) / len(sample))
+    report("find_triples(min_trust=0.2)", timed(by_summary, 1) / len(sample))
+
+
+def bench_triple_stats(os: MiniMeaningOS, repeat: int) -> None:
+    """使用回数の記録が find_triples に足すコスト（記録あり / なし）と flush のコスト。"""
+    print("[triple_stats] find_triples with / without usage recording")
+    rng = random.Random(8)
+    cores = [t.src for t in os.triples[:: max(1, len(os.triples) // 1000)]]
+    sample = [rng.choice(cores) for _ in range(repeat)]
+    store = os.triple_stats
+
+    def run():
+        for c in sample:
+            os.find_triples(src=c)
+
+    store.flush()
+    store.enabled = False
+    try:
+        off = timed(run, 1) / len(sample)
+    finally:
+        store.enabled = True
+    # record は積むだけなので、記録のコストと flush のコストを分けて測れる
+    on = timed(run, 1) / len(sample)
+    pending = store.summary()["pending"]
+    flush = timed(store.flush, 1)
+    report("find_triples (recording off)", off)
+    report("find_triples (recording on, buffered)", on)
+    report(f"flush ({pending} records, per record)", flush / max(1, pending))
+
+
+def bench_answer_batch(os: MiniMeaningOS, repeat: int) -> None:
+    """answer_ja_question を 1 件ずつ呼ぶ場合と answer_batch の比較（応答キャッシュは無効化）。"""
+    print("[answer_batch] loop vs batch")
+    rng = random.Random(4)
+    labels = [e.expr_label for e in os.exprs if e.conditions.get("lang") == "ja"]
+    templates = ["{}の用途は？", "{}の素材は？", "{}の分類は？", "{}に使う道具は？"]
+    # 主語が偏った質問列（半分は上位 1% の主語から）
+    head = labels[: max(1, len(labels) // 100)]
+    questions = [
+        rng.choice(templates).format(rng.choice(head if rng.random() < 0.5 else labels))
+        for _ in range(repeat * 10)
+    ]
+
+    maxsize = os.query_cache.maxsize
+    os.query_cache.maxsize = 0
+    os.query_cache.invalidate()
+    try:
+        # triple_stats は呼ぶたびに増えるので比較から外す
+        def without_stats(answers):
+            return [{k: v for k, v in a.items() if k != "triple_stats"} for a in answers]
+
+        single = [answer_ja_question(os, q) for q in questions[:50]]
+        assert without_stats(answer_batch(os, questions[:50], "ja")) == without_stats(single)
+        loop = timed(lambda: [answer_ja_question(os, q) for q in questions], 1) / len(questions)
+        batch = timed(lambda: answer_batch(os, questions, "ja"), 1) / len(questions)
+    finally:
+        os.query_cache.maxsize = maxsize
+    report("answer_ja_question (loop, per question)", loop)
+    report("answer_batch (per question)", batch)
+    print(f"  {'speedup':<48} {loop / batch:12.1f} x")
+
+
+def bench_memory(data_dir: Path, repeat: int) -> None:
+    """通常モードと compact モードのメモリ使用量（triple 1 件あたり）を比較する。"""
+    print("[memory] bytes per triple (tracemalloc, OS 全体)")
+    for compact in (False, True):
+        gc.collect()
+        tracemalloc.start()
+        os = MiniMeaningOS(data_dir=data_dir, compact=compact)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        n = len(os.triples)
+        name = "compact" if compact else "default"
+        print(f"  {name:<48} {current / n:12.1f} B/triple (peak {peak / n:.1f})")
+        del os
+
+
+def bench_columnar(data_dir: Path, repeat: int) -> None:
+    """分析系クエリ：python バックエンド（転置インデックス）vs columnar（NumPy マスク）。"""
+    print("[columnar] python vs columnar backend")
+    backends = {name: MiniMeaningOS(data_dir=data_dir, backend=name) for name in ("python", "columnar")}
+    queries = [
+        dict(rel="core:material-001", conditions={"region": "JP", "era": "Heisei"}),
+        dict(conditions={"domain": "cooking", "region": ["JP-Kyoto", "US"]}),
+        dict(rel="core:category-001", domain="cooking"),
+    ]
+    n = max(1, repeat // 20)
+    for kw in queries:
+        expected = backends["python"].find_triples(**kw)
+        assert backends["columnar"].find_triples(**kw) == expected
+        label = ",".join(f"{k}={v}" for k, v in kw.items())[:40]
+        for name, os in backends.items():
+            report(f"{label} ({name}, {len(expected)} rows)", timed(lambda: os.find_triples(**kw), n))
+
+
+def bench_append(data_dir: Path, repeat: int) -> None:
+    """add_triples の一括追加スループット（逆方向の生成・全インデックス更新・追記ログ込み）。"""
+    print("[append] add_triples throughput (forward triples/s, reverse generated)")
+    rng = random.Random(9)
+    serial = iter(range(1 << 62))
+
+    def new_triples(os, n):
+        cores = [t.src for t in os.triples[:: max(1, len(os.triples) // 1000)]]
+        return [
+            Triple(
+                triple_id=f"tx{next(serial):08d}",
+                src=rng.choice(cores),
+                rel=rng.choice(RELATIONS)[0],
+                dst=rng.choice(cores),
+                conditions=dict(rng.choice(CONDITION_VARIANTS)),
+                polarity="positive",
+                status="active",
+                is_reverse=False,
+                reverse_of=None,
+                created_at="",
+                note="",
+            )
+            for _ in range(n)
+        ]
+
+    n = max(1000, repeat * 50)
+    cases = [
+        ("batch=1, log+fsync", 1, True, True, max(100, repeat)),
+        ("batch=1000, log+fsync", 1000, True, True, n),
+        ("batch=1000, log (no fsync)", 1000, True, False, n),
+        ("batch=1000, no log", 1000, False, False, n),
+    ]
+    for compact in (False, True):
+        os = MiniMeaningOS(data_dir=data_dir, compact=compact)
+        with tempfile.TemporaryDirectory() as log_dir:
+            # 合成データのディレクトリにはログを残さない（他のベンチマークのロードで再生されるため）
+            os.triple_log_path = str(Path(log_dir) / "bench.log.jsonl")
+            for label, batch, log, fsync, total in cases:
+                triples = new_triples(os, total)
+                batches = [triples[i:i + batch] for i in range(0, total, batch)]
+                start = time.perf_counter()
+                for b in batches:
+                    os.add_triples(b, log=log, fsync=fsync)
+                elapsed = time.perf_counter() - start
+                name = f"{label} ({'compact' if compact else 'default'})"
+                print(f"  {name:<48} {total / elapsed:12.0f} triples/s")
+        del os
+
+
+BENCHMARKS = {
+    "find_triples": bench_find_triples,
+    "conditions": bench_conditions,
+    "render_profile": bench_render_profile,
+    "labels_for_core": bench_labels_for_core,
+    "answer_batch": bench_answer_batch,
+    "expr_lookup": bench_expr_lookup,
+    "traversal": bench_traversal,
+    "evidence": bench_evidence,
+    "triple_stats": bench_triple_stats,
+}
+
+# OS ではなくデータディレクトリを受け取るベンチマーク（ロード自体を計測するもの）
+DATA_BENCHMARKS = {
+    "memory": bench_memory,
+    "columnar": bench_columnar,
+    "append": bench_append,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MiniMeaningOS benchmark")
+    parser.add_argument("--triples", type=int, default=100000, help="合成する順方向 triple の数")
+    parser.add_argument("--repeat", type=int, default=200, help="1 ベンチマークあたりのクエリ数")
+    parser.add_argument(
+        "--only",
+        choices=sorted(BENCHMARKS) + sorted(DATA_BENCHMARKS),
+        action="append",
+        help="実行するベンチマーク",
+    )
+    parser.add_argument("--compact", action="store_true", help="compact モードの OS でクエリを計測する")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        write_synthetic_data(data_dir, args.triples)
+
+        selected = args.only or list(BENCHMARKS) + list(DATA_BENCHMARKS)
+        for name in selected:
+            if name in DATA_BENCHMARKS:
+                DATA_BENCHMARKS[name](data_dir, args.repeat)
+
+        query_benches = [name for name in selected if name in BENCHMARKS]
+        if not query_benches:
+            return
+
+        start = time.perf_counter()
+        os = MiniMeaningOS(data_dir=data_dir, compact=args.compact)
+        print(f"[load] {len(os.triples)} triples in {time.perf_counter() - start:.2f} s")
+        # ロード済みの OS を GC の対象から外す（世代 GC の全走査が計測区間に入ると数百 ms ぶれる）
+        gc.collect()
+        gc.freeze()
+        stats = condition_cache_stats()
+        print(
+            f"[load] conditions_json cache: hit rate {stats['hit_rate']:.1%}, "
+            f"{stats['unique_conditions']} unique conditions"
+        )
+
+        for name in query_benches:
+            BENCHMARKS[name](os, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# load_test_service.py - mini_os_service のローカル負荷試験
+#
+# 使い方（Hugging-Face-Spaces/ 直下で、別ターミナルでサービスを起動しておく）:
+#   python py/mini_os_service.py --port 8000
+#   python py/load_test_service.py --url http://127.0.0.1:8000 --concurrency 16 --requests 5000
+#
+# 実トラフィックに近い偏った質問ミックス（「包丁の用途は何？」が多い）を
+# keep-alive の HTTP 接続で並列に投げ、スループットとレイテンシ分位点を出す。
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# (質問, lang, 重み)
+QUESTION_MIX = [
+    ("包丁の用途は何？", "ja", 40),
+    ("包丁の素材は？", "ja", 15),
+    ("包丁の分類は？", "ja", 10),
+    ("切るのに使う道具は？", "ja", 10),
+    ("包丁について教えて", "ja", 5),
+    ("包丁の英語は？", "ja", 5),
+    ("What is the use of a kitchen knife?", "en", 10),
+    ("Tell me about kitchen knife.", "en", 5),
+]
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+
+def worker(url: str, n: int, batch: int, seed: int, latencies: list, errors: list) -> None:
+    """1 本の keep-alive 接続で n リクエストを順に投げる。"""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    rng = random.Random(seed)
+    questions = [(q, lang) for q, lang, w in QUESTION_MIX for _ in range(w)]
+    ja_questions = [q for q, lang in questions if lang == "ja"]
+    base = parts.path.rstrip("/")
+
+    for _ in range(n):
+        if batch > 1:
+            path = base + "/ask/batch"
+            payload = {"questions": [rng.choice(ja_questions) for _ in range(batch)], "lang": "ja"}
+        else:
+            q, lang = rng.choice(questions)
+            path = base + "/ask"
+            payload = {"question": q, "lang": lang}
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+        start = time.perf_counter()
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mini_os_service load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="サービスのベース URL")
+    parser.add_argument("--concurrency", type=int, default=16, help="並列接続数")
+    parser.add_argument("--requests", type=int, default=2000, help="総リクエスト数")
+    parser.add_argument("--batch", type=int, default=1, help="2 以上なら /ask/batch に何問ずつ送るか")
+    args = parser.parse_args()
+
+    latencies: list = []
+    errors: list = []
+    per_worker = max(1, args.requests // args.concurrency)
+    threads = [
+        threading.Thread(target=worker, args=(args.url, per_worker, args.batch, i, latencies, errors))
+        for i in range(args.concurrency)
+    ]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    n = len(latencies)
+    questions = n * max(1, args.batch)
+    print(f"requests: {n} ok, {len(errors)} errors in {elapsed:.2f} s")
+    print(f"throughput: {n / elapsed:.1f} req/s ({questions / elapsed:.1f} questions/s)")
+    for p in (50, 90, 99):
+        print(f"  p{p}: {percentile(latencies, p) * 1000:.2f} ms")
+    if errors:
+        print(f"  errors: {sorted(set(map(str, errors)))}")
+
+    parts = urlsplit(args.url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+    conn.request("GET", parts.path.rstrip("/") + "/stats")
+    print("service stats:", conn.getresponse().read().decode("utf-8"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,30 @@
+import argparse
 import csv
+import gc
+import hashlib
 import json
+import math
+import mmap
+import pickle
 import re
+import struct
+import sys
+import threading
+import time
+import unicodedata
+from os import fsync as os_fsync  # 関数内では os を MiniMeaningOS の変数名に使っている
 from pathlib import Path
-from collections import defaultdict
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from array import array
+from collections import Counter, OrderedDict, defaultdict, deque
+from contextlib import contextmanager, redirect_stdout
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy は backend="columnar" のときだけ必要
+    np = None
 
 BASE_DIR = Path(__file__).parent.parent  # /app/
 DATA_DIR = BASE_DIR / "data"
@@ -14,6 +34,11 @@ EXPR_CSV = DATA_DIR / "expr_links.csv"
 TRIPLES_CSV = DATA_DIR / "meaning_triples.csv"
 TRIPLES_WITH_REV = DATA_DIR / "meaning_triples_with_reverse.csv"
 TRIPLE_EVIDENCE_CSV = DATA_DIR / "triple_evidence.csv"
+# add_triples の追記ログ（write-ahead log、1 行 = 1 回の add_triples）
+TRIPLE_LOG = DATA_DIR / "meaning_triples.log.jsonl"
+SNAPSHOT_PATH = DATA_DIR / "mini_os.snapshot"
+# triple_stats の保存先（JSON、flush 済みの集計を丸ごと書き出す）
+TRIPLE_STATS_PATH = DATA_DIR / "triple_stats.json"
 
 
 # ========== データ構造 ==========
@@ -69,6 +94,68 @@ class TripleEvidence:
     created_at: str
 
 
+# stance の表記（編集画面の「支持」「否定」も受け付ける）
+SUPPORT_STANCES = ("positive", "支持")
+OPPOSE_STANCES = ("negative", "否定")
+
+# trust = (支持の重み合計 - 反対の重み合計) / (重み合計 + EVIDENCE_PRIOR_WEIGHT)。
+# -1.0〜1.0 で、evidence が少ないうちは 0 に寄せる
+EVIDENCE_PRIOR_WEIGHT = 1.0
+
+
+@dataclass
+class EvidenceSummary:
+    """
+    1 つの triple の evidence の集約（evidence の追加に合わせて増分更新する）。
+    stance が支持・反対のどちらでもない evidence は数えない。
+    """
+    support: float = 0.0
+    oppose: float = 0.0
+    n_support: int = 0
+    n_oppose: int = 0
+    # to_dict の結果（add で捨てる）
+    _as_dict: Optional[Dict[str, Any]] = field(default=None, repr=False, compare=False)
+
+    def add(self, ev: TripleEvidence) -> None:
+        self._as_dict = None
+        if ev.stance in SUPPORT_STANCES:
+            self.support += ev.weight
+            self.n_support += 1
+        elif ev.stance in OPPOSE_STANCES:
+            self.oppose += ev.weight
+            self.n_oppose += 1
+
+    @property
+    def stance_score(self) -> Optional[float]:
+        """支持の割合（0.0〜1.0、spec §6.2）。重みのある evidence が無ければ None。"""
+        total = self.support + self.oppose
+        return self.support / total if total > 0 else None
+
+    @property
+    def trust(self) -> float:
+        return (self.support - self.oppose) / (self.support + self.oppose + EVIDENCE_PRIOR_WEIGHT)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        応答に載せる形。evidence が増えるまでは同じ dict を返す
+        （応答キャッシュと同じく共有されるので、呼び出し側で変更しないこと）。
+        """
+        if self._as_dict is None:
+            self._as_dict = {
+                "support": self.support,
+                "oppose": self.oppose,
+                "n_support": self.n_support,
+                "n_oppose": self.n_oppose,
+                "stance_score": None if self.stance_score is None else round(self.stance_score, 4),
+                "trust": round(self.trust, 4),
+            }
+        return self._as_dict
+
+
+# evidence の無い triple の集約（共有、変更しないこと）
+EMPTY_EVIDENCE_SUMMARY = EvidenceSummary()
+
+
 # ========== ロード関数 ==========
 
 def load_core_concepts(path: Path):
@@ -110,15 +197,52 @@ def load_core_concepts(path: Path):
     return cores
 
 
-def _fix_raw_json(cond_raw: str, where: str) -> dict:
+class FrozenConditions(dict):
     """
-    CSV 内のゆるい JSON をそれっぽく補正してから parse する。
-    - {""domain"":[""cooking""]} → {"domain":["cooking"]}
-    - ' ←コメント...' 以降をカット
+    変更できない conditions。同じ conditions_json 文字列の行はこの 1 オブジェクトを共有する。
+    中のリストはタプル、入れ子の dict は FrozenConditions にしてある（JSON 化すると元と同じ）。
     """
-    if not cond_raw:
-        return {}
 
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("conditions are shared between rows and cannot be modified")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        # dict サブクラスの既定の pickle は __setitem__ で復元するので、ここで上書きする
+        return (FrozenConditions, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+EMPTY_CONDITIONS = FrozenConditions()
+
+
+def _freeze_json(v: Any) -> Any:
+    if isinstance(v, dict):
+        return FrozenConditions((k, _freeze_json(x)) for k, x in v.items())
+    if isinstance(v, list):
+        return tuple(_freeze_json(x) for x in v)
+    return v
+
+
+# conditions_json 文字列 → 共有 FrozenConditions のキャッシュ上限
+CONDITION_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=CONDITION_CACHE_SIZE)
+def _parse_conditions(cond_raw: str):
+    """
+    _fix_raw_json の本体（生文字列ごとにメモ化）。
+    戻り値: (FrozenConditions, 警告メッセージ or None)
+    """
     cond_raw = cond_raw.split("←")[0].strip()
     cond_raw = cond_raw.strip()
 
@@ -127,115 +251,462 @@ def _fix_raw_json(cond_raw: str, where: str) -> dict:
 
     if not (cond_raw.startswith("{") and cond_raw.endswith("}")):
         if cond_raw not in ("", "{}"):
-            print(f"[WARN] {where}: not a JSON object -> {cond_raw}")
-        return {}
+            return EMPTY_CONDITIONS, f"not a JSON object -> {cond_raw}"
+        return EMPTY_CONDITIONS, None
 
     try:
-        return json.loads(cond_raw)
+        return _freeze_json(json.loads(cond_raw)), None
     except json.JSONDecodeError:
-        print(f"[WARN] {where}: json decode error -> {cond_raw}")
-        return {}
+        return EMPTY_CONDITIONS, f"json decode error -> {cond_raw}"
+
+
+def _fix_raw_json(cond_raw: str, where: str) -> dict:
+    """
+    CSV 内のゆるい JSON をそれっぽく補正してから parse する。
+    - {""domain"":[""cooking""]} → {"domain":["cooking"]}
+    - ' ←コメント...' 以降をカット
+    同じ文字列は 2 回目以降キャッシュから同じ FrozenConditions を返す。
+    """
+    if not cond_raw:
+        return EMPTY_CONDITIONS
+
+    conditions, warning = _parse_conditions(cond_raw)
+    if warning:
+        print(f"[WARN] {where}: {warning}")
+    return conditions
+
+
+def condition_cache_stats() -> Dict[str, Any]:
+    """conditions_json パースキャッシュのヒット率と、キャッシュ内のユニーク条件数。"""
+    info = _parse_conditions.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+        "unique_conditions": info.currsize,
+        "max_size": info.maxsize,
+    }
+
+
+# 1 チャンクあたりの行数（ストリーミングロード）
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def _iter_chunks(rows, chunk_size: int):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _triple_from_row(row: Dict[str, str]) -> Triple:
+    cond_raw = row.get("conditions_json", "") or ""
+    conditions = _fix_raw_json(cond_raw, f"triple {row.get('triple_id')}")
+    return Triple(
+        triple_id=row["triple_id"],
+        src=row["src_core_id"],
+        rel=row["rel_core_id"],
+        dst=row["dst_core_id"],
+        conditions=conditions,
+        polarity=row.get("polarity", "positive"),
+        status=row.get("status", "active"),
+        is_reverse=row.get("is_reverse", "0") in ("1", "true", "True"),
+        reverse_of=row.get("reverse_of") or None,
+        created_at=row.get("created_at", ""),
+        note=row.get("note", ""),
+    )
+
+
+def iter_triples(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """meaning_triples*.csv を chunk_size 行ずつの List[Triple] として順に返す。"""
+    with path.open("r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        yield from _iter_chunks((_triple_from_row(row) for row in reader), chunk_size)
 
 
 def load_triples(path: Path) -> List[Triple]:
     triples: List[Triple] = []
+    for chunk in iter_triples(path):
+        triples.extend(chunk)
+    return triples
+
+
+def _expr_link_from_row(row: Dict[str, str]) -> ExprLink:
+    cond_raw = row.get("conditions_json", "") or ""
+    conditions = _fix_raw_json(cond_raw, f"expr {row.get('expr_id')}")
+    return ExprLink(
+        expr_id=row["expr_id"],
+        expr_label=row["expr_label"],
+        core_id=row["core_id"],
+        conditions=conditions,
+        source_kind=row.get("source_kind", ""),
+        source_detail=row.get("source_detail", ""),
+        status=row.get("status", "active"),
+        created_at=row.get("created_at", ""),
+        updated_at=row.get("updated_at", ""),
+        note=row.get("note", ""),
+    )
+
+
+def iter_expr_links(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """expr_links.csv を chunk_size 行ずつの List[ExprLink] として順に返す。"""
     with path.open("r", encoding="utf-8", newline="") as f:
         reader = csv.DictReader(f)
-        for row in reader:
-            cond_raw = row.get("conditions_json", "") or ""
-            conditions = _fix_raw_json(cond_raw, f"triple {row.get('triple_id')}")
-            triples.append(
-                Triple(
-                    triple_id=row["triple_id"],
-                    src=row["src_core_id"],
-                    rel=row["rel_core_id"],
-                    dst=row["dst_core_id"],
-                    conditions=conditions,
-                    polarity=row.get("polarity", "positive"),
-                    status=row.get("status", "active"),
-                    is_reverse=row.get("is_reverse", "0") in ("1", "true", "True"),
-                    reverse_of=row.get("reverse_of") or None,
-                    created_at=row.get("created_at", ""),
-                    note=row.get("note", ""),
-                )
-            )
-    return triples
+        yield from _iter_chunks((_expr_link_from_row(row) for row in reader), chunk_size)
 
 
 def load_expr_links(path: Path) -> List[ExprLink]:
     exprs: List[ExprLink] = []
-    with path.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            cond_raw = row.get("conditions_json", "") or ""
-            conditions = _fix_raw_json(cond_raw, f"expr {row.get('expr_id')}")
-            exprs.append(
-                ExprLink(
-                    expr_id=row["expr_id"],
-                    expr_label=row["expr_label"],
-                    core_id=row["core_id"],
-                    conditions=conditions,
-                    source_kind=row.get("source_kind", ""),
-                    source_detail=row.get("source_detail", ""),
-                    status=row.get("status", "active"),
-                    created_at=row.get("created_at", ""),
-                    updated_at=row.get("updated_at", ""),
-                    note=row.get("note", ""),
-                )
-            )
+    for chunk in iter_expr_links(path):
+        exprs.extend(chunk)
     return exprs
 
 
+def _evidence_from_row(row: Dict[str, str]) -> TripleEvidence:
+    try:
+        weight = float(row.get("weight", "0") or 0.0)
+    except ValueError:
+        weight = 0.0
+    return TripleEvidence(
+        evidence_id=row["evidence_id"],
+        triple_id=row.get("triple_id", ""),
+        evidence_type=row.get("evidence_type", ""),
+        source_kind=row.get("source_kind", ""),
+        stance=row.get("stance", "positive"),
+        weight=weight,
+        source_detail=row.get("source_detail", ""),
+        note=row.get("note", ""),
+        created_at=row.get("created_at", ""),
+    )
+
+
 # ★ triple_evidence のロード
-def load_triple_evidence(path: Path) -> List[TripleEvidence]:
+def iter_triple_evidence(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """triple_evidence.csv を chunk_size 行ずつの List[TripleEvidence] として順に返す。"""
     if not path.exists():
         print(f"[INFO] triple_evidence.csv not found, skip evidence layer.")
-        return []
+        return
 
-    evidences: List[TripleEvidence] = []
     with path.open("r", encoding="utf-8", newline="") as f:
         reader = csv.DictReader(f)
-        for row in reader:
-            if not row.get("evidence_id"):
+        rows = (_evidence_from_row(row) for row in reader if row.get("evidence_id"))
+        yield from _iter_chunks(rows, chunk_size)
+
+
+def load_triple_evidence(path: Path) -> List[TripleEvidence]:
+    evidences: List[TripleEvidence] = []
+    for chunk in iter_triple_evidence(path):
+        evidences.extend(chunk)
+    return evidences
+
+
+# ========== シャード（分割 CSV）の検出と並列ロード ==========
+#
+# 大きな表は meaning_triples.part-0001.csv のように分割して置ける。
+# 分割ファイルがあればそちらを番号順に使い、無ければ従来の単一 CSV を使う。
+
+def _shard_paths(data_dir: Path, csv_path: Path) -> List[Path]:
+    """csv_path（ファイル名だけ使う）の分割ファイル一覧。無ければ単一ファイル（存在すれば）。"""
+    base = Path(csv_path)
+    parts = sorted(Path(data_dir).glob(f"{base.stem}.part-*{base.suffix}"))
+    if parts:
+        return parts
+    single = Path(data_dir) / base.name
+    return [single] if single.exists() else []
+
+
+def find_table_files(data_dir: Path) -> Dict[str, List[Path]]:
+    """
+    data_dir 内の各テーブルのファイル一覧（シャードなら番号順）。
+    triples は meaning_triples_with_reverse を優先し、無ければ meaning_triples を使う。
+    """
+    data_dir = Path(data_dir)
+    triples = _shard_paths(data_dir, TRIPLES_WITH_REV) or _shard_paths(data_dir, TRIPLES_CSV)
+    return {
+        "cores": _shard_paths(data_dir, CORE_CSV) or [data_dir / CORE_CSV.name],
+        "triples": triples or [data_dir / TRIPLES_CSV.name],
+        "exprs": _shard_paths(data_dir, EXPR_CSV) or [data_dir / EXPR_CSV.name],
+        "evidence": _shard_paths(data_dir, TRIPLE_EVIDENCE_CSV),
+    }
+
+
+def _load_shard(kind: str, path: Path, adjacency_rels=()):
+    """
+    プロセスプールのワーカーで 1 ファイルを parse する。
+    triples はコンパイル済み conditions と、シャード内の行番号による部分インデックスも作って返す。
+    """
+    if kind == "cores":
+        return load_core_concepts(path)
+    if kind == "exprs":
+        return load_expr_links(path)
+    if kind == "evidence":
+        return load_triple_evidence(path)
+    if kind == "triples":
+        records = load_triples(path)
+        compiled = [compile_conditions(t.conditions) for t in records]
+        index = TripleIndex(adjacency_rels=adjacency_rels)
+        for row, (t, c) in enumerate(zip(records, compiled)):
+            index.add(row, t, c)
+        return records, compiled, index
+    raise ValueError(f"unknown table kind: {kind}")
+
+
+# ========== triple の追加（関係ペア表と追記ログ） ==========
+#
+# spec §3.4 / §9.4：人が入力するのは順方向の triple だけで、逆方向は OS が生成する。
+# 逆方向の関係は関係ペア表から引き、conditions と polarity は順方向をそのままコピーする。
+# add_triples() は検証を通ったバッチを追記ログに 1 行で書いて fsync してからメモリに反映し、
+# 起動時（CSV ロード後）にログを先頭から再生する。ログは順方向だけを持ち、逆方向は再生時に作り直す。
+
+# (順方向, 逆方向) の関係ペア
+RELATION_PAIRS = [
+    ("core:use-purpose-001", "core:use-purpose-for-001"),
+    ("core:material-001", "core:material-for-001"),
+    ("core:category-001", "core:category-of-001"),
+    ("core:domain-001", "core:domain-of-001"),
+]
+
+# 関係 → 逆向きの関係（両方向を引ける）
+REVERSE_RELATIONS: Dict[str, str] = {}
+
+TRIPLE_POLARITIES = ("positive", "negative")
+TRIPLE_STATUSES = ("draft", "active", "deprecated")
+REVERSE_NOTE = "auto-generated reverse"
+
+
+def register_relation_pair(forward: str, reverse: str) -> None:
+    """関係ペアを登録する（以降の add_triples で逆方向の生成に使われる）。"""
+    REVERSE_RELATIONS[forward] = reverse
+    REVERSE_RELATIONS[reverse] = forward
+
+
+for _forward, _reverse in RELATION_PAIRS:
+    register_relation_pair(_forward, _reverse)
+
+
+def reverse_triple_id(triple_id: str) -> str:
+    """逆方向 triple の ID（既存データに合わせて t0001 → r0001、それ以外は末尾に -rev）。"""
+    if triple_id.startswith("t") and len(triple_id) > 1:
+        return "r" + triple_id[1:]
+    return triple_id + "-rev"
+
+
+def make_reverse_triple(t: Triple) -> Triple:
+    """
+    順方向 triple から逆方向 triple を作る（polarity / status はコピー）。
+    conditions は順方向と同じオブジェクトを共有する（FrozenConditions にしてから渡すこと）。
+    """
+    return Triple(
+        triple_id=reverse_triple_id(t.triple_id),
+        src=t.dst,
+        rel=REVERSE_RELATIONS[t.rel],
+        dst=t.src,
+        conditions=t.conditions,
+        polarity=t.polarity,
+        status=t.status,
+        is_reverse=True,
+        reverse_of=t.triple_id,
+        created_at=t.created_at,
+        note=f"{t.note} / {REVERSE_NOTE}" if t.note else REVERSE_NOTE,
+    )
+
+
+def append_triple_log(path: Path, triples: List[Triple], fsync: bool = True) -> tuple:
+    """
+    順方向 triple のバッチを追記ログに 1 行（JSON）で書き足す。
+    戻り値: (書き足す前のバイト長, 書き足した後のバイト長)
+    """
+    data = json.dumps(
+        {"op": "add_triples", "triples": [vars(t) for t in triples]},
+        ensure_ascii=False,
+    ).encode("utf-8") + b"\n"
+    with Path(path).open("a+b") as f:
+        end = f.seek(0, 2)
+        if end:
+            f.seek(end - 1)
+            if f.read(1) != b"\n":
+                # 前回の書き込みが途中で切れていたら、その行とは別の行に書く
+                data = b"\n" + data
+        f.write(data)
+        f.flush()
+        if fsync:
+            os_fsync(f.fileno())
+    return end, end + len(data)
+
+
+def truncate_triple_log(path: Path, size: int) -> None:
+    """追記ログを size バイトに戻す（反映に失敗したバッチの取り消し用）。"""
+    with Path(path).open("r+b") as f:
+        f.truncate(size)
+        f.flush()
+        os_fsync(f.fileno())
+
+
+def iter_triple_log(path: Path, start: int = 0):
+    """
+    追記ログの start バイト目以降のバッチを (行末のバイト位置, List[Triple]) で順に返す。
+    途中で切れた行（書き込み中の停止など）は警告を出して飛ばす
+    （書き終わる前のバッチはメモリにも反映されていない）。
+    改行で終わっていない最後の行は書き込み中かもしれないので、位置を進めずに止まる。
+    """
+    with Path(path).open("rb") as f:
+        f.seek(start)
+        pos = start
+        for lineno, raw in enumerate(f, 1):
+            if not raw.endswith(b"\n"):
+                print(f"[WARN] {path}: 改行で終わっていない末尾の行を飛ばします")
+                return
+            pos += len(raw)
+            if not raw.strip():
                 continue
             try:
-                weight = float(row.get("weight", "0") or 0.0)
-            except ValueError:
-                weight = 0.0
-            evidences.append(
-                TripleEvidence(
-                    evidence_id=row["evidence_id"],
-                    triple_id=row.get("triple_id", ""),
-                    evidence_type=row.get("evidence_type", ""),
-                    source_kind=row.get("source_kind", ""),
-                    stance=row.get("stance", "positive"),
-                    weight=weight,
-                    source_detail=row.get("source_detail", ""),
-                    note=row.get("note", ""),
-                    created_at=row.get("created_at", ""),
-                )
-            )
-    return evidences
+                record = json.loads(raw.decode("utf-8"))
+                batch = [Triple(**row) for row in record["triples"]]
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"[WARN] {path}:{lineno}: 読めない行を飛ばします ({e})")
+                continue
+            yield pos, batch
+
+
+# ========== 地域・時代の階層 ==========
+#
+# 仕様（docs §4.5）では地域コードは階層を持ち（"JP-Kyoto" ⊂ "JP"）、
+# 時代ラベルは年の区間に対応する（"Edo" → year_range [1603, 1868]）。どちらも実行時に解決する。
+# - region は triple 側をコンパイル時に祖先まで閉じた集合にしておく。
+#   wanted の region=JP は、集合の共通部分判定 1 回（columnar ならビット演算）で
+#   JP-Kyoto の triple にも一致する（逆向き、wanted の JP-Kyoto は JP の triple には一致しない）
+# - era と year_range は、片方しか無ければもう片方を導出する。year_range は区間の重なりで判定する
+
+# 暗黙の親（"JP-Kyoto" → "JP" のように最後の "-" 以降を落としたもの）より細かい親子関係
+REGION_PARENTS: Dict[str, str] = {
+    "JP-Tokyo": "JP-Kanto",
+    "JP-Kanagawa": "JP-Kanto",
+    "JP-Chiba": "JP-Kanto",
+    "JP-Saitama": "JP-Kanto",
+    "JP-Kyoto": "JP-Kansai",
+    "JP-Osaka": "JP-Kansai",
+    "JP-Hyogo": "JP-Kansai",
+    "JP-Nara": "JP-Kansai",
+    "JP-Aichi": "JP-Chubu",
+    "JP-Fukuoka": "JP-Kyushu",
+    "JP-Sapporo": "JP-Hokkaido",
+}
+
+# 時代ラベル → 年の区間（両端を含む）
+ERA_YEAR_RANGES: Dict[str, tuple] = {
+    "Edo": (1603.0, 1868.0),
+    "Meiji": (1868.0, 1912.0),
+    "Taisho": (1912.0, 1926.0),
+    "Showa": (1926.0, 1989.0),
+    "Heisei": (1989.0, 2019.0),
+    "Reiwa": (2019.0, float("inf")),
+}
+
+# 値が階層を持つキー（triple 側を祖先まで閉じてから比較する）
+HIERARCHICAL_CONDITION_KEYS = ("region",)
+
+
+def _region_parent(code: str) -> Optional[str]:
+    parent = REGION_PARENTS.get(code)
+    if parent is None and "-" in code:
+        parent = code.rsplit("-", 1)[0]
+    return parent or None
+
+
+@lru_cache(maxsize=None)
+def region_ancestors(code: str) -> frozenset:
+    """code 自身と、その上位の地域コードすべて（例: JP-Kyoto → {JP-Kyoto, JP-Kansai, JP}）。"""
+    seen = {code}
+    parent = _region_parent(code)
+    while parent is not None and parent not in seen:
+        seen.add(parent)
+        parent = _region_parent(parent)
+    return frozenset(seen)
+
+
+@lru_cache(maxsize=CONDITION_CACHE_SIZE)
+def _closed_values(key: str, values: tuple) -> frozenset:
+    if key != "region":
+        return frozenset(values)
+    out = set()
+    for v in values:
+        out |= region_ancestors(v) if isinstance(v, str) else {v}
+    return frozenset(out)
+
+
+def expand_hierarchy(key: str, values: Any) -> frozenset:
+    """values（スカラー or 列）を、key の階層で祖先まで閉じた集合にする。"""
+    values = tuple(values) if isinstance(values, (list, tuple, frozenset)) else (values,)
+    try:
+        return _closed_values(key, values)
+    except TypeError:  # dict などハッシュできない値
+        return frozenset(_freeze_value(v) for v in values)
+
+
+def era_year_range(eras: Any) -> Optional[tuple]:
+    """時代ラベル（スカラー or 列）を覆う年の区間。既知のラベルが 1 つも無ければ None。"""
+    eras = eras if isinstance(eras, (list, tuple, frozenset)) else (eras,)
+    ranges = [ERA_YEAR_RANGES[e] for e in eras if isinstance(e, str) and e in ERA_YEAR_RANGES]
+    if not ranges:
+        return None
+    return (min(lo for lo, _ in ranges), max(hi for _, hi in ranges))
+
+
+def eras_overlapping(lo: float, hi: float) -> tuple:
+    """[lo, hi] と重なる時代ラベル（ERA_YEAR_RANGES の順）。"""
+    return tuple(e for e, (elo, ehi) in ERA_YEAR_RANGES.items() if elo <= hi and lo <= ehi)
+
+
+def condition_value(conditions: Dict[str, Any], key: str) -> Any:
+    """
+    conditions[key]。無ければ None。
+    era / year_range は片方しか無いとき、もう片方から導出した値を返す。
+    """
+    if key in conditions:
+        return conditions[key]
+    if key == "year_range" and "era" in conditions:
+        return era_year_range(conditions["era"])
+    if key == "era" and "year_range" in conditions:
+        rng = _as_range(conditions["year_range"])
+        return (eras_overlapping(*rng) or None) if rng is not None else None
+    return None
 
 
 # ========== 条件フィルタ ==========
 
 def cond_match(conditions: Dict[str, Any], wanted: Dict[str, Any]) -> bool:
+    """
+    conditions が wanted を満たすか（キーは AND、値はどれか 1 つ一致すれば OK）。
+    region は階層を考慮し、year_range は区間の重なりで判定する。
+    """
     for k, v in wanted.items():
         if v is None:
             continue
-        if k not in conditions:
+        cv = condition_value(conditions, k)
+        if cv is None:
             return False
-        cv = conditions[k]
-        if isinstance(cv, list):
-            if isinstance(v, list):
+        if k in RANGE_CONDITION_KEYS:
+            rng, crng = _as_range(v), _as_range(cv)
+            if rng is not None and crng is not None:
+                if crng[1] < rng[0] or rng[1] < crng[0]:
+                    return False
+                continue
+        if k in HIERARCHICAL_CONDITION_KEYS:
+            cv = expand_hierarchy(k, cv)
+        if isinstance(cv, (list, tuple, frozenset)):
+            if isinstance(v, (list, tuple)):
                 if not any(x in cv for x in v):
                     return False
             else:
                 if v not in cv:
                     return False
         else:
-            if isinstance(v, list):
+            if isinstance(v, (list, tuple)):
                 if cv not in v:
                     return False
             else:
@@ -244,46 +715,1762 @@ def cond_match(conditions: Dict[str, Any], wanted: Dict[str, Any]) -> bool:
     return True
 
 
+# ========== 条件コンパイラ ==========
+#
+# conditions_json はロード時に「キー → frozenset」（year_range は (lo, hi) の区間）へ
+# 正規化しておき、クエリ側の wanted も 1 回だけ述語関数に変換する。
+# 判定の意味は cond_match と同じ（キー必須・値はどれか 1 つ一致すれば OK）。
+
+# 区間として扱うキー（[lo, hi] または単一の年）
+RANGE_CONDITION_KEYS = ("year_range",)
+
+# 転置インデックス（条件値 → 行番号）を張るキー
+INDEXED_CONDITION_KEYS = ("domain", "region", "era", "lang", "register", "medium")
+
+
+def _freeze_value(v: Any) -> Any:
+    """set に入れられない値（dict など）は JSON 文字列にしてから比較する。"""
+    try:
+        hash(v)
+        return v
+    except TypeError:
+        return json.dumps(v, ensure_ascii=False, sort_keys=True)
+
+
+def _as_range(v: Any) -> Optional[tuple]:
+    """[lo, hi] / 単一の数値 を (lo, hi) に。数値でなければ None。"""
+    if isinstance(v, (list, tuple)):
+        if len(v) != 2:
+            return None
+        lo, hi = v
+    else:
+        lo = hi = v
+    try:
+        lo, hi = float(lo), float(hi)
+    except (TypeError, ValueError):
+        return None
+    return (lo, hi) if lo <= hi else (hi, lo)
+
+
+def compile_conditions(conditions: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    triple の conditions を判定用の形に正規化する。
+    - 通常のキー: 値（スカラー or リスト）→ frozenset
+    - RANGE_CONDITION_KEYS: (lo, hi)。数値にできなければ通常キー扱い
+    - HIERARCHICAL_CONDITION_KEYS: 祖先まで閉じた frozenset
+    - era / year_range: 片方しか無ければもう片方を導出して持つ
+    """
+    compiled: Dict[str, Any] = {}
+    for k, v in conditions.items():
+        if k in RANGE_CONDITION_KEYS:
+            rng = _as_range(v)
+            if rng is not None:
+                compiled[k] = rng
+                continue
+        if k in HIERARCHICAL_CONDITION_KEYS:
+            compiled[k] = expand_hierarchy(k, v)
+            continue
+        values = v if isinstance(v, (list, tuple)) else [v]
+        compiled[k] = frozenset(_freeze_value(x) for x in values)
+    for k in ("era", "year_range"):
+        if k not in conditions:
+            derived = condition_value(conditions, k)
+            if derived is not None:
+                compiled[k] = derived if k == "year_range" else frozenset(derived)
+    return compiled
+
+
+def compile_wanted(wanted: Dict[str, Any]):
+    """
+    wanted（クエリ側の条件）を述語関数 pred(compiled_conditions) -> bool に変換する。
+    条件が何も無いときは None を返す（呼び出し側でチェックを省略できる）。
+    """
+    checks = []
+    for k, v in wanted.items():
+        if v is None:
+            continue
+        if k in RANGE_CONDITION_KEYS:
+            rng = _as_range(v)
+            if rng is not None:
+                checks.append((k, None, rng))
+                continue
+        values = v if isinstance(v, (list, tuple)) else [v]
+        checks.append((k, frozenset(_freeze_value(x) for x in values), None))
+
+    if not checks:
+        return None
+
+    def pred(compiled: Dict[str, Any]) -> bool:
+        for k, wset, rng in checks:
+            cv = compiled.get(k)
+            if cv is None:
+                return False
+            if rng is not None:
+                # 区間同士は重なれば一致
+                if isinstance(cv, tuple):
+                    if cv[1] < rng[0] or rng[1] < cv[0]:
+                        return False
+                elif not any(rng[0] <= x <= rng[1] for x in cv if isinstance(x, (int, float))):
+                    return False
+            elif isinstance(cv, tuple) or cv.isdisjoint(wset):
+                return False
+        return True
+
+    return pred
+
+
+# ========== 問い合わせの文脈（context） ==========
+#
+# クエリ関数・質問応答に渡す context は conditions_json と同じキー
+# （domain / region / era / year_range / lang / register / medium …）の dict で、
+# 単年の year も使える。resolve_context で wanted 条件にそろえて find_triples に渡すので、
+# 絞り込みは条件の転置インデックス（いちばん短い posting list）から始まる。
+
+# スロット質問（用途・素材・分類・道具）の既定の文脈
+DEFAULT_CONTEXT: Dict[str, Any] = {"domain": "cooking"}
+
+# context のうち、条件ではなく結果の扱いを決めるキー
+#   min_trust: evidence の trust がこれ未満の triple を外し、trust の降順に並べる
+#              （-1.0 なら外さずに並べ替えだけ）
+#   include_evidence: 結果に evidence の全件（"evidence"）を載せるか。既定は True（従来どおり）で、
+#              False なら全件を引かずに集約値 evidence_summary だけを返す
+CONTEXT_OPTION_KEYS = ("min_trust", "include_evidence")
+
+
+def resolve_context(
+    context: Optional[Dict[str, Any]] = None,
+    defaults: Dict[str, Any] = DEFAULT_CONTEXT,
+) -> Dict[str, Any]:
+    """
+    context を wanted 条件（find_triples の conditions と同じ形）にする。
+    - defaults をキーごとに上書きする。値が None / "" / 空リストのキーは条件から外す
+      （{"domain": None} で既定の domain 絞り込みも外せる）
+    - year（単年）は year_range [year, year] にする
+    - CONTEXT_OPTION_KEYS は条件に入れない（context_options 参照）
+    """
+    if context is not None and not isinstance(context, dict):
+        raise TypeError(f"context must be a dict, not {type(context).__name__}")
+    wanted: Dict[str, Any] = {}
+    for k, v in {**defaults, **(context or {})}.items():
+        if k in CONTEXT_OPTION_KEYS:
+            continue
+        if v is None or v == "" or (isinstance(v, (list, tuple)) and not v):
+            continue
+        if k == "year":
+            k, v = "year_range", [v, v]
+        wanted[k] = v
+    return wanted
+
+
+def context_options(context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """context のうち CONTEXT_OPTION_KEYS の値（None のものは除く）。"""
+    if not context:
+        return {}
+    options = {k: context[k] for k in CONTEXT_OPTION_KEYS if context.get(k) is not None}
+    if "min_trust" in options:
+        try:
+            options["min_trust"] = float(options["min_trust"])
+        except (TypeError, ValueError):
+            raise TypeError(f"min_trust must be a number, not {options['min_trust']!r}")
+    if "include_evidence" in options:
+        options["include_evidence"] = bool(options["include_evidence"])
+    return options
+
+
+def context_key(wanted: Dict[str, Any]) -> tuple:
+    """resolve_context の結果をキャッシュキーにできる形にする。"""
+    return tuple(sorted(
+        (k, tuple(_freeze_value(x) for x in v) if isinstance(v, (list, tuple)) else _freeze_value(v))
+        for k, v in wanted.items()
+    ))
+
+
+# ========== コンパクト格納モード ==========
+#
+# MiniMeaningOS(compact=True) のときの triple 格納形式。
+# - core / relation ID は IdTable で整数コードに intern
+# - 同一内容の conditions は ConditionPool で 1 つの dict を共有
+# - triple 本体は列ごとの array（CompactTripleTable）に格納し、
+#   TripleView が Triple と同じ属性名で読み出すビューになる
+
+class IdTable:
+    """文字列 ID ⇔ 整数コード の相互変換表。"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            value = sys.intern(value)
+            self.codes[value] = code
+            self.strings.append(value)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class ConditionPool:
+    """
+    同一内容の conditions を 1 つの dict に集約するプール。
+    values[i] が共有 dict、compiled[i] がそのコンパイル済み形。
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.values: List[Dict[str, Any]] = []
+        self.compiled: List[Dict[str, Any]] = []
+
+    def intern(self, conditions: Dict[str, Any]) -> int:
+        key = json.dumps(conditions, ensure_ascii=False, sort_keys=True)
+        idx = self._ids.get(key)
+        if idx is None:
+            idx = len(self.values)
+            self._ids[key] = idx
+            self.values.append(conditions)
+            self.compiled.append(compile_conditions(conditions))
+        return idx
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class TripleView:
+    """CompactTripleTable の 1 行を Triple と同じ属性で見せる軽量ビュー。"""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "CompactTripleTable", row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def triple_id(self) -> str:
+        return self._table.triple_ids[self._row]
+
+    @property
+    def src(self) -> str:
+        return self._table.ids.strings[self._table.src[self._row]]
+
+    @property
+    def rel(self) -> str:
+        return self._table.ids.strings[self._table.rel[self._row]]
+
+    @property
+    def dst(self) -> str:
+        return self._table.ids.strings[self._table.dst[self._row]]
+
+    @property
+    def conditions(self) -> Dict[str, Any]:
+        return self._table.pool.values[self._table.cond[self._row]]
+
+    @property
+    def polarity(self) -> str:
+        return self._table.ids.strings[self._table.polarity[self._row]]
+
+    @property
+    def status(self) -> str:
+        return self._table.ids.strings[self._table.status[self._row]]
+
+    @property
+    def is_reverse(self) -> bool:
+        return bool(self._table.is_reverse[self._row])
+
+    @property
+    def reverse_of(self) -> Optional[str]:
+        return self._table.reverse_of[self._row]
+
+    @property
+    def created_at(self) -> str:
+        return self._table.created_at[self._row]
+
+    @property
+    def note(self) -> str:
+        return self._table.note[self._row]
+
+    def to_triple(self) -> Triple:
+        return Triple(
+            triple_id=self.triple_id,
+            src=self.src,
+            rel=self.rel,
+            dst=self.dst,
+            conditions=self.conditions,
+            polarity=self.polarity,
+            status=self.status,
+            is_reverse=self.is_reverse,
+            reverse_of=self.reverse_of,
+            created_at=self.created_at,
+            note=self.note,
+        )
+
+    # 等価は値（to_triple() 同士）で比べるので、ハッシュも値から作る。
+    # conditions は dict で hash できないため、比べる値のうち文字列の項目だけを使う（等しければ必ず一致する）
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TripleView):
+            if other._table is self._table and other._row == self._row:
+                return True
+            other = other.to_triple()
+        if isinstance(other, Triple):
+            return self.to_triple() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.triple_id, self.src, self.rel, self.dst, self.polarity, self.status))
+
+    def __repr__(self) -> str:
+        return f"TripleView({self.to_triple()!r})"
+
+
+class CompactTripleTable:
+    """
+    triple を列指向の array に詰めて持つシーケンス（要素は TripleView）。
+    src / rel / dst / polarity / status は IdTable のコード、cond は ConditionPool の番号。
+    created_at / note など重複しやすい文字列は sys.intern で共有する。
+    """
+
+    def __init__(self, ids: IdTable, pool: ConditionPool):
+        self.ids = ids
+        self.pool = pool
+        self.triple_ids: List[str] = []
+        self.src = array("i")
+        self.rel = array("i")
+        self.dst = array("i")
+        self.cond = array("i")
+        self.polarity = array("H")
+        self.status = array("H")
+        self.is_reverse = array("b")
+        self.reverse_of: List[Optional[str]] = []
+        self.created_at: List[str] = []
+        self.note: List[str] = []
+
+    def append(self, t: Triple) -> int:
+        row = len(self.triple_ids)
+        self.triple_ids.append(t.triple_id)
+        self.src.append(self.ids.intern(t.src))
+        self.rel.append(self.ids.intern(t.rel))
+        self.dst.append(self.ids.intern(t.dst))
+        self.cond.append(self.pool.intern(t.conditions))
+        self.polarity.append(self.ids.intern(t.polarity))
+        self.status.append(self.ids.intern(t.status))
+        self.is_reverse.append(1 if t.is_reverse else 0)
+        self.reverse_of.append(t.reverse_of)
+        self.created_at.append(sys.intern(t.created_at or ""))
+        self.note.append(sys.intern(t.note or ""))
+        return row
+
+    def compiled_conditions(self, row: int) -> Dict[str, Any]:
+        return self.pool.compiled[self.cond[row]]
+
+    def __len__(self) -> int:
+        return len(self.triple_ids)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [TripleView(self, r) for r in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return TripleView(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield TripleView(self, row)
+
+
+def compact_expr_link(e: ExprLink, pool: ConditionPool) -> ExprLink:
+    """ExprLink の文字列を intern し、conditions をプールの共有 dict に置き換える。"""
+    e.expr_label = sys.intern(e.expr_label)
+    e.core_id = sys.intern(e.core_id)
+    e.conditions = pool.values[pool.intern(e.conditions)]
+    e.source_kind = sys.intern(e.source_kind or "")
+    e.source_detail = sys.intern(e.source_detail or "")
+    e.status = sys.intern(e.status or "")
+    e.created_at = sys.intern(e.created_at or "")
+    e.updated_at = sys.intern(e.updated_at or "")
+    e.note = sys.intern(e.note or "")
+    return e
+
+
+def compact_evidence(ev: TripleEvidence) -> TripleEvidence:
+    """TripleEvidence の重複しやすい文字列を intern する。"""
+    ev.triple_id = sys.intern(ev.triple_id)
+    ev.evidence_type = sys.intern(ev.evidence_type or "")
+    ev.source_kind = sys.intern(ev.source_kind or "")
+    ev.stance = sys.intern(ev.stance or "")
+    ev.source_detail = sys.intern(ev.source_detail or "")
+    ev.note = sys.intern(ev.note or "")
+    ev.created_at = sys.intern(ev.created_at or "")
+    return ev
+
+
+# ========== 列指向 NumPy バックエンド ==========
+#
+# MiniMeaningOS(backend="columnar") のときの triple 検索層。
+# src / rel / dst は int32 のコード列、polarity / status は uint8、
+# conditions のカテゴリ値（INDEXED_CONDITION_KEYS）はキーごとのビットマスク列、
+# year_range は lo / hi の float64 列で持ち、検索はすべてブールマスクの演算で行う。
+
+class ColumnarTripleStore:
+    """
+    triple 表を NumPy の列で持つストア。行番号は MiniMeaningOS.triples と同じ。
+    append で 1 行ずつ追加でき、容量は倍々で確保する。
+    """
+
+    def __init__(self, ids: Optional[IdTable] = None, capacity: int = 1024):
+        if np is None:
+            raise ImportError("backend='columnar' requires numpy")
+        self.ids = ids if ids is not None else IdTable()
+        self.n = 0
+        self._cap = max(16, capacity)
+        self.src = np.zeros(self._cap, dtype=np.int32)
+        self.rel = np.zeros(self._cap, dtype=np.int32)
+        self.dst = np.zeros(self._cap, dtype=np.int32)
+        # polarity / status は小さなコード表（ids とは別）で uint8 に収める
+        self.polarity_codes: Dict[str, int] = {}
+        self.status_codes: Dict[str, int] = {}
+        self.polarity = np.zeros(self._cap, dtype=np.uint8)
+        self.status = np.zeros(self._cap, dtype=np.uint8)
+        # key → {value → ビット番号}、key → [uint64 列（64 値ごとに 1 列）]
+        self.bit_of: Dict[str, Dict[Any, int]] = {k: {} for k in INDEXED_CONDITION_KEYS}
+        self.bits: Dict[str, List[Any]] = {k: [] for k in INDEXED_CONDITION_KEYS}
+        # 区間キー（year_range）。値が無い行は NaN
+        self.range_lo: Dict[str, Any] = {
+            k: np.full(self._cap, np.nan) for k in RANGE_CONDITION_KEYS
+        }
+        self.range_hi: Dict[str, Any] = {
+            k: np.full(self._cap, np.nan) for k in RANGE_CONDITION_KEYS
+        }
+
+    @classmethod
+    def from_triples(cls, triples, triple_conds, ids: Optional[IdTable] = None) -> "ColumnarTripleStore":
+        store = cls(ids=ids, capacity=len(triples))
+        for t, compiled in zip(triples, triple_conds):
+            store.append(t, compiled)
+        return store
+
+    # ----- 追加 -----
+
+    def _grow(self) -> None:
+        cap = self._cap * 2
+
+        def grown(a, fill=0):
+            out = np.full(cap, fill, dtype=a.dtype)
+            out[: self._cap] = a
+            return out
+
+        self.src = grown(self.src)
+        self.rel = grown(self.rel)
+        self.dst = grown(self.dst)
+        self.polarity = grown(self.polarity)
+        self.status = grown(self.status)
+        for k in INDEXED_CONDITION_KEYS:
+            self.bits[k] = [grown(col) for col in self.bits[k]]
+        for k in RANGE_CONDITION_KEYS:
+            self.range_lo[k] = grown(self.range_lo[k], np.nan)
+            self.range_hi[k] = grown(self.range_hi[k], np.nan)
+        self._cap = cap
+
+    @staticmethod
+    def _small_code(table: Dict[str, int], value: str) -> int:
+        code = table.get(value)
+        if code is None:
+            code = len(table)
+            if code > 255:
+                raise ValueError("too many distinct polarity/status values for uint8")
+            table[value] = code
+        return code
+
+    def _bit(self, key: str, value: Any) -> int:
+        bit = self.bit_of[key].get(value)
+        if bit is None:
+            bit = len(self.bit_of[key])
+            self.bit_of[key][value] = bit
+            if bit // 64 >= len(self.bits[key]):
+                self.bits[key].append(np.zeros(self._cap, dtype=np.uint64))
+        return bit
+
+    def append(self, t, compiled: Dict[str, Any]) -> int:
+        if self.n == self._cap:
+            self._grow()
+        row = self.n
+        self.src[row] = self.ids.intern(t.src)
+        self.rel[row] = self.ids.intern(t.rel)
+        self.dst[row] = self.ids.intern(t.dst)
+        self.polarity[row] = self._small_code(self.polarity_codes, t.polarity)
+        self.status[row] = self._small_code(self.status_codes, t.status)
+        for k in INDEXED_CONDITION_KEYS:
+            values = compiled.get(k)
+            if not isinstance(values, frozenset):
+                continue
+            for v in values:
+                bit = self._bit(k, v)
+                self.bits[k][bit // 64][row] |= np.uint64(1 << (bit % 64))
+        for k in RANGE_CONDITION_KEYS:
+            rng = compiled.get(k)
+            if isinstance(rng, tuple):
+                self.range_lo[k][row], self.range_hi[k][row] = rng
+        self.n += 1
+        return row
+
+    # ----- 検索 -----
+
+    def mask(
+        self,
+        src: Optional[str] = None,
+        rel: Optional[str] = None,
+        dst: Optional[str] = None,
+        wanted: Optional[Dict[str, Any]] = None,
+        polarity: Optional[str] = "positive",
+    ):
+        """
+        条件に合う行を True にしたブール配列と、列で判定できなかった wanted の残りを返す。
+        残りのキー（freq など）は呼び出し側でコンパイル済み述語により判定する。
+        """
+        n = self.n
+        m = np.ones(n, dtype=bool)
+        for value, col in ((src, self.src), (rel, self.rel), (dst, self.dst)):
+            if not value:
+                continue
+            code = self.ids.codes.get(value)
+            if code is None:
+                return np.zeros(n, dtype=bool), {}
+            m &= col[:n] == code
+        if polarity:
+            code = self.polarity_codes.get(polarity)
+            if code is None:
+                return np.zeros(n, dtype=bool), {}
+            m &= self.polarity[:n] == code
+
+        rest: Dict[str, Any] = {}
+        for k, v in (wanted or {}).items():
+            if v is None:
+                continue
+            if k in self.bit_of:
+                m &= self._key_mask(k, v)
+            elif k in RANGE_CONDITION_KEYS and _as_range(v) is not None:
+                lo, hi = _as_range(v)
+                # NaN との比較は常に False なので、値の無い行は自動的に外れる
+                m &= (self.range_lo[k][:n] <= hi) & (self.range_hi[k][:n] >= lo)
+            else:
+                rest[k] = v
+        return m, rest
+
+    def _key_mask(self, key: str, values):
+        n = self.n
+        values = values if isinstance(values, (list, tuple)) else [values]
+        words: Dict[int, int] = defaultdict(int)
+        for v in values:
+            bit = self.bit_of[key].get(_freeze_value(v))
+            if bit is not None:
+                words[bit // 64] |= 1 << (bit % 64)
+        m = np.zeros(n, dtype=bool)
+        for word, bits in words.items():
+            m |= (self.bits[key][word][:n] & np.uint64(bits)) != 0
+        return m
+
+    def rows(self, src=None, rel=None, dst=None, wanted=None, polarity="positive"):
+        m, rest = self.mask(src, rel, dst, wanted, polarity)
+        return np.flatnonzero(m), rest
+
+    def __len__(self) -> int:
+        return self.n
+
+
+# ========== クエリ結果キャッシュ ==========
+#
+# answer_*_question の結果を parse 済みクエリ単位で使い回す LRU（+ 任意の TTL）キャッシュ。
+# OS 側の generation（データ世代）が変わったら丸ごと捨てる。
+
+class QueryCache:
+    """
+    key → value の LRU キャッシュ。
+    get_or_compute(key, generation, compute) は、保持している世代と generation が
+    違えば全エントリを破棄してから引く。
+    返す value は呼び出し間で共有されるので、呼び出し側で書き換えないこと。
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()  # key → (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, key, generation: int, compute):
+        if generation != self.generation:
+            self.invalidate(generation)
+
+        entry = self._entries.get(key)
+        now = time.monotonic() if self.ttl is not None else 0.0
+        if entry is not None:
+            expires_at, value = entry
+            if self.ttl is None or now < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        self.misses += 1
+        value = compute()
+        if self.maxsize > 0:
+            expires_at = now + self.ttl if self.ttl is not None else None
+            self._entries[key] = (expires_at, value)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, generation: Optional[int] = None) -> None:
+        """全エントリを捨てる（generation を渡せばその世代に切り替える）。"""
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        if generation is not None:
+            self.generation = generation
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "max_size": self.maxsize,
+            "generation": self.generation,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ========== triple_stats（使用回数・出現回数の減衰カウンタ） ==========
+#
+# spec §6 の常識（統計）層。triple_id ごとに
+#   usage  : OS / API / GUI で結果として返した回数
+#   corpus : 文書（コーパス）での登場回数
+# を持ち、どちらも時間とともに減衰させる（spec §6.4: count * 0.99^経過年数）。
+# 記録は deque への append だけにして（ロック不要）、集計は flush() でまとめて行う。
+# flush は問い合わせの経路では呼ばず、サービスの定期タスク・バッチのチャンク境界・
+# 終了時に明示的に呼ぶ。1 回の flush に入る記録はその中の最後の時刻に起きたものとして扱う
+# （時刻の差は flush 間隔程度なので、年単位の減衰にはほぼ効かない）。
+# 読み出しは直近の flush 時点の値。
+# 集計は save() で TRIPLE_STATS_PATH（data_dir 内）へ書き出し、次の起動時に読み戻す。
+
+STATS_DECAY_PER_YEAR = 0.99
+STATS_YEAR_SECONDS = 365.25 * 24 * 3600
+# confidence の normalized(corpus) = corpus / (corpus + STATS_CORPUS_SCALE)
+STATS_CORPUS_SCALE = 10.0
+STATS_FLUSH_INTERVAL = 1.0  # 秒
+STATS_SAVE_INTERVAL = 60.0  # 秒
+STATS_FILE_VERSION = 1
+
+STATS_USAGE = "usage"
+STATS_CORPUS = "corpus"
+
+
+@dataclass
+class TripleStats:
+    """1 つの triple の減衰カウンタ（usage / corpus は updated_at 時点の値）。"""
+    usage: float = 0.0
+    corpus: float = 0.0
+    usage_total: int = 0
+    corpus_total: int = 0
+    updated_at: float = 0.0
+    last_used_at: Optional[float] = None
+
+    def add(self, kind: str, count: int, ts: float, rate: float) -> None:
+        """ts 時点の count 件を足す（ts が updated_at より古ければその分減衰させて足す）。"""
+        if ts >= self.updated_at:
+            f = math.exp(-rate * (ts - self.updated_at))
+            self.usage *= f
+            self.corpus *= f
+            self.updated_at = ts
+            value = float(count)
+        else:
+            value = count * math.exp(-rate * (self.updated_at - ts))
+        if kind == STATS_USAGE:
+            self.usage += value
+            self.usage_total += count
+            if self.last_used_at is None or ts > self.last_used_at:
+                self.last_used_at = ts
+        else:
+            self.corpus += value
+            self.corpus_total += count
+
+    def decayed(self, now: float, rate: float) -> tuple:
+        """now 時点の (usage, corpus)。自身は書き換えない。"""
+        f = math.exp(-rate * max(0.0, now - self.updated_at))
+        return self.usage * f, self.corpus * f
+
+    def to_row(self) -> list:
+        return [self.usage, self.corpus, self.usage_total, self.corpus_total, self.updated_at, self.last_used_at]
+
+    @classmethod
+    def from_row(cls, row) -> "TripleStats":
+        usage, corpus, usage_total, corpus_total, updated_at, last_used_at = row
+        return cls(float(usage), float(corpus), int(usage_total), int(corpus_total), float(updated_at), last_used_at)
+
+
+class TripleStatsStore:
+    """
+    triple_id → TripleStats。
+    record() はバッファへの append だけを行い、集計は flush() でまとめて行う
+    （deque の append / popleft はスレッドセーフ、flush は同時に 1 つだけ走る）。
+    path を渡すと、そこに保存済みの集計があれば読み込み、save() の書き出し先にする。
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        decay_per_year: float = STATS_DECAY_PER_YEAR,
+        flush_interval: float = STATS_FLUSH_INTERVAL,
+        save_interval: float = STATS_SAVE_INTERVAL,
+        clock=time.time,
+    ):
+        self.rate = -math.log(decay_per_year) / STATS_YEAR_SECONDS
+        self.path = None if path is None else Path(path)
+        self.flush_interval = flush_interval
+        self.save_interval = save_interval
+        self._clock = clock
+        self.stats: Dict[str, TripleStats] = {}
+        self._buffer: deque = deque()
+        self._flush_lock = threading.Lock()
+        self.enabled = True
+        self.recorded = 0
+        self.flushes = 0
+        self.saves = 0
+        # 最後の save 以降に flush で変わったか
+        self.dirty = False
+        if self.path is not None and self.path.exists():
+            self.load(self.path)
+
+    def record(self, triple_ids, kind: str = STATS_USAGE, count: int = 1) -> None:
+        """triple_ids（のシーケンス）を count 回ずつ記録する（バッファに積むだけ）。"""
+        if not self.enabled or not triple_ids or count <= 0:
+            return
+        self._buffer.append((kind, triple_ids, count, self._clock()))
+
+    def take_pending(self) -> List[tuple]:
+        """
+        未集計の記録を取り出して返す（バッチワーカーが親プロセスへ渡す用）。
+        取り出した記録はこのストアには反映しない。
+        """
+        buf = self._buffer
+        return [buf.popleft() for _ in range(len(buf))]
+
+    def extend_pending(self, records) -> None:
+        """take_pending() で取り出した記録をバッファに積む（次の flush で反映する）。"""
+        self._buffer.extend(records)
+
+    def flush(self) -> int:
+        """
+        バッファを集計に反映し、反映したレコード数を返す。
+        他のスレッドが flush 中なら何もしない（そちらが拾う）。
+        """
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            buf = self._buffer
+            n = len(buf)
+            counts: Dict[str, Counter] = {STATS_USAGE: Counter(), STATS_CORPUS: Counter()}
+            last_ts = 0.0
+            for _ in range(n):
+                kind, triple_ids, count, ts = buf.popleft()
+                c = counts[kind]
+                if count == 1:
+                    c.update(triple_ids)
+                else:
+                    for triple_id in triple_ids:
+                        c[triple_id] += count
+                last_ts = max(last_ts, ts)
+
+            stats = self.stats
+            rate = self.rate
+            for kind, c in counts.items():
+                for triple_id, count in c.items():
+                    s = stats.get(triple_id)
+                    if s is None:
+                        s = stats[triple_id] = TripleStats(updated_at=last_ts)
+                    s.add(kind, count, last_ts, rate)
+            self.recorded += n
+            self.flushes += 1
+            if n:
+                self.dirty = True
+            return n
+        finally:
+            self._flush_lock.release()
+
+    def save(self, path: Optional[Path] = None) -> bool:
+        """
+        バッファを flush してから集計を JSON で書き出す（一時ファイル経由で置き換える）。
+        path も self.path も無ければ flush だけ行い False を返す。
+        """
+        self.flush()
+        path = self.path if path is None else Path(path)
+        if path is None:
+            return False
+        with self._flush_lock:
+            rows = {triple_id: s.to_row() for triple_id, s in self.stats.items()}
+            self.dirty = False
+        payload = {"version": STATS_FILE_VERSION, "saved_at": self._clock(), "stats": rows}
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        tmp.replace(path)
+        self.saves += 1
+        return True
+
+    def load(self, path: Path) -> int:
+        """save() で書き出した集計を読み込み（今の集計は置き換える）、triple 数を返す。"""
+        try:
+            with Path(path).open(encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != STATS_FILE_VERSION:
+                raise ValueError(f"unsupported version {payload.get('version')!r}")
+            stats = {triple_id: TripleStats.from_row(row) for triple_id, row in payload["stats"].items()}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[WARN] triple_stats を読み込めませんでした ({path}): {e}")
+            return 0
+        with self._flush_lock:
+            self.stats = stats
+        return len(stats)
+
+    def get(self, triple_id: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """now 時点に減衰させた値（記録が無ければ None）。"""
+        s = self.stats.get(triple_id)
+        if s is None:
+            return None
+        usage, corpus = s.decayed(self._clock() if now is None else now, self.rate)
+        return {
+            "usage": round(usage, 4),
+            "corpus": round(corpus, 4),
+            "usage_total": s.usage_total,
+            "corpus_total": s.corpus_total,
+            "last_used_at": (
+                None if s.last_used_at is None
+                else time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(s.last_used_at))
+            ),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "triples": len(self.stats),
+            "pending": len(self._buffer),
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "saves": self.saves,
+            "enabled": self.enabled,
+        }
+
+
+# ========== 表記ゆれ・誤記に強い expr_label 検索 ==========
+#
+# normalize_expr で表記ゆれ（全角/半角・大文字/小文字・カタカナ/ひらがな・空白/ハイフン）を畳み、
+# DeletionIndex（SymSpell 方式の削除辞書）で編集距離の小さいラベルを引く。
+
+# 畳み込む区切り文字（NFKC 後）。長音記号「ー」は語の一部なので残す
+_EXPR_SEPARATORS = frozenset("-‐‑‒–—―−_・･/")
+
+
+def normalize_expr(label: str) -> str:
+    """
+    expr_label の正規化キー：NFKC → casefold → カタカナをひらがなへ → 空白・ハイフン類を除去。
+    例: "Kitchen-Knife" / "ｋｉｔｃｈｅｎ knife" → "kitchenknife"、"ナイフ" → "ないふ"
+    """
+    s = unicodedata.normalize("NFKC", label).casefold()
+    out = []
+    for ch in s:
+        if ch.isspace() or ch in _EXPR_SEPARATORS:
+            continue
+        if "ァ" <= ch <= "ヶ":
+            ch = chr(ord(ch) - 0x60)
+        out.append(ch)
+    return "".join(out)
+
+
+def fuzzy_distance_for(term: str) -> int:
+    """語の長さに応じた許容編集距離（短い語ほど誤爆しやすいので厳しくする）。"""
+    n = len(term)
+    if n <= 2:
+        return 0
+    if n <= 5:
+        return 1
+    return 2
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    a と b の編集距離（隣接文字の入れ替えも 1 とする OSA 距離）。
+    max_distance を超えることが分かった時点で None を返す。
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if a == b:
+        return 0
+    prev2: Optional[List[int]] = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            v = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                v = min(v, prev2[j - 2] + 1)
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > max_distance:
+            return None
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= max_distance else None
+
+
+class DeletionIndex:
+    """
+    SymSpell 方式の削除辞書。語の先頭 prefix_length 文字から k 文字（k ≤ max_distance）を
+    削除した文字列 → 元の語 を k ごとの表に持ち、問い合わせ側も同じ削除を作って突き合わせる。
+    候補は最後に bounded_edit_distance で確かめる。語の追加は逐次行える。
+    """
+
+    def __init__(self, max_distance: int = 2, prefix_length: int = 16):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.terms = set()
+        # deletes[k]: k 文字削除した文字列 → [語]（k=0 は語の先頭部分そのもの）
+        self.deletes: List[Dict[str, List[str]]] = [defaultdict(list) for _ in range(max_distance + 1)]
+
+    @staticmethod
+    def _deletes_by_level(word: str, max_distance: int) -> List[set]:
+        levels = [{word}]
+        seen = {word}
+        for _ in range(max_distance):
+            nxt = set()
+            for w in levels[-1]:
+                for i in range(len(w)):
+                    d = w[:i] + w[i + 1:]
+                    if d not in seen:
+                        nxt.add(d)
+            seen |= nxt
+            levels.append(nxt)
+        return levels
+
+    def add(self, term: str) -> None:
+        if not term or term in self.terms:
+            return
+        self.terms.add(term)
+        for k, ds in enumerate(self._deletes_by_level(term[: self.prefix_length], self.max_distance)):
+            table = self.deletes[k]
+            for d in ds:
+                table[d].append(term)
+
+    def lookup(self, query: str, max_distance: Optional[int] = None) -> List[tuple]:
+        """query から編集距離 max_distance 以内の語を (距離, 語) の昇順で返す。"""
+        if max_distance is None:
+            max_distance = self.max_distance
+        max_distance = min(max_distance, self.max_distance)
+
+        # 距離 k の語は、問い合わせ側・語側それぞれ k 文字以内の削除で必ず一致する
+        candidates = set()
+        for ds in self._deletes_by_level(query[: self.prefix_length], max_distance):
+            for d in ds:
+                for k in range(max_distance + 1):
+                    hit = self.deletes[k].get(d)
+                    if hit:
+                        candidates.update(hit)
+
+        found = []
+        for term in candidates:
+            dist = bounded_edit_distance(query, term, max_distance)
+            if dist is not None:
+                found.append((dist, term))
+        found.sort()
+        return found
+
+
+# ========== カテゴリ階層の推移閉包 ==========
+#
+# core:category-001（子 → 親）と core:category-of-001（親 → 子）から、
+# core ごとの祖先・子孫集合をビット集合（Python の int）で持つ。
+# 祖先判定は 1 ビットの参照、「X の下位分類すべて」は立っているビットの列挙で済む。
+
+# (関係, 向きを反転するか)：反転しない関係は src が子・dst が親
+CATEGORY_RELS = (("core:category-001", False), ("core:category-of-001", True))
+
+
+def _iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class CategoryClosure:
+    """
+    分類階層の推移閉包。nodes[i] のビット i を使い、
+    anc[i] = 祖先のビット集合、desc[i] = 子孫のビット集合。
+    循環（A ⊂ B ⊂ A）があれば、その中の core は互いに祖先かつ子孫になる。
+    edges は構築に使った (子, 親) の集合で、ロード時の突き合わせに使う。
+    """
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.nodes: List[str] = []
+        self.anc: List[int] = []
+        self.desc: List[int] = []
+        self.edges: set = set()
+
+    def _node(self, core_id: str) -> int:
+        i = self.index.get(core_id)
+        if i is None:
+            i = self.index[core_id] = len(self.nodes)
+            self.nodes.append(core_id)
+            self.anc.append(0)
+            self.desc.append(0)
+        return i
+
+    @classmethod
+    def build(cls, edges) -> "CategoryClosure":
+        """
+        (子, 親) の列から一括構築する。強連結成分をまとめてから
+        祖先方向・子孫方向それぞれ 1 回ずつ成分グラフをたどる。
+        """
+        closure = cls()
+        parents: Dict[int, List[int]] = defaultdict(list)
+        children: Dict[int, List[int]] = defaultdict(list)
+        for child, parent in edges:
+            if (child, parent) in closure.edges:
+                continue
+            closure.edges.add((child, parent))
+            c, p = closure._node(child), closure._node(parent)
+            parents[c].append(p)
+            children[p].append(c)
+        n = len(closure.nodes)
+        closure.anc = _closure_masks(n, parents)
+        closure.desc = _closure_masks(n, children)
+        return closure
+
+    def add_edge(self, child: str, parent: str) -> None:
+        """辺 child ⊂ parent を 1 本足し、影響のある core の祖先・子孫だけを更新する。"""
+        if (child, parent) in self.edges:
+            return
+        self.edges.add((child, parent))
+        c, p = self._node(child), self._node(parent)
+        if (self.anc[c] >> p) & 1:
+            # すでに祖先なら、推移閉包は変わらない
+            return
+        gained_anc = self.anc[p] | (1 << p)
+        gained_desc = self.desc[c] | (1 << c)
+        for i in _iter_bits(gained_desc):
+            self.anc[i] |= gained_anc
+        for i in _iter_bits(gained_anc):
+            self.desc[i] |= gained_desc
+
+    def is_ancestor(self, ancestor_id: str, core_id: str) -> bool:
+        a = self.index.get(ancestor_id)
+        c = self.index.get(core_id)
+        if a is None or c is None:
+            return False
+        return bool((self.anc[c] >> a) & 1)
+
+    def ancestors(self, core_id: str) -> List[str]:
+        i = self.index.get(core_id)
+        return [] if i is None else [self.nodes[j] for j in _iter_bits(self.anc[i])]
+
+    def descendants(self, core_id: str) -> List[str]:
+        i = self.index.get(core_id)
+        return [] if i is None else [self.nodes[j] for j in _iter_bits(self.desc[i])]
+
+    def matches(self, edges) -> bool:
+        """閉包が edges（(子, 親) の列）から作ったものと一致するか。"""
+        return self.edges == set(edges)
+
+
+def _closure_masks(n: int, succ: Dict[int, List[int]]) -> List[int]:
+    """
+    各ノードから succ をたどって届くノードのビット集合（自分自身は循環上にあるときだけ含む）。
+    反復版 Tarjan で強連結成分を求め、成分は「届く側が先」の順に出てくるのでその順に合成する。
+    """
+    masks = [0] * n
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            v, pos = work.pop()
+            if pos == 0:
+                index[v] = low[v] = counter
+                counter += 1
+                stack.append(v)
+                on_stack[v] = True
+            nexts = succ.get(v, ())
+            if pos < len(nexts):
+                work.append((v, pos + 1))
+                w = nexts[pos]
+                if index[w] == -1:
+                    work.append((w, 0))
+                elif on_stack[w]:
+                    low[v] = min(low[v], index[w])
+                continue
+            # v の後続をすべて見終わった
+            for w in nexts:
+                if on_stack[w] and index[w] > index[v]:
+                    low[v] = min(low[v], low[w])
+            if low[v] == index[v]:
+                comp = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp.append(w)
+                    if w == v:
+                        break
+                comp_bits = 0
+                for w in comp:
+                    comp_bits |= 1 << w
+                mask = 0
+                cyclic = len(comp) > 1
+                for w in comp:
+                    for x in succ.get(w, ()):
+                        if (comp_bits >> x) & 1:
+                            cyclic = True
+                        else:
+                            mask |= masks[x] | (1 << x)
+                if cyclic:
+                    mask |= comp_bits
+                for w in comp:
+                    masks[w] = mask
+    return masks
+
+
 # ========== インデックス構築 & OS本体 ==========
 
+def _list_dict():
+    # defaultdict のファクトリ（スナップショットで pickle できるよう lambda にしない）
+    return defaultdict(list)
+
+
+class TripleIndex:
+    """
+    meaning_triples の SPO ハッシュインデックス。
+    値は self.triples 上の行番号（昇順）のリスト。
+    - src / rel / dst の単独キー
+    - (src, rel) / (rel, dst) の複合キー
+    - adjacency_rels に含まれる関係だけの core ごとの隣接リスト
+      （out_adj[src][rel] / in_adj[dst][rel]、9スロットビュー用）
+    - 条件値の転置インデックス by_cond[(key, value)]（例: ("domain", "cooking")）
+    """
+
+    def __init__(self, adjacency_rels=()):
+        self.adjacency_rels = frozenset(adjacency_rels)
+        self.out_adj: Dict[str, Dict[str, List[int]]] = defaultdict(_list_dict)
+        self.in_adj: Dict[str, Dict[str, List[int]]] = defaultdict(_list_dict)
+        self.by_src: Dict[str, List[int]] = defaultdict(list)
+        self.by_rel: Dict[str, List[int]] = defaultdict(list)
+        self.by_dst: Dict[str, List[int]] = defaultdict(list)
+        self.by_src_rel: Dict[tuple, List[int]] = defaultdict(list)
+        self.by_rel_dst: Dict[tuple, List[int]] = defaultdict(list)
+        self.by_cond: Dict[tuple, List[int]] = defaultdict(list)
+
+    def add(self, row: int, t: Triple, compiled: Dict[str, Any]) -> None:
+        self.by_src[t.src].append(row)
+        self.by_rel[t.rel].append(row)
+        self.by_dst[t.dst].append(row)
+        self.by_src_rel[(t.src, t.rel)].append(row)
+        self.by_rel_dst[(t.rel, t.dst)].append(row)
+        if t.rel in self.adjacency_rels:
+            self.out_adj[t.src][t.rel].append(row)
+            self.in_adj[t.dst][t.rel].append(row)
+        for k in INDEXED_CONDITION_KEYS:
+            values = compiled.get(k)
+            if isinstance(values, frozenset):
+                for v in values:
+                    self.by_cond[(k, v)].append(row)
+
+    def merge(self, other: "TripleIndex", offset: int) -> None:
+        """別シャードの部分インデックスを、行番号を offset ずらして取り込む。"""
+        for name in ("by_src", "by_rel", "by_dst", "by_src_rel", "by_rel_dst", "by_cond"):
+            mine = getattr(self, name)
+            for key, rows in getattr(other, name).items():
+                mine[key].extend(r + offset for r in rows)
+        for mine, theirs in ((self.out_adj, other.out_adj), (self.in_adj, other.in_adj)):
+            for core, by_rel in theirs.items():
+                for rel, rows in by_rel.items():
+                    mine[core][rel].extend(r + offset for r in rows)
+
+    def condition_postings(self, key: str, values) -> Optional[List[List[int]]]:
+        """
+        条件 key の値ごとの行リスト（どれかに入っていれば一致）。転置インデックスの無いキーは None。
+        和集合は作らないので、長さの合計で候補の大きさを見積もってから merge_postings を呼ぶこと。
+        """
+        if key not in INDEXED_CONDITION_KEYS:
+            return None
+        values = values if isinstance(values, (list, tuple)) else [values]
+        return [self.by_cond.get((key, _freeze_value(v)), []) for v in values]
+
+    @staticmethod
+    def merge_postings(postings: List[List[int]]) -> List[int]:
+        """condition_postings の行リストの和集合（昇順）。"""
+        if len(postings) == 1:
+            return postings[0]
+        return sorted(set().union(*postings))
+
+    def candidates(
+        self,
+        src: Optional[str] = None,
+        rel: Optional[str] = None,
+        dst: Optional[str] = None,
+    ) -> Optional[List[int]]:
+        """
+        指定されたキーから使えるインデックスをすべて引き、いちばん短い行リストを返す。
+        キーが 1 つも無いときは None（= 全件走査が必要）。
+        """
+        lists = []
+        if src and rel:
+            lists.append(self.by_src_rel.get((src, rel), []))
+        if rel and dst:
+            lists.append(self.by_rel_dst.get((rel, dst), []))
+        if src:
+            lists.append(self.by_src.get(src, []))
+        if rel:
+            lists.append(self.by_rel.get(rel, []))
+        if dst:
+            lists.append(self.by_dst.get(dst, []))
+        if not lists:
+            return None
+        return min(lists, key=len)
+
+
 class MiniMeaningOS:
-    def __init__(self):
-        self.cores = load_core_concepts(CORE_CSV)
+    def __init__(
+        self,
+        data_dir: Optional[Path] = None,
+        compact: bool = False,
+        backend: str = "python",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        progress=None,
+        workers: int = 0,
+        query_cache_size: int = 4096,
+        query_cache_ttl: Optional[float] = None,
+    ):
+        """
+        data_dir: CSV のあるディレクトリ（省略時は DATA_DIR）
+        compact: True なら triple を CompactTripleTable に格納し、
+                 ID の整数コード化・conditions の共有でメモリを節約する
+        backend: "python"（ハッシュインデックス）/ "columnar"（NumPy の列とブールマスク）
+        chunk_size: CSV を何行ずつ読んでインデックスへ流すか
+        progress: progress(table_name, rows_loaded) を各チャンク後に呼ぶコールバック
+        workers: 2 以上ならプロセスプールで各テーブル・各シャードを並列に parse する
+        query_cache_size / query_cache_ttl: 質問応答キャッシュの件数上限と有効秒数（None なら無期限）
+        """
+        if backend not in ("python", "columnar"):
+            raise ValueError(f"unknown backend: {backend!r}")
+        data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+        self.data_dir: Optional[str] = str(data_dir)
+        self.source_hash = source_hash(data_dir)
+        files = find_table_files(data_dir)
+
+        self.cores: Dict[str, Dict[str, Any]] = {}
+
+        self.compact = compact
+        if compact:
+            self.id_table = IdTable()
+            self.cond_pool = ConditionPool()
+            self.triples = CompactTripleTable(self.id_table, self.cond_pool)
+        else:
+            self.triples: List[Triple] = []
 
-        triples_path = TRIPLES_WITH_REV if TRIPLES_WITH_REV.exists() else TRIPLES_CSV
-        print(f"[INFO] load triples from {triples_path.name}")
-        self.triples = load_triples(triples_path)
-        self.exprs = load_expr_links(EXPR_CSV)
+        # SPO インデックス + 条件の転置インデックス
+        # triple_conds[row] は self.triples[row] のコンパイル済み conditions
+        self.triple_index = TripleIndex(adjacency_rels=self.REL_TO_SLOT)
+        self.triple_conds: List[Dict[str, Any]] = []
 
-        # evidence
-        self.evidences = load_triple_evidence(TRIPLE_EVIDENCE_CSV)
-        self.evidence_index: Dict[str, List[TripleEvidence]] = defaultdict(list)
-        for ev in self.evidences:
-            if ev.triple_id:
-                self.evidence_index[ev.triple_id].append(ev)
+        # 列指向バックエンド（compact モードなら ID 表を共有する）
+        self.backend = backend
+        self.columnar: Optional[ColumnarTripleStore] = None
+        if backend == "columnar":
+            self.columnar = ColumnarTripleStore(ids=self.id_table if compact else None)
 
+        self.evidences: List[TripleEvidence] = []
+        self.evidence_index: Dict[str, List[TripleEvidence]] = defaultdict(list)
+        # triple_id → EvidenceSummary（evidence の追加時に増分更新）
+        self.evidence_summary: Dict[str, EvidenceSummary] = {}
+        self.exprs: List[ExprLink] = []
         # expr_label → [ExprLink]
         self.expr_index: Dict[str, List[ExprLink]] = defaultdict(list)
-        for e in self.exprs:
-            self.expr_index[e.expr_label].append(e)
-
         # core_id → [ExprLink]
         self.labels_by_core: Dict[str, List[ExprLink]] = defaultdict(list)
-        for e in self.exprs:
-            self.labels_by_core[e.core_id].append(e)
+        # 正規化キー → [expr_label]、正規化キーの削除辞書（表記ゆれ・誤記の吸収用）
+        self.norm_index: Dict[str, List[str]] = defaultdict(list)
+        self.expr_fuzzy = DeletionIndex()
+        # (core_id, lang) → freq 降順のラベル列 / 表示用ラベル（フォールバック解決済み）
+        self.ranked_labels: Dict[tuple, List[str]] = {}
+        self.display_labels: Dict[tuple, List[str]] = {}
+
+        # データ世代：triples / expr_links / evidence が変わるたびに進める
+        self.generation = 0
+        # triple_stats の保存先（前回までの集計があれば _init_runtime_state で読み込む）
+        self.triple_stats_path: Optional[str] = str(data_dir / TRIPLE_STATS_PATH.name)
+        self._init_runtime_state(query_cache_size, query_cache_ttl)
+
+        print(f"[INFO] load triples from {', '.join(p.name for p in files['triples'])}")
+        if not files["evidence"]:
+            print(f"[INFO] triple_evidence.csv not found, skip evidence layer.")
+
+        if workers and workers > 1:
+            self._load_parallel(files, workers, progress)
+        else:
+            self._load_streaming(files, chunk_size, progress)
+        self._rebuild_label_tables(self.labels_by_core.keys())
+        self.subject_matcher = SubjectMatcher(self.expr_index.keys(), INTENT_CUES)
+        self.category_closure = CategoryClosure.build(self._category_edges())
+
+        # add_triples の追記ログ（あれば CSV の後に再生する）
+        # triple_log_offset: メモリに反映済みのログのバイト長（スナップショットからはこの続きを再生する）
+        self.triple_log_path: Optional[str] = str(data_dir / TRIPLE_LOG.name)
+        self.triple_log_offset = 0
+        if Path(self.triple_log_path).exists():
+            self.replay_triple_log(self.triple_log_path)
+
+    def _load_streaming(self, files: Dict[str, List[Path]], chunk_size: int, progress) -> None:
+        """
+        各テーブルをチャンク単位で読み、そのままインデックスへ流し込む
+        （表全体の一時リストは作らない）。
+        """
+        for path in files["cores"]:
+            self.cores.update(load_core_concepts(path))
+
+        for path in files["triples"]:
+            for chunk in iter_triples(path, chunk_size):
+                for t in chunk:
+                    self._ingest_triple(t)
+                if progress is not None:
+                    progress("triples", len(self.triples))
+
+        for path in files["evidence"]:
+            for chunk in iter_triple_evidence(path, chunk_size):
+                for ev in chunk:
+                    self._ingest_evidence(ev)
+                if progress is not None:
+                    progress("evidence", len(self.evidences))
+
+        for path in files["exprs"]:
+            for chunk in iter_expr_links(path, chunk_size):
+                for e in chunk:
+                    self._ingest_expr_link(e)
+                if progress is not None:
+                    progress("expr_links", len(self.exprs))
+
+    def _load_parallel(self, files: Dict[str, List[Path]], workers: int, progress) -> None:
+        """
+        4 テーブルの全シャードをまとめてプロセスプールに投げ、
+        シャード順に結果（レコード + 部分インデックス）をマージする。
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                kind: [
+                    pool.submit(_load_shard, kind, path, tuple(self.REL_TO_SLOT))
+                    for path in paths
+                ]
+                for kind, paths in files.items()
+            }
+
+            for fut in futures["cores"]:
+                self.cores.update(fut.result())
+
+            for fut in futures["triples"]:
+                records, compiled, index = fut.result()
+                self._merge_triple_shard(records, compiled, index)
+                if progress is not None:
+                    progress("triples", len(self.triples))
+
+            for fut in futures["evidence"]:
+                for ev in fut.result():
+                    self._ingest_evidence(ev)
+                if progress is not None:
+                    progress("evidence", len(self.evidences))
+
+            for fut in futures["exprs"]:
+                for e in fut.result():
+                    self._ingest_expr_link(e)
+                if progress is not None:
+                    progress("expr_links", len(self.exprs))
+
+    def _merge_triple_shard(
+        self,
+        records: List[Triple],
+        compiled: List[Dict[str, Any]],
+        index: TripleIndex,
+    ) -> None:
+        """ワーカーが parse したシャードを格納し、部分インデックスを行番号をずらしてマージする。"""
+        offset = len(self.triples)
+        for t, c in zip(records, compiled):
+            if self.compact:
+                row = self.triples.append(t)
+                c = self.triples.compiled_conditions(row)
+            else:
+                self.triples.append(t)
+            self.triple_conds.append(c)
+            if self.columnar is not None:
+                self.columnar.append(t, c)
+        self.triple_index.merge(index, offset)
+
+    # ----- 1 行ずつの取り込み（ロード時と追加時で共通） -----
+
+    def _ingest_triple(self, t: Triple) -> int:
+        """triple を格納し、全インデックスに登録して行番号を返す。"""
+        if self.compact:
+            row = self.triples.append(t)
+            compiled = self.triples.compiled_conditions(row)
+            # インデックスのキーも IdTable の intern 済み文字列を使う
+            t = self.triples[row]
+        else:
+            row = len(self.triples)
+            self.triples.append(t)
+            compiled = self._compile_shared(t.conditions)
+        self.triple_conds.append(compiled)
+        self.triple_index.add(row, t, compiled)
+        if self.columnar is not None:
+            self.columnar.append(t, compiled)
+        return row
+
+    def _compile_shared(self, conditions: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        共有された FrozenConditions はオブジェクトごとに 1 回だけコンパイルする。
+        （メモには元オブジェクトも持たせ、id の再利用で取り違えないようにする）
+        """
+        if not isinstance(conditions, FrozenConditions):
+            return compile_conditions(conditions)
+        hit = self._compiled_memo.get(id(conditions))
+        if hit is None or hit[0] is not conditions:
+            hit = self._compiled_memo[id(conditions)] = (conditions, compile_conditions(conditions))
+        return hit[1]
+
+    def _ingest_evidence(self, ev: TripleEvidence) -> None:
+        if self.compact:
+            ev = compact_evidence(ev)
+        self.evidences.append(ev)
+        if ev.triple_id:
+            self.evidence_index[ev.triple_id].append(ev)
+            summary = self.evidence_summary.get(ev.triple_id)
+            if summary is None:
+                summary = self.evidence_summary[ev.triple_id] = EvidenceSummary()
+            summary.add(ev)
+
+    def _ingest_expr_link(self, e: ExprLink) -> None:
+        """expr_link を登録する（ラベル表の再構築は呼び出し側で行う）。"""
+        if self.compact:
+            e = compact_expr_link(e, self.cond_pool)
+        self.exprs.append(e)
+        if e.expr_label not in self.expr_index:
+            key = normalize_expr(e.expr_label)
+            self.norm_index[key].append(e.expr_label)
+            self.expr_fuzzy.add(key)
+        self.expr_index[e.expr_label].append(e)
+        self.labels_by_core[e.core_id].append(e)
+
+    # スナップショットに含めない（ロード後に作り直す）実行時の状態
+    RUNTIME_STATE = ("_compiled_memo", "query_cache", "reach_cache", "triple_stats", "_triple_ids")
+
+    def _init_runtime_state(self, query_cache_size: int = 4096, query_cache_ttl: Optional[float] = None) -> None:
+        self._compiled_memo: Dict[int, tuple] = {}
+        self.query_cache = QueryCache(maxsize=query_cache_size, ttl=query_cache_ttl)
+        # reachable() の結果（core ごとの到達集合）
+        self.reach_cache = QueryCache(maxsize=1024)
+        # 使用回数などの統計（triple_stats_path に保存した前回までの集計から続ける）
+        self.triple_stats = TripleStatsStore(self.triple_stats_path)
+        # 登録済み triple_id の集合（add_triples の重複検査用、初回に作る）
+        self._triple_ids: Optional[set] = None
+
+    # ----- スナップショット -----
+
+    @classmethod
+    def from_snapshot(cls, path: Path = SNAPSHOT_PATH) -> "MiniMeaningOS":
+        """
+        compile_snapshot で作ったスナップショットから起動する。
+        CSV の parse / JSON 補正 / インデックス構築をすべて省略する。
+        追記ログがスナップショットの後に伸びていれば、その続き（triple_log_offset 以降）を再生する。
+        """
+        state = load_snapshot(path)
+        obj = cls.__new__(cls)
+        obj.__dict__.update(state)
+        # 分類の推移閉包は triple と突き合わせ、食い違えば作り直す
+        if not obj.category_closure.matches(obj._category_edges()):
+            print("[WARN] snapshot の分類閉包が triple と一致しないため再構築します")
+            obj.category_closure = CategoryClosure.build(obj._category_edges())
+        obj._init_runtime_state()
+
+        log_path = obj.triple_log_path
+        if log_path and Path(log_path).exists():
+            start = obj.triple_log_offset
+            if Path(log_path).stat().st_size < start:
+                print(f"[WARN] {log_path} が snapshot 作成時より短いため、頭から再生します")
+                start = 0
+            obj.replay_triple_log(log_path, start)
+        return obj
+
+    def save_snapshot(self, path: Path = SNAPSHOT_PATH) -> None:
+        """
+        今の状態をスナップショットに書く。source_hash は書き出す時点の data_dir から計算し直す
+        （ロード後に add_triples で追記ログが伸びていても、snapshot_is_fresh が正しく判定できるように）。
+        """
+        self._category_closure()
+        if self.data_dir is not None and Path(self.data_dir).is_dir():
+            self.source_hash = source_hash(Path(self.data_dir))
+        state = {k: v for k, v in self.__dict__.items() if k not in self.RUNTIME_STATE}
+        write_snapshot(state, self.source_hash, path)
+
+    # ----- 質問応答キャッシュ -----
+
+    def cached_answer(self, key, compute):
+        """
+        parse 済みクエリの key に対する応答を、現在のデータ世代でキャッシュして返す。
+        """
+        return self.query_cache.get_or_compute(key, self.generation, compute)
+
+    def query_cache_stats(self) -> Dict[str, Any]:
+        return self.query_cache.stats()
+
+    # ----- expr_links の追加とラベル表の再構築 -----
+
+    DISPLAY_LANGS = ("ja", "en")
+
+    def add_expr_links(self, exprs: List[ExprLink]) -> None:
+        """
+        expr_links を追加し、影響を受ける core のラベル表だけを作り直す。
+        """
+        touched = set()
+        for e in exprs:
+            self._ingest_expr_link(e)
+            touched.add(e.core_id)
+        self._rebuild_label_tables(touched)
+        self.subject_matcher.add_labels(e.expr_label for e in exprs)
+        self.generation += 1
+
+    def add_evidence(self, evidences: List[TripleEvidence]) -> None:
+        """triple_evidence を追加する。"""
+        for ev in evidences:
+            self._ingest_evidence(ev)
+        self.generation += 1
+
+    # ----- triple の追加（逆方向の自動生成と追記ログ） -----
+
+    def add_triples(self, triples: List[Triple], log: bool = True, fsync: bool = True) -> List[Triple]:
+        """
+        順方向の triple を追加し、関係ペア表から逆方向の triple を生成して一緒に登録する（spec §3.4）。
+        - 先に全件を検証し、1 件でも不正ならログにもメモリにも何も書かずに ValueError
+        - log=True なら、反映前にバッチを追記ログへ書く（fsync=False なら OS のバッファまで）。
+          反映の途中で例外が出たら、ログを書く前の長さに戻してから例外を送る
+        - インデックス（SPO・条件・隣接リスト・列指向）はその場で増分更新し、
+          generation を進めて応答キャッシュと到達集合キャッシュを捨てる
+        - 分類の推移閉包は辺が少なければ増分更新、多ければ次に使うときに作り直す
+        戻り値: 登録した triple（順方向, 逆方向, 順方向, … の順）
+        """
+        batch = self._validate_new_triples(triples)
+        if not batch:
+            return []
+        span = None
+        if log and self.triple_log_path:
+            span = append_triple_log(self.triple_log_path, batch[::2], fsync=fsync)
+
+        known = self._known_triple_ids()
+        category_flip = dict(CATEGORY_RELS)
+        category_edges = []
+        try:
+            for t in batch:
+                self._ingest_triple(t)
+                known.add(t.triple_id)
+                flip = category_flip.get(t.rel)
+                if flip is not None and t.polarity == "positive":
+                    category_edges.append((t.dst, t.src) if flip else (t.src, t.dst))
+        except BaseException:
+            if span is not None:
+                truncate_triple_log(self.triple_log_path, span[0])
+            # 途中まで入ったインデックスで古い応答を返さないよう、キャッシュは捨てる
+            self.generation += 1
+            raise
+        if span is not None:
+            self.triple_log_offset = span[1]
+
+        # 分類の辺が多いバッチは 1 本ずつ足さず、閉包を捨てて次に使うときに作り直す
+        closure = self.category_closure
+        if closure is not None:
+            if len(category_edges) > self.CLOSURE_INCREMENTAL_EDGES:
+                self.category_closure = None
+            else:
+                for child, parent in category_edges:
+                    closure.add_edge(child, parent)
+        self.generation += 1
+        return batch
+
+    # add_triples 1 回でこの本数までの分類の辺なら、推移閉包をその場で増分更新する
+    CLOSURE_INCREMENTAL_EDGES = 64
+
+    def _known_triple_ids(self) -> set:
+        if self._triple_ids is None:
+            ids = self.triples.triple_ids if self.compact else (t.triple_id for t in self.triples)
+            self._triple_ids = set(ids)
+        return self._triple_ids
+
+    def _validate_new_triples(self, triples: List[Triple]) -> List[Triple]:
+        """
+        追加する順方向 triple を検証し、[順方向, 逆方向, …] にして返す。
+        src / dst は登録済みの core でなければならない。
+        created_at が空なら今の時刻を入れる（ログにもその値を残す）。
+        conditions は FrozenConditions にして、順方向と逆方向で同じオブジェクトを共有させる。
+        """
+        known = self._known_triple_ids()
+        seen: set = set()
+        now = time.strftime("%Y-%m-%dT%H:%M:%S")
+        out: List[Triple] = []
+        for t in triples:
+            where = f"triple {t.triple_id!r}"
+            if not t.triple_id:
+                raise ValueError("triple_id is required")
+            if not (t.src and t.rel and t.dst):
+                raise ValueError(f"{where}: src / rel / dst are required")
+            for core_id in (t.src, t.dst):
+                if core_id not in self.cores:
+                    raise ValueError(f"{where}: unknown core {core_id}")
+            if t.is_reverse or t.reverse_of:
+                raise ValueError(f"{where}: reverse triples are generated by the OS; add the forward one")
+            if t.rel not in REVERSE_RELATIONS:
+                raise ValueError(f"{where}: no reverse relation registered for {t.rel}")
+            core = self.cores.get(t.rel)
+            if core is not None and not core["can_be_relation"]:
+                raise ValueError(f"{where}: {t.rel} is not a relation concept")
+            if t.polarity not in TRIPLE_POLARITIES:
+                raise ValueError(f"{where}: polarity must be one of {TRIPLE_POLARITIES}")
+            if t.status not in TRIPLE_STATUSES:
+                raise ValueError(f"{where}: status must be one of {TRIPLE_STATUSES}")
+            if not isinstance(t.conditions, dict):
+                raise ValueError(f"{where}: conditions must be a dict")
+            conditions = t.conditions if isinstance(t.conditions, FrozenConditions) else _freeze_json(t.conditions)
+            try:
+                compile_conditions(conditions)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{where}: invalid conditions ({e})") from None
+
+            if not t.created_at or conditions is not t.conditions:
+                t = replace(t, conditions=conditions, created_at=t.created_at or now)
+            rev = make_reverse_triple(t)
+            for triple_id in (t.triple_id, rev.triple_id):
+                if triple_id in known or triple_id in seen:
+                    raise ValueError(f"{where}: triple_id {triple_id!r} already exists")
+                seen.add(triple_id)
+            out.append(t)
+            out.append(rev)
+        return out
+
+    def replay_triple_log(self, path, start: int = 0) -> int:
+        """
+        追記ログの start バイト目以降を再生する（ログには書き戻さない）。再生した順方向 triple の件数を返す。
+        既に登録済みの triple を含むバッチ（ログを CSV に取り込んだ後など）は警告して飛ばす。
+        読み終えた位置を triple_log_offset に残す。
+        """
+        n = 0
+        self.triple_log_offset = start
+        for pos, batch in iter_triple_log(path, start):
+            self.triple_log_offset = pos
+            try:
+                self.add_triples(batch, log=False)
+            except ValueError as e:
+                print(f"[WARN] {path}: バッチを飛ばします ({e})")
+                continue
+            n += len(batch)
+        if n:
+            print(f"[INFO] replayed {n} triples from {Path(path).name}")
+        return n
+
+    def _rebuild_label_tables(self, core_ids) -> None:
+        """
+        core ごとに (core_id, lang) → freq 降順ラベル列 を作る（lang=None は全言語）。
+        あわせて render_profile 用のフォールバック（lang → ja → en → core_id）も解決しておく。
+        """
+        for core_id in core_ids:
+            by_lang: Dict[Optional[str], list] = defaultdict(list)
+            for e in self.labels_by_core.get(core_id, []):
+                scored = (float(e.conditions.get("freq", 1.0)), e.expr_label)
+                by_lang[None].append(scored)
+                by_lang[e.conditions.get("lang")].append(scored)
+
+            for lang, scored in by_lang.items():
+                scored.sort(reverse=True)
+                self.ranked_labels[(core_id, lang)] = [label for _, label in scored]
+
+            for lang in set(self.DISPLAY_LANGS) | {k for k in by_lang if k is not None}:
+                self.display_labels[(core_id, lang)] = self._resolve_display_labels(core_id, lang)
 
     # ----- expr_label から core 候補を引く -----
 
     def find_cores_by_expr(self, label: str, lang: Optional[str] = None) -> List[str]:
-        candidates = self.expr_index.get(label, [])
+        """
+        expr_label → core_id 候補。
+        完全一致で見つからなければ正規化キー（表記ゆれ）で、それでも無ければ
+        編集距離の近いラベル（誤記）で引く。誤記の場合は最も近い距離の候補だけを返す。
+        """
+        result = self._cores_for_labels((label,), lang)
+        if result:
+            return result
+
+        key = normalize_expr(label)
+        result = self._cores_for_labels(self.norm_index.get(key, ()), lang)
+        if result:
+            return result
+
+        # 距離 1, 2, … と広げ、候補が出た距離で止める
+        for k in range(1, fuzzy_distance_for(key) + 1):
+            terms = [term for dist, term in self.expr_fuzzy.lookup(key, k) if dist == k]
+            result = self._cores_for_labels(
+                [label for term in terms for label in self.norm_index.get(term, ())], lang
+            )
+            if result:
+                return result
+        return []
+
+    def _cores_for_labels(self, labels, lang: Optional[str]) -> List[str]:
         result = []
-        for e in candidates:
-            if lang is not None:
-                if e.conditions.get("lang") != lang:
-                    continue
-            result.append(e.core_id)
+        for label in labels:
+            for e in self.expr_index.get(label, []):
+                if lang is not None:
+                    if e.conditions.get("lang") != lang:
+                        continue
+                result.append(e.core_id)
         return sorted(set(result))
 
+    def suggest_exprs(self, label: str, max_distance: Optional[int] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        label に近い expr_label の候補（UI の「もしかして」用）。
+        戻り値: [{"expr_label", "distance"}]（距離の昇順）
+        """
+        key = normalize_expr(label)
+        if max_distance is None:
+            max_distance = fuzzy_distance_for(key)
+        out = []
+        for dist, term in self.expr_fuzzy.lookup(key, max_distance):
+            for expr_label in self.norm_index.get(term, ()):
+                out.append({"expr_label": expr_label, "distance": dist})
+        return out[:limit]
+
     # ----- core_id → ラベル候補 -----
 
     def labels_for_core(
@@ -292,30 +2479,124 @@ class MiniMeaningOS:
         lang: Optional[str] = None,
         top_k: int = 3,
     ) -> List[str]:
-        exprs = self.labels_by_core.get(core_id, [])
-        scored = []
-        for e in exprs:
-            if lang is not None and e.conditions.get("lang") != lang:
+        return self.ranked_labels.get((core_id, lang), [])[:top_k]
+
+    # ----- meaning_triples 検索 -----
+
+    def find_triples(
+        self,
+        src: Optional[str] = None,
+        rel: Optional[str] = None,
+        dst: Optional[str] = None,
+        domain: Optional[str] = None,
+        polarity: str = "positive",
+        conditions: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        min_trust: Optional[float] = None,
+    ) -> List[Triple]:
+        """
+        conditions: domain 以外の条件（例: {"region": "JP", "era": ["Heisei"]}）。
+                    cond_match と同じく AND、値はどれか 1 つ一致すれば OK。
+        context: 問い合わせの文脈（resolve_context 参照、既定の domain は付かない）。
+                 conditions / domain と重なるキーはそちらが優先。
+        min_trust: evidence の trust がこれ未満の triple を外し、trust の降順に並べる
+                   （context の min_trust より優先）。
+        """
+        wanted_conds: Dict[str, Any] = resolve_context(context, defaults={}) if context else {}
+        wanted_conds.update(conditions or {})
+        if domain:
+            wanted_conds["domain"] = [domain]
+        if min_trust is None:
+            min_trust = context_options(context).get("min_trust")
+        found = [self.triples[row] for row in self._query_rows(src, rel, dst, wanted_conds, polarity)]
+        if min_trust is not None:
+            found = self.rank_by_trust(found, min_trust)
+        if found:
+            self.triple_stats.record([t.triple_id for t in found])
+        return found
+
+    def _query_rows(
+        self,
+        src: Optional[str],
+        rel: Optional[str],
+        dst: Optional[str],
+        wanted_conds: Dict[str, Any],
+        polarity: str,
+    ) -> List[int]:
+        """
+        SPO インデックスと条件の転置インデックスのうち、いちばん短い行リストを起点に
+        残りの条件を突き合わせる（= posting list の交差）。
+        SPO はフィールド比較、条件はコンパイル済み述語で O(1) に判定する。
+        backend="columnar" のときは、SPO の候補が十分短い点検索以外を
+        列のブールマスクで一括判定する。
+        """
+        spo_rows = self.triple_index.candidates(src=src, rel=rel, dst=dst)
+        if self.columnar is not None and (
+            spo_rows is None or len(spo_rows) > self.COLUMNAR_MIN_ROWS
+        ):
+            return self._query_rows_columnar(src, rel, dst, wanted_conds, polarity)
+
+        # 複数値の条件は、長さの合計（和集合の上限）がその時点の最短より短いときだけ和集合を作る
+        best = spo_rows
+        for k, v in wanted_conds.items():
+            if v is None:
+                continue
+            postings = self.triple_index.condition_postings(k, v)
+            if postings is None:
+                continue
+            if best is None or sum(map(len, postings)) < len(best):
+                best = self.triple_index.merge_postings(postings)
+
+        rows = best if best is not None else range(len(self.triples))
+
+        pred = compile_wanted(wanted_conds)
+        triples = self.triples
+        triple_conds = self.triple_conds
+        out = []
+        for row in rows:
+            t = triples[row]
+            if polarity and t.polarity != polarity:
+                continue
+            if src and t.src != src:
+                continue
+            if rel and t.rel != rel:
+                continue
+            if dst and t.dst != dst:
+                continue
+            if pred is not None and not pred(triple_conds[row]):
                 continue
-            freq = float(e.conditions.get("freq", 1.0))
-            scored.append((freq, e.expr_label))
-        scored.sort(reverse=True)
-        return [label for _, label in scored[:top_k]]
+            out.append(row)
+        return out
 
-    # ----- meaning_triples 検索 -----
+    # columnar バックエンドでも、候補がこれ以下ならハッシュインデックス側で処理する
+    COLUMNAR_MIN_ROWS = 256
 
-    def find_triples(
+    def _query_rows_columnar(
         self,
-        src: Optional[str] = None,
-        rel: Optional[str] = None,
-        dst: Optional[str] = None,
-        domain: Optional[str] = None,
-        polarity: str = "positive",
+        src: Optional[str],
+        rel: Optional[str],
+        dst: Optional[str],
+        wanted_conds: Dict[str, Any],
+        polarity: str,
+    ) -> List[int]:
+        rows, rest = self.columnar.rows(src, rel, dst, wanted_conds, polarity)
+        pred = compile_wanted(rest)
+        if pred is None:
+            return rows.tolist()
+        triple_conds = self.triple_conds
+        return [row for row in rows.tolist() if pred(triple_conds[row])]
+
+    def _scan_triples(
+        self,
+        src: Optional[str],
+        rel: Optional[str],
+        dst: Optional[str],
+        wanted_conds: Dict[str, Any],
+        polarity: str,
     ) -> List[Triple]:
-        wanted_conds: Dict[str, Any] = {}
-        if domain:
-            wanted_conds["domain"] = [domain]
-
+        """
+        インデックスもコンパイル済み条件も使わない全件走査（ベンチマークでの比較用）。
+        """
         out = []
         for t in self.triples:
             if polarity and t.polarity != polarity:
@@ -333,7 +2614,57 @@ class MiniMeaningOS:
 
     # ----- evidence 取得 -----
 
+    def evidence_summary_for(self, triple_id: str) -> Dict[str, Any]:
+        """triple の evidence の集約（支持・反対の重み合計と件数、stance_score、trust）。"""
+        return self.evidence_summary.get(triple_id, EMPTY_EVIDENCE_SUMMARY).to_dict()
+
+    def trust_of(self, triple_id: str) -> float:
+        """triple の trust（-1.0〜1.0、evidence が無ければ 0.0）。"""
+        return self.evidence_summary.get(triple_id, EMPTY_EVIDENCE_SUMMARY).trust
+
+    def rank_by_trust(self, triples, min_trust: float = -1.0) -> list:
+        """
+        trust が min_trust 以上の triple を trust の降順に並べる（同点は元の順）。
+        集約済みの値だけを見るので、evidence の行は走査しない。
+        """
+        summaries = self.evidence_summary
+        scored = [
+            (summaries.get(t.triple_id, EMPTY_EVIDENCE_SUMMARY).trust, i, t)
+            for i, t in enumerate(triples)
+        ]
+        scored = [x for x in scored if x[0] >= min_trust]
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [t for _, _, t in scored]
+
+    # ----- triple_stats（常識度の統計） -----
+
+    def record_corpus_counts(self, counts: Dict[str, int]) -> None:
+        """コーパスから数えた triple_id → 登場回数 を corpus カウンタに足す。"""
+        for triple_id, count in counts.items():
+            self.triple_stats.record((triple_id,), STATS_CORPUS, count)
+
+    def stats_for(self, triple_id: str) -> Dict[str, Any]:
+        """
+        triple の統計（spec §6.2）：減衰させた usage / corpus、通算回数、最終使用日時、
+        evidence の stance_score と confidence = stance_score * 0.7 + normalized(corpus) * 0.3。
+        stance_score が無ければ 0.5（どちらでもない）として計算する。
+        """
+        out = self.triple_stats.get(triple_id) or {
+            "usage": 0.0, "corpus": 0.0, "usage_total": 0, "corpus_total": 0, "last_used_at": None,
+        }
+        stance = self.evidence_summary.get(triple_id, EMPTY_EVIDENCE_SUMMARY).stance_score
+        corpus = out["corpus"]
+        confidence = (0.5 if stance is None else stance) * 0.7 + corpus / (corpus + STATS_CORPUS_SCALE) * 0.3
+        out["stance_score"] = None if stance is None else round(stance, 4)
+        out["confidence"] = round(confidence, 4)
+        return out
+
+    def stats_for_triples(self, triple_ids) -> Dict[str, Dict[str, Any]]:
+        """triple_id → stats_for（重複は 1 つにまとめる）。"""
+        return {triple_id: self.stats_for(triple_id) for triple_id in dict.fromkeys(triple_ids)}
+
     def get_evidence_for_triple(self, triple_id: str) -> List[Dict[str, Any]]:
+        """triple の evidence 全件（必要になったときだけ呼ぶ。集約値は evidence_summary_for）。"""
         evs = self.evidence_index.get(triple_id, [])
         out = []
         for e in evs:
@@ -352,9 +2683,17 @@ class MiniMeaningOS:
         return out
 
     # ========== 意味クエリ関数群 ==========
+    #
+    # ①〜④ の context は resolve_context で条件にする（指定しなければ domain=cooking）。
+    # context の min_trust を指定すると trust で絞り、trust の降順に並べる。
 
     # ① 用途：Xの用途は？
-    def purpose_of(self, expr_label: str, lang: str = "ja") -> List[Dict[str, Any]]:
+    def purpose_of(
+        self,
+        expr_label: str,
+        lang: str = "ja",
+        context: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         cores = self.find_cores_by_expr(expr_label, lang=lang)
         if not cores:
             print(f"[WARN] expr '{expr_label}' (lang={lang}) に対応する core が見つからない")
@@ -363,7 +2702,8 @@ class MiniMeaningOS:
         triples = self.find_triples(
             src=core_id,
             rel="core:use-purpose-001",
-            domain="cooking",
+            conditions=resolve_context(context),
+            min_trust=context_options(context).get("min_trust"),
         )
         results: List[Dict[str, Any]] = []
         for t in triples:
@@ -379,7 +2719,12 @@ class MiniMeaningOS:
         return results
 
     # ② 素材：Xの素材は？
-    def materials_of(self, expr_label: str, lang: str = "ja") -> List[Dict[str, Any]]:
+    def materials_of(
+        self,
+        expr_label: str,
+        lang: str = "ja",
+        context: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         cores = self.find_cores_by_expr(expr_label, lang=lang)
         if not cores:
             print(f"[WARN] expr '{expr_label}' (lang={lang}) に対応する core が見つからない")
@@ -388,7 +2733,8 @@ class MiniMeaningOS:
         triples = self.find_triples(
             src=core_id,
             rel="core:material-001",
-            domain="cooking",
+            conditions=resolve_context(context),
+            min_trust=context_options(context).get("min_trust"),
         )
         out = []
         for t in triples:
@@ -404,7 +2750,12 @@ class MiniMeaningOS:
         return out
 
     # ③ 分類：Xは何の仲間？ / 分類は？
-    def categories_of(self, expr_label: str, lang: str = "ja") -> List[Dict[str, Any]]:
+    def categories_of(
+        self,
+        expr_label: str,
+        lang: str = "ja",
+        context: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         cores = self.find_cores_by_expr(expr_label, lang=lang)
         if not cores:
             print(f"[WARN] expr '{expr_label}' (lang={lang}) に対応する core が見つからない")
@@ -413,7 +2764,8 @@ class MiniMeaningOS:
         triples = self.find_triples(
             src=core_id,
             rel="core:category-001",
-            domain="cooking",
+            conditions=resolve_context(context),
+            min_trust=context_options(context).get("min_trust"),
         )
         results: List[Dict[str, Any]] = []
         for t in triples:
@@ -429,18 +2781,26 @@ class MiniMeaningOS:
         return results
 
     # ④ 逆向き：Xに使う道具は？（切る → 包丁など）
-    def tools_for_action(self, expr_label: str, lang: str = "ja") -> List[Dict[str, Any]]:
+    def tools_for_action(
+        self,
+        expr_label: str,
+        lang: str = "ja",
+        context: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         cores = self.find_cores_by_expr(expr_label, lang=lang)
         if not cores:
             print(f"[WARN] expr '{expr_label}' (lang={lang}) に対応する core が見つからない")
             return []
         action_core = cores[0]
+        wanted = resolve_context(context)
+        min_trust = context_options(context).get("min_trust")
         tools: List[Dict[str, Any]] = []
 
         triples1 = self.find_triples(
             dst=action_core,
             rel="core:use-purpose-001",
-            domain="cooking",
+            conditions=wanted,
+            min_trust=min_trust,
         )
         for t in triples1:
             labels = self.labels_for_core(t.src, lang=lang)
@@ -456,7 +2816,8 @@ class MiniMeaningOS:
         triples2 = self.find_triples(
             src=action_core,
             rel="core:use-purpose-for-001",
-            domain="cooking",
+            conditions=wanted,
+            min_trust=min_trust,
         )
         for t in triples2:
             labels = self.labels_for_core(t.dst, lang=lang)
@@ -488,14 +2849,69 @@ class MiniMeaningOS:
         self,
         expr_label: str,
         lang: str = "ja",
+        context: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
+        """
+        context を渡すと、その文脈で成り立つ triple だけからプロフィールを作る
+        （既定の domain は付かない）。
+        """
         cores = self.find_cores_by_expr(expr_label, lang=lang)
         if not cores:
             print(f"[WARN] expr '{expr_label}' (lang={lang}) に対応する core が見つからない")
             return {}
+        return self._profile_for_core(cores[0], lang, context)
 
-        focus = cores[0]
-
+    def render_profiles(
+        self,
+        expr_labels: List[str],
+        lang: str = "ja",
+        context: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        複数の expr_label のプロフィールをまとめて作る。
+        同じ expr_label はバッチ内で 1 回だけ組み立てる。
+        戻り値: expr_label → プロフィール（見つからないものは {}）
+        """
+        profiles: Dict[str, Dict[str, Any]] = {}
+        for expr_label in expr_labels:
+            if expr_label in profiles:
+                continue
+            cores = self.find_cores_by_expr(expr_label, lang=lang)
+            if not cores:
+                print(f"[WARN] expr '{expr_label}' (lang={lang}) に対応する core が見つからない")
+                profiles[expr_label] = {}
+                continue
+            profiles[expr_label] = self._profile_for_core(cores[0], lang, context)
+        return profiles
+
+    def _display_labels(self, core_id: str, lang: str) -> List[str]:
+        """表示用ラベル（事前解決済み）。表に無い core / 言語はその場で解決する。"""
+        labels = self.display_labels.get((core_id, lang))
+        if labels is None:
+            labels = self._resolve_display_labels(core_id, lang)
+        return labels
+
+    def _resolve_display_labels(self, core_id: str, lang: str) -> List[str]:
+        """表示用ラベル：指定言語 → ja → en → core_id の順にフォールバック。"""
+        labels = self.labels_for_core(core_id, lang=lang)
+        if not labels:
+            labels = self.labels_for_core(core_id, lang="ja") or self.labels_for_core(core_id, lang="en")
+        if not labels:
+            labels = [core_id]
+        return labels
+
+    def _profile_for_core(
+        self,
+        focus: str,
+        lang: str,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        focus core の隣接リストだけを見て 9スロットビューを組み立てる。
+        context があれば、各辺の条件をコンパイル済み述語で判定して絞る（min_trust も見る）。
+        """
+        pred = compile_wanted(resolve_context(context, defaults={})) if context else None
+        min_trust = context_options(context).get("min_trust")
         view: Dict[str, Any] = {
             "WHO": [],
             "WHAT": [],
@@ -512,41 +2928,42 @@ class MiniMeaningOS:
             },
         }
 
-        for t in self.triples:
+        out_adj = self.triple_index.out_adj.get(focus, {})
+        in_adj = self.triple_index.in_adj.get(focus, {})
+        triple_conds = self.triple_conds
+        edges = []
+        for rel, (out_slot, in_slot) in self.REL_TO_SLOT.items():
+            if out_slot:
+                for row in out_adj.get(rel, ()):
+                    if pred is not None and not pred(triple_conds[row]):
+                        continue
+                    edges.append((out_slot, self.triples[row].dst, self.triples[row]))
+            if in_slot:
+                for row in in_adj.get(rel, ()):
+                    if pred is not None and not pred(triple_conds[row]):
+                        continue
+                    t = self.triples[row]
+                    # 自己ループは出力側で処理済み
+                    if t.src == focus:
+                        continue
+                    edges.append((in_slot, t.src, t))
+
+        used = []
+        for slot, other_core, t in edges:
             if t.polarity != "positive":
                 continue
-
-            if t.src == focus:
-                rel_key = self.REL_TO_SLOT.get(t.rel)
-                if not rel_key:
-                    continue
-                slot = rel_key[0]
-                if not slot:
-                    continue
-                other_core = t.dst
-
-            elif t.dst == focus:
-                rel_key = self.REL_TO_SLOT.get(t.rel)
-                if not rel_key:
-                    continue
-                slot = rel_key[1]
-                if not slot:
-                    continue
-                other_core = t.src
-
-            else:
+            if min_trust is not None and self.trust_of(t.triple_id) < min_trust:
                 continue
+            used.append(t.triple_id)
 
-            labels = self.labels_for_core(other_core, lang=lang)
-            if not labels:
-                labels = self.labels_for_core(other_core, lang="ja") or self.labels_for_core(other_core, lang="en")
-            if not labels:
-                labels = [other_core]
-
+            labels = self._display_labels(other_core, lang)
+            # REL_TO_SLOT には 9 スロット外の TARGET もあるので必要時に作る
+            values = view.setdefault(slot, [])
             for label in labels:
-                if label not in view[slot]:
-                    view[slot].append(label)
+                if label not in values:
+                    values.append(label)
 
+        self.triple_stats.record(used)
         return view
 
     # ⑥ 日→英
@@ -588,10 +3005,709 @@ class MiniMeaningOS:
             "only_right_cores": sorted(only_right),
         }
 
+    # ========== グラフ探索（多段ホップ） ==========
+
+    # 1 回の探索で訪れる core 数の上限（これを超えたら打ち切り、結果は部分的になる）
+    TRAVERSAL_MAX_NODES = 10000
+
+    def _traversal_filter(self, domain: Optional[str], conditions: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        wanted: Dict[str, Any] = dict(conditions or {})
+        if domain:
+            wanted["domain"] = [domain]
+        return wanted
+
+    def _expand(
+        self,
+        core: str,
+        rels,
+        direction: str,
+        wanted: Dict[str, Any],
+        polarity: str,
+    ):
+        """core から 1 ホップ先の (triple, 隣の core) を返す。direction は "out" / "in" / "both"。"""
+        for rel in rels or (None,):
+            if direction in ("out", "both"):
+                for row in self._query_rows(core, rel, None, wanted, polarity):
+                    t = self.triples[row]
+                    yield t, t.dst
+            if direction in ("in", "both"):
+                for row in self._query_rows(None, rel, core, wanted, polarity):
+                    t = self.triples[row]
+                    yield t, t.src
+
+    def k_hop(
+        self,
+        core_id: str,
+        k: int = 2,
+        rels: Optional[List[str]] = None,
+        direction: str = "out",
+        domain: Optional[str] = None,
+        polarity: str = "positive",
+        conditions: Optional[Dict[str, Any]] = None,
+        max_nodes: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        core_id から k ホップ以内に届く core → 最短ホップ数（core_id 自身は 0）。
+        rels を指定するとその関係だけをたどる。max_nodes を超えたら打ち切る。
+        """
+        max_nodes = max_nodes or self.TRAVERSAL_MAX_NODES
+        wanted = self._traversal_filter(domain, conditions)
+        dist = {core_id: 0}
+        frontier = [core_id]
+        for depth in range(1, k + 1):
+            nxt = []
+            for core in frontier:
+                for _, other in self._expand(core, rels, direction, wanted, polarity):
+                    if other not in dist:
+                        dist[other] = depth
+                        nxt.append(other)
+                        if len(dist) >= max_nodes:
+                            return dist
+            if not nxt:
+                break
+            frontier = nxt
+        return dist
+
+    def shortest_path(
+        self,
+        src: str,
+        dst: str,
+        rels: Optional[List[str]] = None,
+        max_depth: int = 6,
+        domain: Optional[str] = None,
+        polarity: str = "positive",
+        conditions: Optional[Dict[str, Any]] = None,
+        max_nodes: Optional[int] = None,
+    ) -> Optional[List[Any]]:
+        """
+        src → dst の最短の関係パス（順方向の triple の列）。見つからなければ None。
+        src 側は順方向、dst 側は逆方向に 1 段ずつ広げる双方向 BFS で、
+        小さい方のフロンティアを先に広げる。
+        """
+        if src == dst:
+            return []
+        max_nodes = max_nodes or self.TRAVERSAL_MAX_NODES
+        wanted = self._traversal_filter(domain, conditions)
+        # core → そこへ来た triple（始点は None）と、始点からのホップ数
+        parent_fwd: Dict[str, Any] = {src: None}
+        parent_bwd: Dict[str, Any] = {dst: None}
+        depth_fwd, depth_bwd = {src: 0}, {dst: 0}
+        frontier_fwd, frontier_bwd = [src], [dst]
+
+        for _ in range(max_depth):
+            if not frontier_fwd or not frontier_bwd:
+                return None
+            forward = len(frontier_fwd) <= len(frontier_bwd)
+            frontier = frontier_fwd if forward else frontier_bwd
+            parents, depths, other_depths = (
+                (parent_fwd, depth_fwd, depth_bwd) if forward else (parent_bwd, depth_bwd, depth_fwd)
+            )
+            nxt = []
+            meet = None
+            # 1 段を広げ切ってから、合流点のうち全長が最短のものを選ぶ
+            for core in frontier:
+                for t, other in self._expand(core, rels, "out" if forward else "in", wanted, polarity):
+                    if other in parents:
+                        continue
+                    parents[other] = t
+                    depths[other] = depths[core] + 1
+                    nxt.append(other)
+                    if other in other_depths and (
+                        meet is None or other_depths[other] < other_depths[meet]
+                    ):
+                        meet = other
+            if meet is not None:
+                return self._join_path(meet, parent_fwd, parent_bwd)
+            if len(parent_fwd) + len(parent_bwd) >= max_nodes:
+                return None
+            if forward:
+                frontier_fwd = nxt
+            else:
+                frontier_bwd = nxt
+        return None
+
+    @staticmethod
+    def _join_path(meet: str, parent_fwd: Dict[str, Any], parent_bwd: Dict[str, Any]) -> List[Any]:
+        path = []
+        core = meet
+        while parent_fwd[core] is not None:
+            t = parent_fwd[core]
+            path.append(t)
+            core = t.src
+        path.reverse()
+        core = meet
+        while parent_bwd[core] is not None:
+            t = parent_bwd[core]
+            path.append(t)
+            core = t.dst
+        return path
+
+    def reachable(
+        self,
+        core_id: str,
+        rel: Optional[str] = None,
+        direction: str = "out",
+        domain: Optional[str] = None,
+        polarity: str = "positive",
+        conditions: Optional[Dict[str, Any]] = None,
+    ) -> frozenset:
+        """
+        rel を 1 回以上たどって core_id から届く core の集合（rel* から core_id 自身を除いたもの）。
+        よく引かれる core の結果はデータ世代つきでキャッシュする。
+        """
+        key = (
+            core_id, rel, direction, domain, polarity,
+            json.dumps(conditions, sort_keys=True, ensure_ascii=False) if conditions else None,
+        )
+
+        def compute():
+            hops = self.k_hop(
+                core_id, k=self.TRAVERSAL_MAX_NODES, rels=[rel] if rel else None,
+                direction=direction, domain=domain, polarity=polarity, conditions=conditions,
+            )
+            hops.pop(core_id, None)
+            return frozenset(hops)
+
+        return self.reach_cache.get_or_compute(key, self.generation, compute)
+
+    def is_reachable(self, src: str, dst: str, rel: Optional[str] = None, **filters) -> bool:
+        return dst in self.reachable(src, rel, **filters)
+
+    def is_kind_of(self, core_id: str, ancestor_id: str, **filters) -> bool:
+        """
+        core_id が ancestor_id の一種か（core:category-001 を 1 回以上たどって届くか）。
+        絞り込み条件が無ければ分類の推移閉包で O(1) に判定する。
+        """
+        if not any(filters.values()):
+            return self._category_closure().is_ancestor(ancestor_id, core_id)
+        return self.is_reachable(core_id, ancestor_id, "core:category-001", **filters)
+
+    # ----- 分類階層（推移閉包） -----
+
+    def _category_edges(self):
+        """positive な分類 triple を (子, 親) で列挙する（conditions は見ない）。"""
+        for rel, flip in CATEGORY_RELS:
+            for row in self.triple_index.by_rel.get(rel, ()):
+                t = self.triples[row]
+                if t.polarity != "positive":
+                    continue
+                yield (t.dst, t.src) if flip else (t.src, t.dst)
+
+    def _category_closure(self) -> CategoryClosure:
+        """分類の推移閉包（add_triples で捨てられていれば作り直す）。"""
+        if self.category_closure is None:
+            self.category_closure = CategoryClosure.build(self._category_edges())
+        return self.category_closure
+
+    def category_ancestors(self, core_id: str) -> List[str]:
+        """core_id の上位分類すべて（直接・間接）。"""
+        return sorted(self._category_closure().ancestors(core_id))
+
+    def category_descendants(self, core_id: str) -> List[str]:
+        """core_id の下位分類すべて（直接・間接）。"""
+        return sorted(self._category_closure().descendants(core_id))
+
+    _PATH_STEP = re.compile(r"^(\^?)([^*+?]+)([*+?]?)$")
+
+    def match_path(
+        self,
+        core_id: str,
+        pattern: str,
+        domain: Optional[str] = None,
+        polarity: str = "positive",
+        conditions: Optional[Dict[str, Any]] = None,
+    ) -> List[str]:
+        """
+        関係パスのパターンで core_id から届く core を返す。
+        パターンは "/" 区切りの関係列。各関係には量指定子 * / + / ? を付けられ、
+        先頭の ^ は逆向きにたどる。"core:" は省略できる。
+          例: "category-001*"（分類の推移閉包、自分自身を含む）
+              "^use-purpose-001/category-001+"（その用途を持つ道具の上位分類）
+        """
+        filters = dict(domain=domain, polarity=polarity, conditions=conditions)
+        wanted = self._traversal_filter(domain, conditions)
+        current = {core_id}
+        for step in pattern.split("/"):
+            m = self._PATH_STEP.match(step.strip())
+            if not m:
+                raise ValueError(f"invalid path step: {step!r}")
+            inverse, rel, quant = m.groups()
+            rel = rel if rel.startswith("core:") else f"core:{rel}"
+            direction = "in" if inverse else "out"
+
+            if quant in ("*", "+"):
+                closure = set()
+                for core in current:
+                    closure |= self.reachable(core, rel, direction=direction, **filters)
+                current = closure | current if quant == "*" else closure
+            else:
+                one = {
+                    other
+                    for core in current
+                    for _, other in self._expand(core, [rel], direction, wanted, polarity)
+                }
+                current = one | current if quant == "?" else one
+        return sorted(current)
+
+
+# ========== スナップショット（バイナリ） ==========
+#
+# レイアウト:
+#   magic (8B) | version (uint32) | source_hash (32B, CSV 群の sha256) |
+#   payload_len (uint64) | payload_sha256 (32B) | payload (pickle)
+# payload は MiniMeaningOS の状態（正規化済みレコード + 全インデックス）。
+# 読み込み時は mmap 上から直接 unpickle する（ファイルを bytes に読むコピーは省けるが、オブジェクトの復元は行数に比例）。
+# unpickle は _SnapshotUnpickler の許可リストにあるクラスだけを解決する。
+
+SNAPSHOT_MAGIC = b"MOSSNAP\0"
+# 状態に入る属性・クラスの形を変えたら上げる（古い版は read_snapshot_header で読み込みを断る）
+# 3: evidence_summary / triple_stats_path / data_dir / triple_log_offset を追加
+SNAPSHOT_VERSION = 3
+_SNAPSHOT_HEADER = struct.Struct("<8sI32sQ32s")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def source_hash(data_dir: Path) -> bytes:
+    """data_dir 内の CSV 群（シャードを含め、存在するものだけ）と追記ログの内容ハッシュ。"""
+    h = hashlib.sha256()
+    for kind, paths in find_table_files(data_dir).items():
+        for path in paths:
+            if not path.exists():
+                continue
+            h.update(path.name.encode("utf-8"))
+            with path.open("rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+    # add_triples の追記ログも起動時に再生されるので含める
+    log_path = Path(data_dir) / TRIPLE_LOG.name
+    if log_path.exists():
+        h.update(log_path.name.encode("utf-8"))
+        h.update(log_path.read_bytes())
+    return h.digest()
+
+
+@contextmanager
+def _gc_paused():
+    """
+    大量のコンテナを一気に作る間は循環 GC を止める
+    （世代 GC が何度も全オブジェクトを走査して unpickle が数倍遅くなるため）。
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """
+    スナップショットに入るクラスだけを許可リストで解決する（関数などを REDUCE させない）。
+    このモジュールのクラスは import 名（py.mini_os_demo / mini_os_demo / __main__）に
+    関係なく現在のモジュールへ解決する。
+    状態に新しい型を入れたら、_MODULE_NAMES / _ALLOWED に足すこと。
+    """
+
+    # このモジュールで状態に入るクラス（と defaultdict の既定値ファクトリ）
+    _MODULE_NAMES = frozenset({
+        "AhoCorasick",
+        "CategoryClosure",
+        "ColumnarTripleStore",
+        "CompactTripleTable",
+        "ConditionPool",
+        "DeletionIndex",
+        "EvidenceSummary",
+        "ExprLink",
+        "FrozenConditions",
+        "IdTable",
+        "SubjectMatcher",
+        "Triple",
+        "TripleEvidence",
+        "TripleIndex",
+        "_list_dict",
+    })
+
+    _ALLOWED = frozenset({
+        ("collections", "defaultdict"),
+        ("array", "_array_reconstructor"),
+        ("array", "array"),
+        ("builtins", "list"),
+        ("builtins", "dict"),
+        ("builtins", "set"),
+        ("builtins", "frozenset"),
+        # backend="columnar" の ndarray / dtype の復元用（numpy 1.x / 2.x の pickle 形式）
+        ("numpy", "dtype"),
+        ("numpy", "ndarray"),
+        ("numpy.core.multiarray", "_reconstruct"),
+        ("numpy._core.multiarray", "_reconstruct"),
+        ("numpy.core.numeric", "_frombuffer"),
+        ("numpy._core.numeric", "_frombuffer"),
+    })
+
+    def find_class(self, module, name):
+        if module == "__main__" or module.rsplit(".", 1)[-1] == "mini_os_demo":
+            if name in self._MODULE_NAMES:
+                return getattr(sys.modules[__name__], name)
+        elif (module, name) in self._ALLOWED:
+            return super().find_class(module, name)
+        raise SnapshotError(f"snapshot refers to unexpected class {module}.{name}")
+
+
+def write_snapshot(state: Dict[str, Any], src_hash: bytes, path: Path) -> None:
+    with _gc_paused():
+        payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    header = _SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        src_hash,
+        len(payload),
+        hashlib.sha256(payload).digest(),
+    )
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(header)
+        f.write(payload)
+    tmp.replace(path)
+
+
+def read_snapshot_header(path: Path) -> Dict[str, Any]:
+    with Path(path).open("rb") as f:
+        raw = f.read(_SNAPSHOT_HEADER.size)
+    if len(raw) < _SNAPSHOT_HEADER.size:
+        raise SnapshotError(f"{path}: truncated snapshot header")
+    magic, version, src_hash, payload_len, payload_hash = _SNAPSHOT_HEADER.unpack(raw)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError(f"{path}: not a MiniMeaningOS snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"{path}: snapshot version {version} (expected {SNAPSHOT_VERSION})")
+    return {
+        "version": version,
+        "source_hash": src_hash,
+        "payload_len": payload_len,
+        "payload_hash": payload_hash,
+    }
+
+
+def load_snapshot(path: Path, verify_payload: bool = False) -> Dict[str, Any]:
+    """
+    スナップショットを mmap して状態 dict を返す。
+    verify_payload=True なら payload の sha256 も検証する（全体を 1 回読む）。
+    mmap で省けるのはファイル全体を bytes に読み込むコピーだけで、unpickle でオブジェクトを
+    作り直す分は行数に比例する（CSV の parse とインデックス構築を省くのが主な効果）。
+    """
+    header = read_snapshot_header(path)
+    with Path(path).open("rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = _SNAPSHOT_HEADER.size
+            end = start + header["payload_len"]
+            if len(mm) < end:
+                raise SnapshotError(f"{path}: truncated snapshot payload")
+            with memoryview(mm)[start:end] as payload:
+                if verify_payload and hashlib.sha256(payload).digest() != header["payload_hash"]:
+                    raise SnapshotError(f"{path}: payload checksum mismatch")
+                with _gc_paused():
+                    return _SnapshotUnpickler(_MemoryviewReader(payload)).load()
+
+
+class _MemoryviewReader:
+    """memoryview をファイルライクに読むだけの薄いラッパ（pickle 用）。"""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def read(self, n: int = -1) -> bytes:
+        end = len(self._view) if n < 0 else min(self._pos + n, len(self._view))
+        data = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return data
+
+    def readinto(self, buf) -> int:
+        n = min(len(buf), len(self._view) - self._pos)
+        buf[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def readline(self) -> bytes:
+        rest = self._view[self._pos:].tobytes()
+        i = rest.find(b"\n")
+        line = rest if i < 0 else rest[: i + 1]
+        self._pos += len(line)
+        return line
+
+
+def snapshot_is_fresh(path: Path, data_dir: Path = DATA_DIR) -> bool:
+    """スナップショットが data_dir の CSV から作られたものか（ハッシュ比較）。"""
+    try:
+        header = read_snapshot_header(path)
+    except (OSError, SnapshotError):
+        return False
+    return header["source_hash"] == source_hash(data_dir)
+
+
+def compile_snapshot(
+    data_dir: Path = DATA_DIR,
+    out_path: Path = SNAPSHOT_PATH,
+    workers: int = 0,
+) -> MiniMeaningOS:
+    """CSV 群をロードして正規化・インデックス済みのスナップショットを書き出す。"""
+    os = MiniMeaningOS(data_dir=data_dir, workers=workers)
+    os.save_snapshot(out_path)
+    print(f"[INFO] snapshot written to {out_path} ({len(os.triples)} triples)")
+    return os
+
+
+# ========== 主語マッチャ（Aho–Corasick） ==========
+#
+# expr_label 全件と質問パターンの手がかり語（用途・素材・made of・category …）を
+# 1 つのオートマトンに入れ、質問文を 1 回なめるだけで主語の位置と意図を取り出す。
+# 重なったマッチは「左から・長い方を優先」で選ぶので "kitchen knife" は "knife" に勝つ。
+
+class AhoCorasick:
+    """
+    文字単位の Aho–Corasick オートマトン。
+    add() は trie への挿入だけ行い、失敗リンクは次の検索時にまとめて張り直す。
+    """
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[list] = [[]]      # ノードで終わる語の (長さ, payload)
+        self.out_link: List[int] = [-1]  # 失敗リンクをたどって最初に出力を持つノード
+        self.n_words = 0
+        self._dirty = False
+
+    def add(self, word: str, payload: Any) -> None:
+        node = 0
+        for ch in word:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+                self.out_link.append(-1)
+            node = nxt
+        self.out[node].append((len(word), payload))
+        self.n_words += 1
+        self._dirty = True
+
+    def _build(self) -> None:
+        queue = list(self.goto[0].values())
+        for child in queue:
+            self.fail[child] = 0
+            self.out_link[child] = -1
+        i = 0
+        while i < len(queue):
+            node = queue[i]
+            i += 1
+            for ch, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                f = self.goto[f].get(ch, 0)
+                self.fail[child] = f if f != child else 0
+                self.out_link[child] = f if self.out[f] else self.out_link[f]
+                queue.append(child)
+        self._dirty = False
+
+    def iter_matches(self, text: str):
+        """text 中のすべてのマッチを (開始, 終了, payload) で返す。"""
+        if self._dirty:
+            self._build()
+        goto, fail, out, out_link = self.goto, self.fail, self.out, self.out_link
+        node = 0
+        for end, ch in enumerate(text, 1):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if out[node] else out_link[node]
+            while hit > 0:
+                for length, payload in out[hit]:
+                    yield end - length, end, payload
+                hit = out_link[hit]
+
+
+def _token_class(ch: str) -> Optional[str]:
+    """
+    語の切れ目の判定に使う文字種（英数字 / カタカナ / 漢字）。
+    ひらがな・記号・空白などは None（助詞などが続くので、どこでも切れ目とみなす）。
+    """
+    if ch.isascii():
+        return "ascii" if ch.isalnum() else None
+    if "\u30a1" <= ch <= "\u30fa" or ch == "ー":
+        return "katakana"
+    if "\u4e00" <= ch <= "\u9fff" or ch == "々":
+        return "kanji"
+    return None
+
+
+def on_token_boundary(text: str, start: int, end: int) -> bool:
+    """
+    text[start:end] が前後の文字と同じ文字種でつながっていない（1 語として切り出せる）か。
+    例: "cutting" の中の "cut"、"ペティナイフ" の中の "ナイフ" は False。
+    """
+    if start > 0:
+        cls = _token_class(text[start])
+        if cls is not None and _token_class(text[start - 1]) == cls:
+            return False
+    if end < len(text):
+        cls = _token_class(text[end - 1])
+        if cls is not None and _token_class(text[end]) == cls:
+            return False
+    return True
+
+
+class SubjectMatcher:
+    """
+    expr_label と手がかり語の辞書。ラベルは小文字化したキーで引き、元の表記を返す。
+    ラベルの追加は小さな差分オートマトンに入れ、ある程度たまったら本体に作り直す
+    （本体の失敗リンクを毎回張り直さずに済む）。
+    """
+
+    def __init__(self, labels=(), cues=()):
+        self.cues = list(cues)            # (手がかり語, lang, pattern_id)
+        self.labels: Dict[str, str] = {}  # 小文字化キー → 元の expr_label
+        self._main = AhoCorasick()
+        self._delta = AhoCorasick()
+        for label in labels:
+            self.labels.setdefault(label.lower(), label)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        main = AhoCorasick()
+        for cue, lang, pattern_id in self.cues:
+            main.add(cue.lower(), ("cue", lang, pattern_id))
+        for key, label in self.labels.items():
+            main.add(key, ("label", label))
+        self._main = main
+        self._delta = AhoCorasick()
+
+    def add_labels(self, labels) -> None:
+        for label in labels:
+            key = label.lower()
+            if key and key not in self.labels:
+                self.labels[key] = label
+                self._delta.add(key, ("label", label))
+        if self._delta.n_words > max(1024, self._main.n_words // 8):
+            self._rebuild()
+
+    def scan(self, text: str) -> List[tuple]:
+        """
+        text を 1 回走査し、重ならないマッチを左から順に (開始, 終了, payload) で返す。
+        同じ位置から始まるマッチは長い方を、同じ長さなら手がかり語を採る
+        （"用途" や "category" はラベルとしても登録されているため）。
+        語の途中にかかるマッチ（on_token_boundary が False）は、手がかり語なら捨て、
+        ラベルなら payload を ("partial", label) にして返す（"museum" の "use" や "cutlery" の "cut"）。
+        """
+        text = text.lower()
+        found = list(self._main.iter_matches(text))
+        if self._delta.n_words:
+            found.extend(self._delta.iter_matches(text))
+        matches = []
+        for start, end, payload in found:
+            if not on_token_boundary(text, start, end):
+                if payload[0] == "cue":
+                    continue
+                payload = ("partial", payload[1])
+            matches.append((start, end, payload))
+        matches.sort(key=lambda m: (m[0], m[0] - m[1], m[2][0] != "cue"))
+        chosen = []
+        pos = 0
+        for start, end, payload in matches:
+            if start >= pos:
+                chosen.append((start, end, payload))
+                pos = end
+        return chosen
+
 
 # ========== 日本語質問パーサ ==========
 
-def parse_ja_question(text: str) -> dict:
+# マッチャ用の手がかり語：(語, lang, pattern_id)。同じ質問に複数あれば PATTERN_PRIORITY の順で採る
+INTENT_CUES = [
+    ("英語", "ja", "TRANS_EN_1"),
+    ("用途", "ja", "USE_1"),
+    ("素材", "ja", "MAT_1"),
+    ("材質", "ja", "MAT_1"),
+    ("分類", "ja", "CAT_1"),
+    ("何の仲間", "ja", "CAT_1"),
+    ("どんな種類", "ja", "CAT_1"),
+    ("に使う道具", "ja", "TOOL_FOR_1"),
+    ("ための道具", "ja", "TOOL_FOR_1"),
+    ("プロフィール", "ja", "PROFILE_1"),
+    ("について教えて", "ja", "PROFILE_1"),
+    ("used for", "en", "USE_EN_1"),
+    ("use", "en", "USE_EN_1"),
+    ("purpose", "en", "USE_EN_1"),
+    ("made of", "en", "MAT_EN_1"),
+    ("material", "en", "MAT_EN_1"),
+    ("category", "en", "CAT_EN_1"),
+    ("kind of", "en", "CAT_EN_1"),
+    ("tell me about", "en", "PROFILE_EN_1"),
+]
+
+PATTERN_PRIORITY = {
+    pattern_id: i
+    for i, pattern_id in enumerate([
+        "TRANS_EN_1", "USE_1", "MAT_1", "CAT_1", "TOOL_FOR_1", "PROFILE_1",
+        "USE_EN_1", "MAT_EN_1", "CAT_EN_1", "PROFILE_EN_1",
+    ])
+}
+
+# pattern_id → parse 結果の subject 以外の項目（regex パーサと同じ形）
+MATCHED_QUERY_FIELDS = {
+    "USE_1": {"type": "slot_query", "slot": "OUTCOME", "via_lemma": "用途"},
+    "MAT_1": {"type": "slot_query", "slot": "HOW", "via_lemma": "素材"},
+    "CAT_1": {"type": "slot_query", "slot": "WHAT", "via_lemma": "分類"},
+    "TOOL_FOR_1": {"type": "slot_query", "slot": "TOOL", "via_lemma": "道具"},
+    "PROFILE_1": {"type": "profile_query"},
+    "TRANS_EN_1": {"type": "expr_query", "target_lang": "en"},
+    "USE_EN_1": {"type": "slot_query", "slot": "OUTCOME", "via_lemma": "purpose", "lang": "en"},
+    "MAT_EN_1": {"type": "slot_query", "slot": "HOW", "via_lemma": "material", "lang": "en"},
+    "CAT_EN_1": {"type": "slot_query", "slot": "WHAT", "via_lemma": "category", "lang": "en"},
+    "PROFILE_EN_1": {"type": "profile_query", "lang": "en"},
+}
+
+
+def parse_with_matcher(text: str, matcher: "SubjectMatcher", lang: str) -> Optional[dict]:
+    """
+    マッチャで主語（既知の expr_label）と意図（手がかり語）を取り出す。
+    どちらかが見つからなければ None（regex パーサに任せる）。
+    主語は手がかり語より前にある最長のラベル（無ければ文中の最長のラベル）。
+    主語の候補に語の途中にかかるラベルがあれば（"ペティナイフ" の "ナイフ"）、
+    短いラベルに読み替えずに None を返す。
+    """
+    cue = None
+    labels = []
+    for start, end, payload in matcher.scan(text):
+        if payload[0] in ("label", "partial"):
+            labels.append((start, end, payload[1], payload[0] == "partial"))
+        elif payload[1] == lang:
+            if cue is None or PATTERN_PRIORITY[payload[2]] < PATTERN_PRIORITY[cue[2]]:
+                cue = (start, end, payload[2])
+    if cue is None or not labels:
+        return None
+
+    before = [m for m in labels if m[1] <= cue[0]] or labels
+    if any(m[3] for m in before):
+        return None
+    subject = max(before, key=lambda m: (m[1] - m[0], -m[0]))[2]
+    fields = dict(MATCHED_QUERY_FIELDS[cue[2]])
+    qtype = fields.pop("type")
+    return {"query": text, "type": qtype, "pattern_id": cue[2], "subject": subject, **fields}
+
+
+def parse_ja_question(text: str, matcher: Optional["SubjectMatcher"] = None) -> dict:
+    """
+    matcher があれば、意味差以外はまずマッチャで主語と意図を取り、
+    取れなければ従来の regex / 文字列処理で解析する。
+    """
     t = text.strip()
 
     # ⑦ 意味差
@@ -608,6 +3724,22 @@ def parse_ja_question(text: str) -> dict:
             "expr_right": right,
         }
 
+    # ⑧ 上位分類の判定（X は Y の一種？）
+    m = re.match(r"(.+?)は(.+?)の(一種|仲間)", t)
+    if m and m.group(2).strip() not in ("何", "どれ", "なに"):
+        return {
+            "query": text,
+            "type": "isa_query",
+            "pattern_id": "ISA_1",
+            "subject": m.group(1).strip(),
+            "ancestor": m.group(2).strip(),
+        }
+
+    if matcher is not None:
+        q = parse_with_matcher(text, matcher, "ja")
+        if q is not None:
+            return q
+
     # ⑥ 英語
     if "英語" in t:
         m = re.search(r"(.+?)の英語", t)
@@ -714,11 +3846,17 @@ def normalize_en_subject(subj: str) -> str:
     return s
 
 
-def parse_en_question(text: str) -> dict:
+def parse_en_question(text: str, matcher: Optional["SubjectMatcher"] = None) -> dict:
     """
     英語質問パーサ（用途 / 素材 / 分類 / プロフィール）。
     "What is a knife used for?" を含むいくつかのパターンに対応。
+    matcher があればまずマッチャで主語と意図を取る（"kitchen knife" は "knife" より優先）。
     """
+    if matcher is not None:
+        q = parse_with_matcher(text, matcher, "en")
+        if q is not None:
+            return q
+
     t = text.lower().strip()
 
     # --- ① 用途: "what is X used for?" パターン ---
@@ -810,212 +3948,569 @@ def parse_en_question(text: str) -> dict:
 
 
 # ========== 質問 → OS クエリ → JSON応答 ==========
+#
+# pattern_id → QueryPattern（ハンドラ + 結果スキーマ）の登録表で振り分ける。
+# 新しい質問パターンは register_pattern で追加する（answer_* 側の変更は不要）。
 
-def answer_ja_question(os: MiniMeaningOS, text: str) -> dict:
-    q = parse_ja_question(text)
-    qtype = q.get("type")
-    subj = q.get("subject", "")
+@dataclass
+class QueryPattern:
+    """
+    1 つの質問パターンの定義。
+    handler(os, q, pattern, context) → results のリスト（context は問い合わせの文脈、None 可）
+    スロット質問は slot / from_relation / shape（"value" or "core"）が結果の形を決め、
+    steps（(向き, rel) の列）は answer_batch がまとめて引くときに使う。
+    """
+    pattern_id: str
+    qtype: str
+    lang: str
+    handler: Callable[["MiniMeaningOS", dict, "QueryPattern", Optional[dict]], List[Dict[str, Any]]]
+    slot: Optional[str] = None
+    from_relation: Optional[str] = None
+    shape: str = "value"
+    steps: tuple = ()
 
-    # ① 用途
-    if qtype == "slot_query" and q.get("pattern_id") == "USE_1":
-        rows = os.purpose_of(subj, lang="ja")
-        return {
-            **q,
-            "results": [
-                {
-                    "value": r["value"],
-                    "slot": "OUTCOME",
-                    "from_relation": "core:use-purpose-001",
-                    "conditions": r["conditions"],
-                    "triple_id": r["triple_id"],
-                    "evidence": os.get_evidence_for_triple(r["triple_id"]),
-                }
-                for r in rows
-            ],
-        }
 
-    # ② 素材
-    if qtype == "slot_query" and q.get("pattern_id") == "MAT_1":
-        mats = os.materials_of(subj, lang="ja")
-        return {
-            **q,
-            "results": [
-                {
-                    "core_id": m["core_id"],
-                    "labels": m["labels"],
-                    "slot": "HOW",
-                    "from_relation": "core:material-001",
-                    "conditions": m["conditions"],
-                    "triple_id": m["triple_id"],
-                    "evidence": os.get_evidence_for_triple(m["triple_id"]),
-                }
-                for m in mats
-            ],
-        }
+PATTERN_REGISTRY: Dict[str, QueryPattern] = {}
 
-    # ③ 分類
-    if qtype == "slot_query" and q.get("pattern_id") == "CAT_1":
-        cats = os.categories_of(subj, lang="ja")
-        return {
-            **q,
-            "results": [
-                {
-                    "value": r["value"],
-                    "slot": "WHAT",
-                    "from_relation": "core:category-001",
-                    "conditions": r["conditions"],
-                    "triple_id": r["triple_id"],
-                    "evidence": os.get_evidence_for_triple(r["triple_id"]),
-                }
-                for r in cats
-            ],
-        }
+# pattern_id → [呼び出し回数, 合計秒, 最大秒]（ハンドラの実行時間。キャッシュヒットは含まない）
+PATTERN_LATENCY: Dict[str, list] = defaultdict(lambda: [0, 0.0, 0.0])
 
-    # ④ 逆向き（道具）
-    if qtype == "slot_query" and q.get("pattern_id") == "TOOL_FOR_1":
-        tools = os.tools_for_action(subj, lang="ja")
-        return {
-            **q,
-            "results": [
-                {
-                    "value": r["value"],
-                    "slot": "TOOL",
-                    "from_relation": "core:use-purpose-001 / core:use-purpose-for-001",
-                    "conditions": r["conditions"],
-                    "triple_id": r["triple_id"],
-                    "evidence": os.get_evidence_for_triple(r["triple_id"]),
-                }
-                for r in tools
-            ],
-        }
+UNSUPPORTED_NOTES = {
+    "ja": "このパターンの質問はまだ未対応です。",
+    "en": "This English question pattern is not supported yet.",
+}
 
-    # ⑤ プロフィール
-    if qtype == "profile_query" and q.get("pattern_id") == "PROFILE_1":
-        prof = os.render_profile(subj, lang="ja")
-        return {
-            **q,
-            "results": [
-                {
-                    "profile": prof
-                }
-            ],
-        }
 
-    # ⑥ 日→英
-    if qtype == "expr_query" and q.get("pattern_id") == "TRANS_EN_1":
-        vals = os.translations_en(subj)
-        return {
-            **q,
-            "results": [
-                {
-                    "value": v,
-                    "target_lang": "en",
-                    "via": "expr_links",
-                }
-                for v in vals
-            ],
-        }
+def register_pattern(pattern: QueryPattern) -> QueryPattern:
+    PATTERN_REGISTRY[pattern.pattern_id] = pattern
+    return pattern
 
-    # ⑦ 意味差
-    if qtype == "diff_query" and q.get("pattern_id") == "DIFF_1":
-        diff = os.diff_meanings(q["expr_left"], q["expr_right"])
-        return {
-            **q,
-            "results": [diff],
-        }
 
+def pattern_latency_stats() -> Dict[str, Dict[str, float]]:
+    """パターンごとの呼び出し回数と平均・最大レイテンシ（ミリ秒）。"""
     return {
-        **q,
-        "results": [],
-        "note": "このパターンの質問はまだ未対応です。",
+        pattern_id: {
+            "count": count,
+            "avg_ms": total / count * 1000 if count else 0.0,
+            "max_ms": worst * 1000,
+            "total_ms": total * 1000,
+        }
+        for pattern_id, (count, total, worst) in sorted(PATTERN_LATENCY.items())
     }
 
 
-def answer_en_question(os: MiniMeaningOS, text: str) -> dict:
-    q = parse_en_question(text)
-    subj = q.get("subject", "")
-    qtype = q.get("type")
-    lang = "en"
+def slot_result(
+    os: "MiniMeaningOS",
+    pattern: QueryPattern,
+    row: Dict[str, Any],
+    include_evidence: bool = True,
+) -> Dict[str, Any]:
+    """
+    スロット質問の結果 1 行を pattern のスキーマで組み立てる（日英・単発/バッチで共通）。
+    evidence の集約値（evidence_summary）は常に載せ、全件（evidence）は
+    include_evidence=False（context で明示したとき）以外は従来どおり載せる。
+    """
+    if pattern.shape == "core":
+        out = {"core_id": row["core_id"], "labels": row["labels"]}
+    else:
+        out = {"value": row["value"]}
+    out.update({
+        "slot": pattern.slot,
+        "from_relation": pattern.from_relation,
+        "conditions": row["conditions"],
+        "triple_id": row["triple_id"],
+        "evidence_summary": os.evidence_summary_for(row["triple_id"]),
+    })
+    if include_evidence:
+        out["evidence"] = os.get_evidence_for_triple(row["triple_id"])
+    return out
+
+
+def _slot_handler(method_name: str):
+    """os.<method_name>(subject, lang=..., context=...) の結果をスロット質問の結果にするハンドラ。"""
+    def handler(os: "MiniMeaningOS", q: dict, pattern: QueryPattern, context=None) -> List[Dict[str, Any]]:
+        rows = getattr(os, method_name)(q.get("subject", ""), lang=pattern.lang, context=context)
+        include_evidence = context_options(context).get("include_evidence", True)
+        return [slot_result(os, pattern, r, include_evidence) for r in rows]
+    return handler
+
+
+def _profile_handler(os: "MiniMeaningOS", q: dict, pattern: QueryPattern, context=None) -> List[Dict[str, Any]]:
+    return [{"profile": os.render_profile(q.get("subject", ""), lang=pattern.lang, context=context)}]
+
+
+def _translation_handler(os: "MiniMeaningOS", q: dict, pattern: QueryPattern, context=None) -> List[Dict[str, Any]]:
+    return [
+        {"value": v, "target_lang": "en", "via": "expr_links"}
+        for v in os.translations_en(q.get("subject", ""))
+    ]
+
+
+def _diff_handler(os: "MiniMeaningOS", q: dict, pattern: QueryPattern, context=None) -> List[Dict[str, Any]]:
+    return [os.diff_meanings(q["expr_left"], q["expr_right"])]
+
+
+_USE_STEPS = (("out", "core:use-purpose-001"),)
+_MAT_STEPS = (("out", "core:material-001"),)
+_CAT_STEPS = (("out", "core:category-001"),)
+_TOOL_STEPS = (("in", "core:use-purpose-001"), ("out", "core:use-purpose-for-001"))
+
+for _lang, _suffix in (("ja", "_1"), ("en", "_EN_1")):
+    # ① 用途 / use・purpose
+    register_pattern(QueryPattern(
+        "USE" + _suffix, "slot_query", _lang, _slot_handler("purpose_of"),
+        slot="OUTCOME", from_relation="core:use-purpose-001", steps=_USE_STEPS,
+    ))
+    # ② 素材 / material
+    register_pattern(QueryPattern(
+        "MAT" + _suffix, "slot_query", _lang, _slot_handler("materials_of"),
+        slot="HOW", from_relation="core:material-001", shape="core", steps=_MAT_STEPS,
+    ))
+    # ③ 分類 / category
+    register_pattern(QueryPattern(
+        "CAT" + _suffix, "slot_query", _lang, _slot_handler("categories_of"),
+        slot="WHAT", from_relation="core:category-001", steps=_CAT_STEPS,
+    ))
+    # ⑤ プロフィール / profile
+    register_pattern(QueryPattern("PROFILE" + _suffix, "profile_query", _lang, _profile_handler))
+
+# ④ 逆向き（道具）
+register_pattern(QueryPattern(
+    "TOOL_FOR_1", "slot_query", "ja", _slot_handler("tools_for_action"),
+    slot="TOOL", from_relation="core:use-purpose-001 / core:use-purpose-for-001", steps=_TOOL_STEPS,
+))
+# ⑥ 日→英
+register_pattern(QueryPattern("TRANS_EN_1", "expr_query", "ja", _translation_handler))
+# ⑦ 意味差
+register_pattern(QueryPattern("DIFF_1", "diff_query", "ja", _diff_handler))
+
+
+def _isa_handler(os: "MiniMeaningOS", q: dict, pattern: QueryPattern, context=None) -> List[Dict[str, Any]]:
+    """X が Y の一種か：X・Y の core 候補の組み合わせを分類の推移閉包で判定する。"""
+    subjects = os.find_cores_by_expr(q.get("subject", ""), lang=pattern.lang)
+    ancestors = os.find_cores_by_expr(q.get("ancestor", ""), lang=pattern.lang)
+    results = []
+    for core_id in subjects:
+        for ancestor_id in ancestors:
+            results.append({
+                "value": os.is_kind_of(core_id, ancestor_id),
+                "core_id": core_id,
+                "ancestor_core_id": ancestor_id,
+                "via": "category closure",
+            })
+    return results
 
-    # ① use / purpose
-    if qtype == "slot_query" and q.get("pattern_id") == "USE_EN_1":
-        rows = os.purpose_of(subj, lang=lang)
-        return {
-            **q,
-            "results": [
-                {
-                    "value": r["value"],   # 英語ラベル
-                    "slot": "OUTCOME",
-                    "from_relation": "core:use-purpose-001",
-                    "conditions": r["conditions"],
-                    "triple_id": r["triple_id"],
-                    "evidence": os.get_evidence_for_triple(r["triple_id"]),
-                }
-                for r in rows
-            ],
-        }
 
-    # ② material
-    if qtype == "slot_query" and q.get("pattern_id") == "MAT_EN_1":
-        mats = os.materials_of(subj, lang=lang)
-        return {
-            **q,
-            "results": [
-                {
-                    "core_id": m["core_id"],
-                    "labels": m["labels"],          # ここも英語ラベルになる
-                    "slot": "HOW",
-                    "from_relation": "core:material-001",
-                    "conditions": m["conditions"],
-                    "triple_id": m["triple_id"],
-                    "evidence": os.get_evidence_for_triple(m["triple_id"]),
-                }
-                for m in mats
-            ],
-        }
+# ⑧ 上位分類の判定
+register_pattern(QueryPattern("ISA_1", "isa_query", "ja", _isa_handler))
 
-    # ③ category
-    if qtype == "slot_query" and q.get("pattern_id") == "CAT_EN_1":
-        cats = os.categories_of(subj, lang=lang)
-        return {
-            **q,
-            "results": [
-                {
-                    "value": r["value"],            # 英語ラベル
-                    "slot": "WHAT",
-                    "from_relation": "core:category-001",
-                    "conditions": r["conditions"],
-                    "triple_id": r["triple_id"],
-                    "evidence": os.get_evidence_for_triple(r["triple_id"]),
-                }
-                for r in cats
-            ],
-        }
 
-    # ④ profile
-    if qtype == "profile_query" and q.get("pattern_id") == "PROFILE_EN_1":
-        prof = os.render_profile(subj, lang=lang)
-        return {
-            **q,
-            "results": [
-                {
-                    "profile": prof
-                }
-            ],
-        }
+def lookup_pattern(q: dict, lang: str) -> Optional[QueryPattern]:
+    """parse 結果に対応する登録済みパターン（型・言語まで一致するもの）。"""
+    pattern = PATTERN_REGISTRY.get(q.get("pattern_id"))
+    if pattern is None or pattern.qtype != q.get("type") or pattern.lang != lang:
+        return None
+    return pattern
 
-    # 未対応パターン
-    return {
-        **q,
-        "results": [],
-        "note": "This English question pattern is not supported yet.",
+
+def answer_parsed(os: "MiniMeaningOS", q: dict, lang: str, context: Optional[Dict[str, Any]] = None) -> dict:
+    """
+    parse 済みクエリ q を登録表で振り分けて応答を作る。
+    context を渡したときは、応答にも解決後の文脈（"context"）を載せる。
+    """
+    extra = {"context": {**resolve_context(context), **context_options(context)}} if context is not None else {}
+    pattern = lookup_pattern(q, lang)
+    if pattern is None:
+        return {**q, "results": [], "note": UNSUPPORTED_NOTES[lang], **extra}
+
+    start = time.perf_counter()
+    try:
+        results = pattern.handler(os, q, pattern, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stat = PATTERN_LATENCY[pattern.pattern_id]
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] = max(stat[2], elapsed)
+    return {**q, "results": results, **extra}
+
+
+def _answer_cache_key(q: dict, lang: str, context: Optional[Dict[str, Any]] = None) -> tuple:
+    """
+    parse 済みクエリのキャッシュキー：(pattern_id, subject, lang, 文脈, その他の parse 結果)。
+    生の質問文（query）は含めないので、言い回しが違っても同じクエリなら共有される。
+    文脈を明示したかどうかで応答の形（"context" の有無）が変わるので、それもキーに入れる。
+    """
+    rest = tuple(sorted(
+        (k, v) for k, v in q.items()
+        if k not in ("query", "pattern_id", "subject", "lang", "domain")
+    ))
+    ctx = context_key(resolve_context(context))
+    options = context_key(context_options(context))
+    return (q.get("pattern_id"), q.get("subject"), lang, ctx, options, context is not None, rest)
+
+
+def result_triple_ids(results: List[Dict[str, Any]]) -> List[str]:
+    """応答の results のうち triple から作った行の triple_id（順番どおり）。"""
+    return [r["triple_id"] for r in results if "triple_id" in r]
+
+
+def _cached_answer(os: "MiniMeaningOS", q: dict, lang: str, context: Optional[Dict[str, Any]] = None) -> dict:
+    """
+    answer_parsed の結果のうち、q 以外の部分（results / note / context）をキャッシュする。
+    triple_stats は毎回その時点の値を載せる（キャッシュには入れない）。
+    """
+    computed = []
+
+    def compute():
+        computed.append(True)
+        ans = answer_parsed(os, q, lang, context)
+        return {k: v for k, v in ans.items() if k not in q}
+
+    cached = os.cached_answer(_answer_cache_key(q, lang, context), compute)
+    triple_ids = result_triple_ids(cached["results"])
+    if not triple_ids:
+        return {**q, **cached}
+    if not computed:
+        # キャッシュから返した結果も使用回数に数える（find_triples を通らないため）
+        os.triple_stats.record(triple_ids)
+    return {**q, **cached, "triple_stats": os.stats_for_triples(triple_ids)}
+
+
+def answer_ja_question(os: MiniMeaningOS, text: str, context: Optional[Dict[str, Any]] = None) -> dict:
+    q = parse_ja_question(text, os.subject_matcher)
+    return _cached_answer(os, q, "ja", context)
+
+
+def answer_en_question(os: MiniMeaningOS, text: str, context: Optional[Dict[str, Any]] = None) -> dict:
+    q = parse_en_question(text, os.subject_matcher)
+    return _cached_answer(os, q, "en", context)
+
+
+# ========== バッチ質問 API ==========
+
+def answer_batch(
+    os: MiniMeaningOS,
+    questions: List[str],
+    lang: str = "ja",
+    context: Optional[Dict[str, Any]] = None,
+) -> List[dict]:
+    """
+    複数の質問をまとめて（同じ context で）答える。戻り値は入力順で、各要素は
+    answer_ja_question / answer_en_question と同じ形。
+    - 同じ parse 結果の質問は 1 回だけ解く
+    - 主語（expr_label）→ core の解決はユニークな主語ごとに 1 回
+    - triple 検索は (core, rel, 向き) ごとに 1 回（登録表の steps を使う）
+    - evidence の全件は include_evidence=False なら引かない（集約値のみ）
+    - 使用回数は質問ごとに数える（まとめて解いた重複分は後から足す）
+    """
+    parse = parse_ja_question if lang == "ja" else parse_en_question
+
+    wanted = resolve_context(context)
+    options = context_options(context)
+    include_evidence = options.get("include_evidence", True)
+    extra = {"context": {**wanted, **options}} if context is not None else {}
+    parsed = [parse(text, os.subject_matcher) for text in questions]
+    keys = [_answer_cache_key(q, lang, context) for q in parsed]
+    unique: Dict[tuple, dict] = {}
+    for key, q in zip(keys, parsed):
+        unique.setdefault(key, q)
+
+    patterns = {k: lookup_pattern(q, lang) for k, q in unique.items()}
+    slot_queries = {k: q for k, q in unique.items() if patterns[k] is not None and patterns[k].steps}
+    profile_queries = {
+        k: q for k, q in unique.items()
+        if patterns[k] is not None and patterns[k].qtype == "profile_query"
     }
 
+    # 1) 主語 → core（ユニークな主語ごとに 1 回）
+    subject_core: Dict[str, Optional[str]] = {}
+    for q in slot_queries.values():
+        subj = q.get("subject", "")
+        if subj not in subject_core:
+            cores = os.find_cores_by_expr(subj, lang=lang)
+            if not cores:
+                print(f"[WARN] expr '{subj}' (lang={lang}) に対応する core が見つからない")
+            subject_core[subj] = cores[0] if cores else None
+
+    # 2) (core, rel, 向き) ごとに triple 検索
+    lookups: Dict[tuple, List[Triple]] = {}
+    for key, q in slot_queries.items():
+        core_id = subject_core[q.get("subject", "")]
+        if core_id is None:
+            continue
+        for direction, rel in patterns[key].steps:
+            lookup = (core_id, rel, direction)
+            if lookup in lookups:
+                continue
+            min_trust = options.get("min_trust")
+            if direction == "out":
+                lookups[lookup] = os.find_triples(src=core_id, rel=rel, conditions=wanted, min_trust=min_trust)
+            else:
+                lookups[lookup] = os.find_triples(dst=core_id, rel=rel, conditions=wanted, min_trust=min_trust)
+
+    # 3) ユニークなクエリごとに応答を組み立てる
+    answers: Dict[tuple, dict] = {}
+    for key, q in slot_queries.items():
+        pattern = patterns[key]
+        core_id = subject_core[q.get("subject", "")]
+        results = []
+        if core_id is not None:
+            for direction, rel in pattern.steps:
+                for t in lookups[(core_id, rel, direction)]:
+                    answer_core = t.dst if direction == "out" else t.src
+                    labels = os.labels_for_core(answer_core, lang=lang)
+                    row = {
+                        "core_id": answer_core,
+                        "labels": labels,
+                        "value": labels[0] if labels else answer_core,
+                        "conditions": t.conditions,
+                        "triple_id": t.triple_id,
+                    }
+                    results.append(slot_result(os, pattern, row, include_evidence))
+        answers[key] = {**q, "results": results, **extra}
+
+    profiles = os.render_profiles(
+        [q.get("subject", "") for q in profile_queries.values()], lang=lang, context=context
+    )
+    for key, q in profile_queries.items():
+        answers[key] = {**q, "results": [{"profile": profiles[q.get("subject", "")]}], **extra}
+
+    # 翻訳・意味差・未対応パターンは 1 件ずつの経路で
+    for key, q in unique.items():
+        if key not in answers:
+            answers[key] = answer_parsed(os, q, lang, context)
+
+    repeats: Dict[tuple, int] = defaultdict(int)
+    for key in keys:
+        repeats[key] += 1
+    stats_fields: Dict[tuple, dict] = {}
+    for key, ans in answers.items():
+        triple_ids = result_triple_ids(ans["results"])
+        if triple_ids:
+            os.triple_stats.record(triple_ids, count=repeats[key] - 1)
+            stats_fields[key] = {"triple_stats": os.stats_for_triples(triple_ids)}
+
+    return [
+        {**q, **{k: v for k, v in answers[key].items() if k not in q}, **stats_fields.get(key, {})}
+        for key, q in zip(keys, parsed)
+    ]
+
 
 # ========== スクリプトとしての実行部（対話モード） ==========
 
+def load_os(
+    data_dir: Optional[Path] = None,
+    snapshot: Optional[Path] = None,
+    workers: int = 0,
+) -> MiniMeaningOS:
+    """snapshot が指定されていればそこから、無ければ CSV からロードする。"""
+    if snapshot is not None:
+        print(f"[INFO] load snapshot from {snapshot}")
+        return MiniMeaningOS.from_snapshot(snapshot)
+    return MiniMeaningOS(data_dir=data_dir, workers=workers)
+
+
+# ========== バッチ実行（非対話モード） ==========
+
+# バッチワーカーが使う読み取り専用の OS（fork 前に親で設定するか、スナップショットからロード）
+_BATCH_OS: Optional[MiniMeaningOS] = None
+
+DEFAULT_BATCH_CHUNK = 256
+
+
+def iter_batch_questions(lines, default_lang: str = "ja", default_context: Optional[Dict[str, Any]] = None):
+    """
+    バッチ入力の各行を (lang, question, context) にする。空行は飛ばす。
+    - JSONL: {"question": "...", "lang": "en", "context": {...}}
+      （"text" でも可、lang / context 省略時は default_lang / default_context）
+    - それ以外: 1 行 1 質問
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            obj = json.loads(line)
+            yield (
+                obj.get("lang", default_lang),
+                obj.get("question", obj.get("text", "")),
+                obj.get("context", default_context),
+            )
+        else:
+            yield default_lang, line, default_context
+
+
+def _init_batch_worker(snapshot: Optional[Path]) -> None:
+    global _BATCH_OS
+    if snapshot is not None:
+        with redirect_stdout(sys.stderr):
+            _BATCH_OS = MiniMeaningOS.from_snapshot(snapshot)
+    else:
+        # fork で引き継いだ親の未集計の記録は親が数えるので捨てる
+        _BATCH_OS.triple_stats.take_pending()
+
+
+def _answer_batch_chunk(items: List[tuple]) -> List[str]:
+    """
+    (lang, question, context) のチャンクを (言語, 文脈, 応答オプション) ごとに answer_batch し、
+    入力順の JSONL 行を返す（min_trust / include_evidence が違う行は別のグループにする）。
+    """
+    groups: Dict[tuple, List[int]] = defaultdict(list)
+    for i, (lang, _, context) in enumerate(items):
+        ctx = None if context is None else (
+            context_key(resolve_context(context)) + context_key(context_options(context))
+        )
+        groups[(lang, ctx)].append(i)
+
+    answers: List[Optional[dict]] = [None] * len(items)
+    # [WARN] などのログが JSONL の出力に混ざらないよう stderr へ逃がす
+    with redirect_stdout(sys.stderr):
+        for (lang, _), idx in groups.items():
+            context = items[idx[0]][2]
+            for i, ans in zip(idx, answer_batch(_BATCH_OS, [items[i][1] for i in idx], lang, context)):
+                answers[i] = ans
+    return [json.dumps(ans, ensure_ascii=False) for ans in answers]
+
+
+def _answer_batch_chunk_in_worker(items: List[tuple]) -> tuple:
+    """ワーカー用：応答行と、このチャンクで積んだ triple_stats の記録（親で集計する）を返す。"""
+    lines = _answer_batch_chunk(items)
+    return lines, _BATCH_OS.triple_stats.take_pending()
+
+
+def run_batch(
+    os: Optional[MiniMeaningOS],
+    lines,
+    out,
+    default_lang: str = "ja",
+    workers: int = 0,
+    chunk_size: int = DEFAULT_BATCH_CHUNK,
+    snapshot: Optional[Path] = None,
+    context: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    質問を chunk_size 件ずつ answer_batch で解き、入力順に JSONL で out へ書く。
+    workers が 2 以上ならプロセスプールで並列に解く：
+      - fork が使える環境では、ロード済みの os を fork で共有する（コピーオンライト）
+      - それ以外では各ワーカーが snapshot からロードする（snapshot 必須）
+    triple_stats の記録はチャンクごとに os へ集める（ワーカーの分も親の os で flush する）。
+    保存は呼び出し側（batch_main）で行う。
+    戻り値: 処理した質問数
+    """
+    global _BATCH_OS
+    chunks = _iter_chunks(iter_batch_questions(lines, default_lang, context), chunk_size)
+    n = 0
+
+    if not workers or workers <= 1:
+        _BATCH_OS = os
+        for chunk in chunks:
+            for line in _answer_batch_chunk(chunk):
+                out.write(line + "\n")
+            n += len(chunk)
+            os.triple_stats.flush()
+        return n
+
+    import multiprocessing
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    frozen = False
+    if "fork" in multiprocessing.get_all_start_methods():
+        _BATCH_OS = os
+        # 親のオブジェクトを GC 対象から外し、子で参照カウント以外のページが書き換わらないようにする
+        # （プールを閉じたら unfreeze で戻す。長く動くプロセスに永続世代を残さない）
+        gc.freeze()
+        frozen = True
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_batch_worker,
+            initargs=(None,),
+        )
+    elif snapshot is not None:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker, initargs=(snapshot,))
+    else:
+        raise ValueError("fork が使えない環境では --snapshot を指定してください")
+
+    def emit(size, fut):
+        lines, records = fut.result()
+        out.write("".join(line + "\n" for line in lines))
+        if os is not None:
+            os.triple_stats.extend_pending(records)
+            os.triple_stats.flush()
+        return size
+
+    # 出力順を保つため、先頭から順に結果を待つ（先読みは workers * 2 チャンクまで）
+    try:
+        with pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((len(chunk), pool.submit(_answer_batch_chunk_in_worker, chunk)))
+                if len(pending) >= workers * 2:
+                    n += emit(*pending.popleft())
+            while pending:
+                n += emit(*pending.popleft())
+    finally:
+        if frozen:
+            gc.unfreeze()
+    return n
+
+
+def batch_main(args) -> None:
+    """--batch の実行部：質問を JSONL 応答に変換し、最後に questions/sec を stderr に出す。"""
+    with redirect_stdout(sys.stderr):
+        os = load_os(args.data_dir, args.snapshot, workers=args.load_workers)
+
+    src = sys.stdin if str(args.batch) == "-" else open(args.batch, encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        n = run_batch(
+            os,
+            src,
+            sys.stdout,
+            default_lang=args.lang,
+            workers=args.workers,
+            chunk_size=args.batch_chunk,
+            snapshot=args.snapshot,
+            context=args.context,
+        )
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        os.triple_stats.save()
+    sys.stdout.flush()
+    elapsed = time.perf_counter() - start
+    rate = n / elapsed if elapsed > 0 else 0.0
+    print(f"[INFO] answered {n} questions in {elapsed:.2f} s ({rate:.1f} questions/sec)", file=sys.stderr)
+
+
 def main():
-    os = MiniMeaningOS()
+    parser = argparse.ArgumentParser(description="Mini Meaning OS demo")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="CSV のあるディレクトリ")
+    parser.add_argument("--snapshot", type=Path, help="このスナップショットからロードする")
+    parser.add_argument("--compile-snapshot", type=Path, metavar="OUT", help="スナップショットを書き出して終了")
+    parser.add_argument("--load-workers", type=int, default=0, help="CSV を並列 parse するプロセス数")
+    parser.add_argument("--batch", metavar="FILE", help="質問ファイル（JSONL or 1 行 1 問、'-' で stdin）を非対話で処理する")
+    parser.add_argument("--lang", choices=["ja", "en"], default="ja", help="--batch の既定の質問言語")
+    parser.add_argument("--workers", type=int, default=0, help="--batch で質問を解くプロセス数")
+    parser.add_argument("--batch-chunk", type=int, default=DEFAULT_BATCH_CHUNK, help="ワーカーに渡す 1 チャンクの質問数")
+    parser.add_argument(
+        "--context",
+        type=json.loads,
+        help='問い合わせの文脈（JSON、例: \'{"region": "JP", "era": "Heisei"}\'）',
+    )
+    args = parser.parse_args()
+
+    if args.compile_snapshot:
+        compile_snapshot(args.data_dir, args.compile_snapshot, workers=args.load_workers)
+        return
+
+    if args.batch:
+        batch_main(args)
+        return
+
+    os = load_os(args.data_dir, args.snapshot, workers=args.load_workers)
     print("日本語で質問してください（空行 or 'exit' で終了）")
     print("例: 包丁の用途は何？ / 包丁の素材は？ / 包丁の分類は？")
     print("    切るのに使う道具は？ / 包丁について教えて")
@@ -1030,7 +4525,7 @@ def main():
         if not line or line.lower() == "exit":
             break
 
-        ans = answer_ja_question(os, line)
+        ans = answer_ja_question(os, line, args.context)
         print("JSON:")
         print(json.dumps(ans, ensure_ascii=False, indent=2))
 
@@ -1064,6 +4559,9 @@ def main():
 
         print("-" * 60)
 
+    # 対話中に積んだ triple_stats を反映して保存する
+    os.triple_stats.save()
+
 
 if __name__ == "__main__":
     main()
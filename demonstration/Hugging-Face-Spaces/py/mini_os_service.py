@@ -0,0 +1,440 @@
+# mini_os_service.py - MiniMeaningOS の非同期 HTTP/JSON サービス（ASGI）
+#
+# 1 つの MiniMeaningOS を共有して、次のエンドポイントを提供する:
+#   POST /ask         {"question": "...", "lang": "ja", "context": {...}}  → answer_*_question の結果
+#   POST /ask/batch   {"questions": [...], "lang": "ja", "context": {...}} → {"answers": [...]}
+#   GET  /triples     ?src=&rel=&dst=&domain=&polarity=&limit=            → {"triples": [...]}（各 triple に stats）
+#   GET  /profile     ?label=&lang=                                       → {"label": ..., "profile": {...}}
+#   GET  /evidence    ?triple_id=                                         → {"summary": {...}, "stats": {...}, "evidence": [...]}
+#   GET  /stats                                                           → サービス / 応答キャッシュ / triple_stats の統計
+#
+# context（問い合わせの文脈）は省略可。GET では region= / era= / year= / register= / medium=
+# （と /ask, /profile の domain=）のクエリパラメータで指定でき、region などはカンマ区切りで複数指定できる。
+# min_trust= / include_evidence= も同じく context として渡る。回答の各結果には evidence の集約値
+# （"evidence_summary"）と全件（"evidence"）が載る。include_evidence=false なら全件を省き、
+# 必要なときに /evidence で取る。
+#
+# 起動（Hugging-Face-Spaces/ 直下で）:
+#   python py/mini_os_service.py --port 8000 [--snapshot data/mini_os.snapshot]
+#
+# フレームワークには依存しない素の ASGI アプリなので、uvicorn などでそのまま動く。
+# Gradio（FastAPI）アプリへ mount することもできる（app.py 参照）。その場合は子アプリの
+# lifespan が呼ばれないので、親アプリの lifespan に service.lifespan を渡す。
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+try:
+    from .mini_os_demo import (
+        DATA_DIR,
+        MiniMeaningOS,
+        answer_batch,
+        answer_en_question,
+        answer_ja_question,
+        context_key,
+        context_options,
+        load_os,
+        pattern_latency_stats,
+        resolve_context,
+    )
+except ImportError:  # スクリプトとして直接実行したとき
+    from mini_os_demo import (
+        DATA_DIR,
+        MiniMeaningOS,
+        answer_batch,
+        answer_en_question,
+        answer_ja_question,
+        context_key,
+        context_options,
+        load_os,
+        pattern_latency_stats,
+        resolve_context,
+    )
+
+
+# /ask/batch 1 リクエストあたりの質問数上限
+MAX_BATCH_QUESTIONS = 1000
+# /triples の既定・上限件数
+DEFAULT_TRIPLE_LIMIT = 100
+MAX_TRIPLE_LIMIT = 10000
+# GET で context として受け付けるクエリパラメータ
+CONTEXT_PARAMS = ("domain", "region", "era", "year", "register", "medium", "min_trust", "include_evidence")
+
+
+class ServiceError(Exception):
+    """HTTP ステータス付きでクライアントへ返すエラー。"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ========== サービス本体 ==========
+
+class MiniOSService:
+    """
+    共有 MiniMeaningOS へのクエリを非同期に受け付ける。
+    - MiniMeaningOS はスレッドセーフではないので、クエリは専用の 1 スレッドで順に実行する
+      （イベントループは I/O を捌き続ける）
+    - 同時に受け付けるクエリは max_concurrency 件、待ちは max_pending 件まで。
+      それを超えたら 503 を返す
+    - 同じ (lang, 質問) が処理中なら、新しく実行せずその結果を待つ（リクエスト合流）
+    - triple_stats の記録バッファは flush_stats_periodically で反映し、save_interval ごとに保存する
+      （問い合わせの経路では flush しない。startup / shutdown で開始・停止し、終了時には残りも反映して保存する）
+    """
+
+    def __init__(self, os: MiniMeaningOS, max_concurrency: int = 32, max_pending: int = 256):
+        self.os = os
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mini-os")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._flusher: Optional[asyncio.Future] = None
+        self.requests = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    async def _run(self, fn, *args):
+        """fn(*args) を同時実行数の制限つきで OS スレッドに投げる。"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        if self._slots.locked() and self._waiting >= self.max_pending:
+            self.rejected += 1
+            raise ServiceError(503, "too many pending requests")
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    async def ask(self, question: str, lang: str = "ja", context: Optional[Dict[str, Any]] = None) -> dict:
+        self.requests += 1
+        question = (question or "").strip()
+        if not question:
+            raise ServiceError(400, "question is empty")
+        answer = answer_ja_question if lang == "ja" else answer_en_question
+
+        key = (lang, question, _context_key(context))
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # 計算は最初のリクエストから切り離した task で行い、各リクエストは shield して待つ
+            # （最初のリクエストがキャンセルされても、合流した側には結果が届く）
+            task = asyncio.ensure_future(self._run(answer, self.os, question, context))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish_inflight(key, t))
+        return await asyncio.shield(task)
+
+    def _finish_inflight(self, key: tuple, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 待っていた側が全員キャンセル済みでも「未取得の例外」警告を出さないようにする
+        if not task.cancelled():
+            task.exception()
+
+    async def ask_batch(
+        self,
+        questions: List[str],
+        lang: str = "ja",
+        context: Optional[Dict[str, Any]] = None,
+    ) -> List[dict]:
+        self.requests += 1
+        if len(questions) > MAX_BATCH_QUESTIONS:
+            raise ServiceError(413, f"too many questions (max {MAX_BATCH_QUESTIONS})")
+        _context_key(context)
+        return await self._run(answer_batch, self.os, questions, lang, context)
+
+    async def triples(
+        self,
+        src: Optional[str] = None,
+        rel: Optional[str] = None,
+        dst: Optional[str] = None,
+        domain: Optional[str] = None,
+        polarity: str = "positive",
+        limit: int = DEFAULT_TRIPLE_LIMIT,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        self.requests += 1
+        if not (src or rel or dst or domain or context):
+            raise ServiceError(400, "one of src / rel / dst / domain / context is required")
+        _context_key(context)
+        limit = max(0, min(limit, MAX_TRIPLE_LIMIT))
+
+        def query():
+            found = self.os.find_triples(
+                src=src, rel=rel, dst=dst, domain=domain, polarity=polarity, context=context
+            )
+            return [{**triple_to_dict(t), "stats": self.os.stats_for(t.triple_id)} for t in found[:limit]]
+
+        return await self._run(query)
+
+    async def profile(
+        self,
+        label: str,
+        lang: str = "ja",
+        context: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        self.requests += 1
+        if not label:
+            raise ServiceError(400, "label is required")
+        _context_key(context)
+        return await self._run(self.os.render_profile, label, lang, context)
+
+    async def evidence(self, triple_id: str) -> Dict[str, Any]:
+        self.requests += 1
+        if not triple_id:
+            raise ServiceError(400, "triple_id is required")
+
+        def query():
+            return {
+                "triple_id": triple_id,
+                "summary": self.os.evidence_summary_for(triple_id),
+                "stats": self.os.stats_for(triple_id),
+                "evidence": self.os.get_evidence_for_triple(triple_id),
+            }
+
+        return await self._run(query)
+
+    async def flush_stats_periodically(self) -> None:
+        """
+        triple_stats のバッファを一定間隔で反映し、変わっていれば save_interval ごとに保存する
+        （OS スレッドで実行、lifespan から起動）。
+        """
+        store = self.os.triple_stats
+        loop = asyncio.get_running_loop()
+        last_save = loop.time()
+        while True:
+            await asyncio.sleep(store.flush_interval)
+            if store.summary()["pending"]:
+                await loop.run_in_executor(self._executor, store.flush)
+            if store.dirty and loop.time() - last_save >= store.save_interval:
+                await loop.run_in_executor(self._executor, store.save)
+                last_save = loop.time()
+
+    async def startup(self) -> None:
+        """起動時の処理（triple_stats の定期 flush を始める）。"""
+        if self._flusher is None:
+            self._flusher = asyncio.ensure_future(self.flush_stats_periodically())
+
+    async def shutdown(self) -> None:
+        """終了時の処理（定期 flush を止め、残りのバッファを反映して保存する）。"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.os.triple_stats.save)
+
+    @asynccontextmanager
+    async def lifespan(self, app=None):
+        """
+        startup / shutdown をまとめた lifespan。
+        FastAPI などへ mount したときは子アプリの lifespan が呼ばれないので、
+        親アプリに FastAPI(lifespan=service.lifespan) として渡す。
+        """
+        await self.startup()
+        try:
+            yield
+        finally:
+            await self.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "inflight": len(self._inflight),
+            "waiting": self._waiting,
+            "query_cache": self.os.query_cache_stats(),
+            "triple_stats": self.os.triple_stats.summary(),
+            "patterns": pattern_latency_stats(),
+        }
+
+
+def _context_key(context: Optional[Dict[str, Any]]) -> Optional[tuple]:
+    """context を検証し、リクエスト合流のキーにできる形にする（None はそのまま）。"""
+    if context is None:
+        return None
+    try:
+        return context_key(resolve_context(context)) + context_key(context_options(context))
+    except TypeError as e:
+        raise ServiceError(400, f"invalid context: {e}")
+
+
+def triple_to_dict(t) -> Dict[str, Any]:
+    if hasattr(t, "to_triple"):  # compact モードの TripleView
+        t = t.to_triple()
+    return asdict(t)
+
+
+# ========== ASGI アプリ ==========
+
+def _json_body(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+def _parse_json(body: bytes) -> Dict[str, Any]:
+    try:
+        data = json.loads(body or b"{}")
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ServiceError(400, f"invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ServiceError(400, "JSON object expected")
+    return data
+
+
+def _lang(value: Optional[str]) -> str:
+    lang = value or "ja"
+    if lang not in ("ja", "en"):
+        raise ServiceError(400, f"unsupported lang: {lang!r}")
+    return lang
+
+
+def _query_context(query: Dict[str, str], keys=CONTEXT_PARAMS) -> Optional[Dict[str, Any]]:
+    """GET のクエリパラメータから context を作る（該当パラメータが無ければ None）。"""
+    context: Dict[str, Any] = {}
+    for k in keys:
+        value = query.get(k)
+        if value is None:
+            continue
+        if k == "include_evidence":
+            context[k] = value.strip().lower() in ("1", "true", "yes")
+            continue
+        values = [v.strip() for v in value.split(",") if v.strip()]
+        if values:
+            context[k] = values[0] if len(values) == 1 else values
+    return context or None
+
+
+def create_app(service: MiniOSService):
+    """service を叩く ASGI アプリを返す。"""
+
+    async def handle(method: str, path: str, query: Dict[str, str], body: bytes) -> Any:
+        if path == "/ask":
+            if method == "GET":
+                return await service.ask(query.get("q", ""), _lang(query.get("lang")), _query_context(query))
+            if method == "POST":
+                data = _parse_json(body)
+                return await service.ask(data.get("question", ""), _lang(data.get("lang")), data.get("context"))
+        elif path == "/ask/batch" and method == "POST":
+            data = _parse_json(body)
+            questions = data.get("questions")
+            if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+                raise ServiceError(400, "questions must be a list of strings")
+            answers = await service.ask_batch(questions, _lang(data.get("lang")), data.get("context"))
+            return {"answers": answers}
+        elif path == "/triples" and method == "GET":
+            try:
+                limit = int(query.get("limit", DEFAULT_TRIPLE_LIMIT))
+            except ValueError:
+                raise ServiceError(400, "limit must be an integer")
+            triples = await service.triples(
+                src=query.get("src"),
+                rel=query.get("rel"),
+                dst=query.get("dst"),
+                domain=query.get("domain"),
+                polarity=query.get("polarity", "positive"),
+                limit=limit,
+                context=_query_context(query, keys=[k for k in CONTEXT_PARAMS if k != "domain"]),
+            )
+            return {"triples": triples}
+        elif path == "/profile" and method == "GET":
+            label = query.get("label", "")
+            profile = await service.profile(label, _lang(query.get("lang")), _query_context(query))
+            return {"label": label, "profile": profile}
+        elif path == "/evidence" and method == "GET":
+            return await service.evidence(query.get("triple_id", ""))
+        elif path == "/stats" and method == "GET":
+            return service.stats()
+        else:
+            raise ServiceError(404, f"not found: {path}")
+        raise ServiceError(405, f"method not allowed: {method}")
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await service.startup()
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await service.shutdown()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        # mount された場合は root_path 以降をルーティングに使う
+        path = scope["path"]
+        root = scope.get("root_path", "")
+        if root and path.startswith(root):
+            path = path[len(root):]
+        path = path.rstrip("/") or "/"
+        query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode("utf-8")).items()}
+
+        body = await _read_body(receive)
+        try:
+            status, payload = 200, await handle(scope["method"], path, query, body)
+        except ServiceError as e:
+            status, payload = e.status, {"error": e.message}
+
+        data = _json_body(payload)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json; charset=utf-8"),
+                (b"content-length", str(len(data)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+    return app
+
+
+# ========== スクリプトとしての実行部 ==========
+
+def main():
+    parser = argparse.ArgumentParser(description="Mini Meaning OS HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="CSV のあるディレクトリ")
+    parser.add_argument("--snapshot", type=Path, help="このスナップショットからロードする")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="同時に受け付けるクエリ数")
+    parser.add_argument("--max-pending", type=int, default=256, help="受付待ちの上限（超えたら 503）")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    service = MiniOSService(
+        load_os(args.data_dir, args.snapshot),
+        max_concurrency=args.max_concurrency,
+        max_pending=args.max_pending,
+    )
+    uvicorn.run(create_app(service), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# conftest.py - MiniMeaningOS のテスト共通の準備
+#
+# 使い方（Hugging-Face-Spaces/ 直下で）:
+#   python -m pytest -q tests
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).resolve().parent
+APP_DIR = HERE.parent
+# site-packages の "py" パッケージと衝突しないよう、py/ 自体をパスに入れて直接 import する
+sys.path.insert(0, str(APP_DIR / "py"))
+
+import mini_os_demo  # noqa: E402
+from bench_mini_os import write_synthetic_data  # noqa: E402
+
+DATA_DIR = APP_DIR / "data"
+
+
+@pytest.fixture(scope="session")
+def demo_os():
+    """同梱データ（data/）をロードした OS。書き換えるテストでは使わないこと。"""
+    return mini_os_demo.MiniMeaningOS(data_dir=DATA_DIR)
+
+
+@pytest.fixture
+def data_copy(tmp_path):
+    """同梱データのコピー（add_triples の追記ログや triple_stats を書いてよい）。"""
+    d = tmp_path / "data"
+    shutil.copytree(DATA_DIR, d, ignore=shutil.ignore_patterns("*.snapshot", "*.log.jsonl", "triple_stats.json"))
+    return d
+
+
+@pytest.fixture(scope="session")
+def synthetic_dir(tmp_path_factory):
+    """合成データ（順方向 2000 件 + 逆方向）のディレクトリ。"""
+    d = tmp_path_factory.mktemp("synthetic")
+    write_synthetic_data(d, 2000)
+    return d
+
+
+@pytest.fixture(scope="session")
+def synthetic_os(synthetic_dir):
+    return mini_os_demo.MiniMeaningOS(data_dir=synthetic_dir)
+
+
+def scan_ids(os, **kw):
+    """全件走査（インデックスを使わない）での find_triples 相当の triple_id 列。"""
+    wanted = dict(kw.pop("conditions", None) or {})
+    domain = kw.pop("domain", None)
+    if domain:
+        wanted["domain"] = [domain]
+    return [
+        t.triple_id
+        for t in os._scan_triples(kw.get("src"), kw.get("rel"), kw.get("dst"), wanted, kw.get("polarity", "positive"))
+    ]
+
+
+def without_stats(answer):
+    """応答から triple_stats（時刻と使用回数で変わる）を除いたもの。応答の比較用。"""
+    return {k: v for k, v in answer.items() if k != "triple_stats"}
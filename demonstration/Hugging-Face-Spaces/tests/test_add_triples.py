@@ -0,0 +1,88 @@
+import pytest
+
+from mini_os_demo import FrozenConditions, MiniMeaningOS, Triple, TRIPLE_LOG, snapshot_is_fresh
+
+
+def new_triple(triple_id, src="core:knife.generic-001", dst="core:steel-001", **kw):
+    return Triple(
+        triple_id=triple_id, src=src, rel="core:material-001", dst=dst,
+        conditions=kw.pop("conditions", {"domain": ["cooking"]}), polarity="positive", status="active",
+        is_reverse=False, reverse_of=None, created_at="", note="", **kw,
+    )
+
+
+def material_ids(os):
+    return {t.triple_id for t in os.find_triples(src="core:knife.generic-001", rel="core:material-001")}
+
+
+def test_reverse_shares_frozen_conditions(data_copy):
+    os = MiniMeaningOS(data_dir=data_copy)
+    fwd, rev = os.add_triples([new_triple("t9001")])
+    assert isinstance(fwd.conditions, FrozenConditions)
+    assert rev.conditions is fwd.conditions
+    assert rev.triple_id == "r9001" and rev.src == "core:steel-001"
+    assert material_ids(os) == {"t9001"}
+
+
+@pytest.mark.parametrize("bad", [
+    dict(src="core:no-such-core"),
+    dict(dst="core:no-such-core"),
+])
+def test_unknown_core_is_rejected_before_logging(data_copy, bad):
+    os = MiniMeaningOS(data_dir=data_copy)
+    generation = os.generation
+    with pytest.raises(ValueError, match="unknown core"):
+        os.add_triples([new_triple("t9001"), new_triple("t9002", **bad)])
+    assert not (data_copy / TRIPLE_LOG.name).exists()
+    assert os.generation == generation
+    assert material_ids(os) == set()
+
+
+def test_failed_ingest_rolls_back_log(data_copy, monkeypatch):
+    os = MiniMeaningOS(data_dir=data_copy)
+    os.add_triples([new_triple("t9001")])
+    log = data_copy / TRIPLE_LOG.name
+    size = log.stat().st_size
+
+    def broken(t):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(os, "_ingest_triple", broken)
+    with pytest.raises(RuntimeError):
+        os.add_triples([new_triple("t9002")])
+    assert log.stat().st_size == size == os.triple_log_offset
+    assert material_ids(MiniMeaningOS(data_dir=data_copy)) == {"t9001"}
+
+
+def test_snapshot_replays_log_tail(data_copy, capsys):
+    os = MiniMeaningOS(data_dir=data_copy)
+    os.add_triples([new_triple("t9001")])
+    path = data_copy / "mini_os.snapshot"
+    os.save_snapshot(path)
+    # ログが伸びた後のスナップショットでも、書き出し時点の data_dir と一致する
+    assert snapshot_is_fresh(path, data_copy)
+
+    os.add_triples([new_triple("t9002", dst="core:ceramic-001")])
+    assert not snapshot_is_fresh(path, data_copy)
+    capsys.readouterr()
+    loaded = MiniMeaningOS.from_snapshot(path)
+    out = capsys.readouterr().out
+    assert "[WARN]" not in out
+    assert "replayed 1 triples" in out
+    assert material_ids(loaded) == {"t9001", "t9002"}
+    assert loaded.triple_log_offset == (data_copy / TRIPLE_LOG.name).stat().st_size
+
+
+def test_partial_last_line_is_not_consumed(data_copy):
+    os = MiniMeaningOS(data_dir=data_copy)
+    os.add_triples([new_triple("t9001")])
+    log = data_copy / TRIPLE_LOG.name
+    size = log.stat().st_size
+    with log.open("ab") as f:
+        f.write(b'{"op": "add_triples", "triples": [')
+    reloaded = MiniMeaningOS(data_dir=data_copy)
+    assert reloaded.triple_log_offset == size
+    assert material_ids(reloaded) == {"t9001"}
+    # 次の追記は切れた行とは別の行に書かれ、再生できる
+    reloaded.add_triples([new_triple("t9002", dst="core:ceramic-001")])
+    assert material_ids(MiniMeaningOS(data_dir=data_copy)) == {"t9001", "t9002"}
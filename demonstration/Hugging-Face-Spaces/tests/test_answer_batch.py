@@ -0,0 +1,42 @@
+from conftest import without_stats
+from mini_os_demo import MiniMeaningOS, answer_batch, answer_en_question, answer_ja_question
+
+JA_QUESTIONS = [
+    "包丁の用途は？",
+    "包丁の素材は？",
+    "包丁の用途は？",
+    "ナイフって何？",
+    "存在しない語の用途は？",
+    "これは質問ではありません",
+    "包丁の用途は？",
+]
+EN_QUESTIONS = ["What is a knife made of?", "What is a knife used for?", "What is a knife made of?"]
+
+
+def test_answer_batch_matches_single_answers(data_copy):
+    single_os = MiniMeaningOS(data_dir=data_copy)
+    batch_os = MiniMeaningOS(data_dir=data_copy)
+    expected = [without_stats(answer_ja_question(single_os, q)) for q in JA_QUESTIONS]
+    got = [without_stats(a) for a in answer_batch(batch_os, JA_QUESTIONS, "ja")]
+    assert got == expected
+
+    expected = [without_stats(answer_en_question(single_os, q)) for q in EN_QUESTIONS]
+    got = [without_stats(a) for a in answer_batch(batch_os, EN_QUESTIONS, "en")]
+    assert got == expected
+
+
+def test_answer_batch_with_context(data_copy):
+    os = MiniMeaningOS(data_dir=data_copy)
+    context = {"domain": "cooking", "include_evidence": True}
+    got = answer_batch(os, JA_QUESTIONS[:2], "ja", context)
+    for q, ans in zip(JA_QUESTIONS[:2], got):
+        assert without_stats(ans) == without_stats(answer_ja_question(os, q, context))
+        assert ans["context"]["domain"] == "cooking"
+
+
+def test_answer_batch_counts_every_question(data_copy):
+    os = MiniMeaningOS(data_dir=data_copy)
+    answers = answer_batch(os, ["包丁の用途は？"] * 3, "ja")
+    os.triple_stats.flush()
+    for triple_id in answers[0]["triple_stats"]:
+        assert os.stats_for(triple_id)["usage_total"] == 3
@@ -0,0 +1,89 @@
+import gc
+import io
+import json
+
+import pytest
+
+from conftest import without_stats
+from mini_os_demo import answer_en_question, answer_ja_question, iter_batch_questions, run_batch
+
+INPUT = """包丁の用途は？
+
+{"question": "What is a knife made of?", "lang": "en"}
+{"text": "包丁の素材は？", "context": {"domain": "cooking"}}
+包丁の素材は？
+"""
+
+
+def test_iter_batch_questions():
+    items = list(iter_batch_questions(INPUT.splitlines(), default_lang="ja"))
+    assert items == [
+        ("ja", "包丁の用途は？", None),
+        ("en", "What is a knife made of?", None),
+        ("ja", "包丁の素材は？", {"domain": "cooking"}),
+        ("ja", "包丁の素材は？", None),
+    ]
+
+
+def expected_lines(os):
+    out = []
+    for lang, q, ctx in iter_batch_questions(INPUT.splitlines()):
+        ask = answer_ja_question if lang == "ja" else answer_en_question
+        # 出力は JSON なので、タプルはリストになる
+        out.append(without_stats(json.loads(json.dumps(ask(os, q, ctx), ensure_ascii=False))))
+    return out
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_run_batch_keeps_input_order(demo_os, workers):
+    out = io.StringIO()
+    n = run_batch(demo_os, io.StringIO(INPUT), out, workers=workers, chunk_size=1)
+    assert n == 4
+    got = [without_stats(json.loads(line)) for line in out.getvalue().splitlines()]
+    assert got == expected_lines(demo_os)
+
+
+def test_run_batch_from_snapshot(demo_os, tmp_path, monkeypatch):
+    import multiprocessing
+
+    path = tmp_path / "demo.snapshot"
+    demo_os.save_snapshot(path)
+    # fork が使えない環境と同じ経路（各ワーカーが snapshot からロード）を通す
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    out = io.StringIO()
+    assert run_batch(None, io.StringIO(INPUT), out, workers=2, chunk_size=2, snapshot=path) == 4
+    got = [without_stats(json.loads(line)) for line in out.getvalue().splitlines()]
+    assert got == expected_lines(demo_os)
+
+
+def test_run_batch_needs_snapshot_without_fork(monkeypatch):
+    import multiprocessing
+
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    with pytest.raises(ValueError):
+        run_batch(None, io.StringIO(INPUT), io.StringIO(), workers=2)
+
+
+def test_run_batch_keeps_per_line_options(demo_os):
+    # 文脈は同じで応答オプションだけが違う行は、同じチャンクでも別々に答える
+    lines = [
+        {"question": "包丁の素材は？", "context": {"domain": "cooking"}},
+        {"question": "包丁の素材は？", "context": {"domain": "cooking", "include_evidence": False}},
+        {"question": "包丁の素材は？", "context": {"domain": "cooking", "min_trust": 0.9}},
+    ]
+    text = "\n".join(json.dumps(obj, ensure_ascii=False) for obj in lines)
+    out = io.StringIO()
+    assert run_batch(demo_os, io.StringIO(text), out, chunk_size=3) == 3
+    got = [without_stats(json.loads(line)) for line in out.getvalue().splitlines()]
+    expected = [
+        without_stats(json.loads(json.dumps(answer_ja_question(demo_os, obj["question"], obj["context"]), ensure_ascii=False)))
+        for obj in lines
+    ]
+    assert got == expected
+    assert len({json.dumps(a, sort_keys=True) for a in got}) == 3
+
+
+def test_run_batch_unfreezes_gc(demo_os):
+    before = gc.get_freeze_count()
+    run_batch(demo_os, io.StringIO(INPUT), io.StringIO(), workers=2, chunk_size=2)
+    assert gc.get_freeze_count() == before
@@ -0,0 +1,77 @@
+import random
+from collections import defaultdict
+
+from mini_os_demo import CategoryClosure, MiniMeaningOS, answer_ja_question
+
+
+def naive_ancestors(edges, core):
+    parents = defaultdict(set)
+    for child, parent in edges:
+        parents[child].add(parent)
+    seen, stack = set(), list(parents[core])
+    while stack:
+        p = stack.pop()
+        if p not in seen:
+            seen.add(p)
+            stack.extend(parents[p])
+    return seen
+
+
+def random_edges(n_nodes, n_edges, seed):
+    rng = random.Random(seed)
+    nodes = [f"c{i}" for i in range(n_nodes)]
+    return [(rng.choice(nodes), rng.choice(nodes)) for _ in range(n_edges)], nodes
+
+
+def test_build_matches_naive_closure():
+    for seed in range(5):
+        edges, nodes = random_edges(40, 60, seed)  # 循環や自己ループも含む
+        closure = CategoryClosure.build(edges)
+        for core in nodes:
+            expected = naive_ancestors(edges, core)
+            assert set(closure.ancestors(core)) == expected
+            for other in nodes:
+                assert closure.is_ancestor(other, core) == (other in expected)
+                assert (core in closure.descendants(other)) == (other in expected)
+
+
+def test_incremental_edges_match_rebuild():
+    edges, nodes = random_edges(30, 50, 7)
+    closure = CategoryClosure.build(edges[:10])
+    for child, parent in edges[10:]:
+        closure.add_edge(child, parent)
+    rebuilt = CategoryClosure.build(edges)
+    for core in nodes:
+        assert set(closure.ancestors(core)) == set(rebuilt.ancestors(core))
+        assert set(closure.descendants(core)) == set(rebuilt.descendants(core))
+    assert closure.matches(edges)
+    assert not closure.matches(edges[:-1] + [("x", "y")])
+
+
+def test_closure_agrees_with_traversal(synthetic_os):
+    cores = sorted({t.src for t in synthetic_os.triples[:3000:150]})
+    for core in cores:
+        # 閉包は循環上の core を自分の祖先に含むが、reachable は始点を除く
+        ancestors = set(synthetic_os.category_ancestors(core)) - {core}
+        assert ancestors == set(synthetic_os.reachable(core, "core:category-001"))
+        for ancestor in list(ancestors)[:5]:
+            assert synthetic_os.is_kind_of(core, ancestor)
+            assert core in synthetic_os.category_descendants(ancestor)
+
+
+def test_isa_question(demo_os):
+    ans = answer_ja_question(demo_os, "包丁は刃物の一種？")
+    assert ans["pattern_id"] == "ISA_1"
+    assert [r["value"] for r in ans["results"]] == [True]
+    ans = answer_ja_question(demo_os, "刃物は包丁の一種？")
+    assert [r["value"] for r in ans["results"]] == [False]
+
+
+def test_snapshot_closure_is_checked_against_triples(data_copy, tmp_path):
+    os = MiniMeaningOS(data_dir=data_copy)
+    os.category_closure.add_edge("core:knife.kitchen-001", "core:bogus-001")  # triple と食い違う閉包
+    path = tmp_path / "stale.snapshot"
+    os.save_snapshot(path)
+    loaded = MiniMeaningOS.from_snapshot(path)
+    assert "core:bogus-001" not in loaded.category_ancestors("core:knife.kitchen-001")
+    assert loaded.is_kind_of("core:knife.kitchen-001", "core:blade-tool-001")
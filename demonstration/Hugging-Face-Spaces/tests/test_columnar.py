@@ -0,0 +1,45 @@
+import itertools
+
+import pytest
+
+from conftest import scan_ids, without_stats
+from mini_os_demo import MiniMeaningOS, answer_ja_question
+
+pytest.importorskip("numpy")
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["python-ids", "compact"])
+def columnar_os(request, synthetic_dir):
+    return MiniMeaningOS(data_dir=synthetic_dir, backend="columnar", compact=request.param)
+
+
+def test_columnar_find_triples_match_scan(columnar_os):
+    os = columnar_os
+    sample = os.triples[::173]
+    srcs = [None] + [t.src for t in sample[:3]]
+    rels = [None, "core:material-001", "core:category-of-001"]
+    dsts = [None] + [t.dst for t in sample[3:5]]
+    for src, rel, dst in itertools.product(srcs, rels, dsts):
+        for polarity in ("positive", "negative"):
+            for domain in (None, "medicine"):
+                if not (src or rel or dst or domain):
+                    continue
+                got = [t.triple_id for t in os.find_triples(src=src, rel=rel, dst=dst, polarity=polarity, domain=domain)]
+                assert got == scan_ids(os, src=src, rel=rel, dst=dst, polarity=polarity, domain=domain)
+
+
+def test_columnar_conditions_match_scan(columnar_os):
+    for wanted in ({"domain": ["cooking", "law"]}, {"domain": "cooking", "lang": "ja"}, {"freq": 0.5}):
+        got = [t.triple_id for t in columnar_os.find_triples(rel="core:use-purpose-001", conditions=wanted)]
+        assert got == scan_ids(columnar_os, rel="core:use-purpose-001", conditions=wanted)
+
+
+def test_columnar_answers_match_python(demo_os):
+    os = MiniMeaningOS(backend="columnar")
+    for q in ("包丁の素材は？", "包丁の用途は？", "ナイフの素材は？"):
+        assert without_stats(answer_ja_question(os, q)) == without_stats(answer_ja_question(demo_os, q))
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        MiniMeaningOS(backend="sqlite")
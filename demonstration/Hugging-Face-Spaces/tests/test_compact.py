@@ -0,0 +1,58 @@
+import itertools
+
+import pytest
+
+from conftest import without_stats
+from mini_os_demo import MiniMeaningOS, answer_en_question, answer_ja_question
+
+
+@pytest.fixture(scope="module")
+def compact_os(synthetic_dir):
+    return MiniMeaningOS(data_dir=synthetic_dir, compact=True)
+
+
+def test_compact_triples_match_default(synthetic_os, compact_os):
+    assert len(compact_os.triples) == len(synthetic_os.triples)
+    for a, b in zip(synthetic_os.triples, compact_os.triples):
+        assert (a.triple_id, a.src, a.rel, a.dst, a.polarity) == (b.triple_id, b.src, b.rel, b.dst, b.polarity)
+        assert dict(a.conditions) == dict(b.conditions)
+
+
+def test_compact_find_triples_match_default(synthetic_os, compact_os):
+    sample = synthetic_os.triples[::211]
+    srcs = [None] + [t.src for t in sample[:4]]
+    rels = [None, "core:material-001", "core:use-purpose-001"]
+    for src, rel in itertools.product(srcs, rels):
+        if not (src or rel):
+            continue
+        for domain in (None, "cooking"):
+            expected = [t.triple_id for t in synthetic_os.find_triples(src=src, rel=rel, domain=domain)]
+            got = [t.triple_id for t in compact_os.find_triples(src=src, rel=rel, domain=domain)]
+            assert got == expected
+
+
+def test_compact_shares_condition_objects(compact_os):
+    seen = {}
+    for t in compact_os.triples:
+        key = tuple(sorted((k, repr(v)) for k, v in t.conditions.items()))
+        seen.setdefault(key, t.conditions)
+        assert seen[key] is t.conditions
+
+
+def test_compact_answers_match_default(demo_os):
+    compact = MiniMeaningOS(compact=True)
+    for q in ("包丁の素材は？", "包丁の用途は？"):
+        assert without_stats(answer_ja_question(compact, q)) == without_stats(answer_ja_question(demo_os, q))
+    q = "What is a knife made of?"
+    assert without_stats(answer_en_question(compact, q)) == without_stats(answer_en_question(demo_os, q))
+    assert compact.render_profile("包丁") == demo_os.render_profile("包丁")
+
+
+def test_triple_views_hash_like_they_compare(synthetic_dir, compact_os):
+    other = MiniMeaningOS(data_dir=synthetic_dir, compact=True)
+    a, b = compact_os.triples[3], other.triples[3]
+    assert a is not b and a == b
+    assert hash(a) == hash(b)
+    assert len({a, b, compact_os.triples[3]}) == 1
+    assert a != compact_os.triples[4]
+    assert a == a.to_triple()
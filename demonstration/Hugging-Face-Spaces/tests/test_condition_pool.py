@@ -0,0 +1,54 @@
+import copy
+import json
+import pickle
+
+import pytest
+
+from mini_os_demo import EMPTY_CONDITIONS, FrozenConditions, _fix_raw_json, condition_cache_stats
+
+
+def test_same_raw_string_shares_one_object():
+    raw = '{""domain"": [""cooking""], ""region"": [""JP""]}'
+    a = _fix_raw_json(raw, "test")
+    b = _fix_raw_json(raw, "test")
+    assert a is b
+    assert isinstance(a, FrozenConditions)
+    assert a == {"domain": ("cooking",), "region": ("JP",)}
+    assert json.loads(json.dumps(a)) == {"domain": ["cooking"], "region": ["JP"]}
+
+
+def test_comments_and_bad_json():
+    assert _fix_raw_json('{"lang": "ja"} ←メモ', "test") == {"lang": "ja"}
+    assert _fix_raw_json("", "test") is EMPTY_CONDITIONS
+    assert _fix_raw_json("{}", "test") == {}
+    assert _fix_raw_json("{broken", "test") is EMPTY_CONDITIONS
+    assert _fix_raw_json("not json", "test") is EMPTY_CONDITIONS
+
+
+def test_frozen_conditions_are_read_only():
+    c = _fix_raw_json('{"domain": ["law"], "meta": {"k": [1, 2]}}', "test")
+    with pytest.raises(TypeError):
+        c["domain"] = ["cooking"]
+    with pytest.raises(TypeError):
+        c.update(lang="ja")
+    with pytest.raises(TypeError):
+        c["meta"]["k"] = []
+    assert copy.deepcopy(c) is c
+    restored = pickle.loads(pickle.dumps(c))
+    assert isinstance(restored, FrozenConditions) and restored == c
+
+
+def test_condition_cache_stats_count_hits():
+    raw = '{"domain": ["test-stats"]}'
+    before = condition_cache_stats()
+    _fix_raw_json(raw, "test")
+    _fix_raw_json(raw, "test")
+    after = condition_cache_stats()
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+    assert 0.0 <= after["hit_rate"] <= 1.0
+
+
+def test_loaded_rows_share_conditions(synthetic_os):
+    distinct = {id(t.conditions) for t in synthetic_os.triples}
+    assert len(distinct) < 20
@@ -0,0 +1,71 @@
+import itertools
+
+from conftest import scan_ids
+from mini_os_demo import TripleIndex, compile_conditions, compile_wanted, cond_match
+
+CONDITIONS = [
+    {},
+    {"domain": ["cooking"], "region": ["US"], "freq": 1.0},
+    {"domain": ["cooking", "medicine"], "register": "formal"},
+    {"domain": "cooking", "lang": ["ja"]},
+    {"domain": ["law"], "medium": ["print", "web"], "freq": 0.5},
+    {"domain": ["cooking"], "tags": [{"k": "v"}]},
+]
+
+WANTED = [
+    {"domain": "cooking"},
+    {"domain": ["cooking", "law"]},
+    {"domain": ["medicine"], "register": "formal"},
+    {"medium": "web"},
+    {"freq": 0.5},
+    {"lang": ["en"]},
+    {"domain": None},
+    {"tags": [{"k": "v"}]},
+]
+
+
+def test_compiled_predicates_agree_with_cond_match():
+    for cond, wanted in itertools.product(CONDITIONS, WANTED):
+        pred = compile_wanted(wanted)
+        expected = cond_match(cond, wanted)
+        got = True if pred is None else pred(compile_conditions(cond))
+        assert got == expected, (cond, wanted)
+
+
+def test_empty_wanted_compiles_to_none():
+    assert compile_wanted({}) is None
+    assert compile_wanted({"domain": None}) is None
+
+
+def test_condition_posting_lists_match_scan(synthetic_os):
+    queries = [
+        dict(conditions={"domain": "cooking"}),
+        dict(rel="core:material-001", conditions={"domain": ["medicine"]}),
+        dict(conditions={"domain": "cooking", "freq": 0.7}),
+        dict(src=synthetic_os.triples[10].src, conditions={"domain": "cooking"}),
+    ]
+    for kw in queries:
+        got = [t.triple_id for t in synthetic_os.find_triples(**kw)]
+        assert got == scan_ids(synthetic_os, **kw)
+
+
+def test_multi_value_condition_skips_union_when_spo_is_shorter(synthetic_os, monkeypatch):
+    os = synthetic_os
+    t = os.triples[10]
+    wanted = {"domain": ["cooking", "medicine", "law"]}
+    spo = os.triple_index.candidates(src=t.src, rel=t.rel)
+    postings = os.triple_index.condition_postings("domain", wanted["domain"])
+    assert len(spo) < sum(map(len, postings))
+
+    merged = []
+    merge = TripleIndex.merge_postings
+    # インスタンスに属性を残すと共有の synthetic_os がスナップショットに書けなくなるので、クラスを差し替える
+    monkeypatch.setattr(TripleIndex, "merge_postings", staticmethod(lambda p: merged.append(p) or merge(p)))
+    got = [x.triple_id for x in os.find_triples(src=t.src, rel=t.rel, conditions=wanted)]
+    assert merged == []
+    assert got == scan_ids(os, src=t.src, rel=t.rel, conditions=wanted)
+
+    # SPO の指定が無ければ和集合を作って起点にする
+    got = [x.triple_id for x in os.find_triples(conditions=wanted)]
+    assert len(merged) == 1
+    assert got == scan_ids(os, conditions=wanted)
@@ -0,0 +1,60 @@
+import pytest
+
+from mini_os_demo import answer_ja_question, context_key, context_options, resolve_context
+
+
+def values(ans):
+    """素材の質問の結果（core と表示ラベル）の先頭ラベル。"""
+    return sorted(r["labels"][0] for r in ans["results"])
+
+
+def test_resolve_context():
+    assert resolve_context(None) == {"domain": "cooking"}
+    assert resolve_context({"domain": None, "region": "JP"}) == {"region": "JP"}
+    assert resolve_context({"year": 1990, "era": "", "min_trust": 0.5}) == {
+        "domain": "cooking", "year_range": [1990, 1990],
+    }
+    with pytest.raises(TypeError):
+        resolve_context(["JP"])
+
+
+def test_context_options():
+    assert context_options(None) == {}
+    assert context_options({"min_trust": "0.2", "include_evidence": 1}) == {
+        "min_trust": 0.2, "include_evidence": True,
+    }
+    with pytest.raises(TypeError):
+        context_options({"min_trust": "high"})
+
+
+def test_context_key_is_order_independent():
+    a = context_key(resolve_context({"region": ["JP", "US"], "era": "Edo"}))
+    b = context_key(resolve_context({"era": "Edo", "region": ["JP", "US"]}))
+    assert a == b and hash(a) == hash(b)
+
+
+def test_context_narrows_answers(demo_os):
+    q = "包丁の素材は？"
+    assert values(answer_ja_question(demo_os, q)) == ["セラミック", "鋼"]
+    assert values(answer_ja_question(demo_os, q, {"era": "Showa"})) == ["鋼"]
+    assert values(answer_ja_question(demo_os, q, {"year": 2020})) == ["セラミック"]
+    assert values(answer_ja_question(demo_os, q, {"year": 1900})) == []
+    assert values(answer_ja_question(demo_os, q, {"region": "US"})) == []
+    assert values(answer_ja_question(demo_os, q, {"domain": "law"})) == []
+    assert values(answer_ja_question(demo_os, q, {"domain": None})) == ["セラミック", "鋼"]
+
+
+def test_answers_echo_the_resolved_context(demo_os):
+    ans = answer_ja_question(demo_os, "包丁の用途は？", {"region": "JP", "year": 2000})
+    assert ans["context"] == {"domain": "cooking", "region": "JP", "year_range": [2000, 2000]}
+    assert "context" not in answer_ja_question(demo_os, "包丁の用途は？")
+
+
+def test_query_functions_take_context(demo_os):
+    assert [r["value"] for r in demo_os.purpose_of("包丁")] == ["切る"]
+    assert demo_os.purpose_of("包丁", context={"region": "UK"}) == []
+    steel = demo_os.materials_of("包丁", context={"era": "Showa"})
+    assert [r["core_id"] for r in steel] == ["core:steel-001"]
+    triples = demo_os.find_triples(src="core:knife.kitchen-001", context={"era": "Reiwa"})
+    assert {t.triple_id for t in triples} >= {"t0003"}
+    assert "t0002" not in {t.triple_id for t in triples}
@@ -0,0 +1,25 @@
+from conftest import without_stats
+from mini_os_demo import MiniMeaningOS, answer_batch, answer_ja_question
+
+
+def test_answers_keep_full_evidence_by_default(demo_os):
+    for ans in (answer_ja_question(demo_os, "包丁の素材は？"), answer_ja_question(demo_os, "包丁の素材は？", {})):
+        row = next(r for r in ans["results"] if r["triple_id"] == "t0002")
+        assert [e["evidence_id"] for e in row["evidence"]] == ["ev0001"]
+        assert row["evidence"] == demo_os.get_evidence_for_triple(row["triple_id"])
+        assert row["evidence_summary"] == demo_os.evidence_summary_for(row["triple_id"])
+
+
+def test_include_evidence_false_drops_the_list(demo_os):
+    row = answer_ja_question(demo_os, "包丁の用途は？", {"include_evidence": False})["results"][0]
+    assert "evidence" not in row
+    assert "evidence_summary" in row
+
+
+def test_batch_follows_the_same_rule(data_copy):
+    os = MiniMeaningOS(data_dir=data_copy)
+    qs = ["包丁の用途は？", "包丁の素材は？"]
+    for context in (None, {"include_evidence": False}, {"include_evidence": True}):
+        batch = [without_stats(a) for a in answer_batch(os, qs, "ja", context)]
+        single = [without_stats(answer_ja_question(os, q, context)) for q in qs]
+        assert batch == single
@@ -0,0 +1,48 @@
+import random
+
+from mini_os_demo import DeletionIndex, normalize_expr
+
+
+def osa_distance(a, b):
+    """隣接文字の入れ替えも 1 とする編集距離（全表を作る素朴な実装、比較用）。"""
+    d = [[max(i, j) if i == 0 or j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def test_normalize_expr():
+    assert normalize_expr("Kitchen-Knife") == "kitchenknife"
+    assert normalize_expr("ｋｉｔｃｈｅｎ knife") == "kitchenknife"
+    assert normalize_expr("ナイフ") == normalize_expr("ないふ")
+
+
+def test_find_cores_by_expr_variants(demo_os):
+    knife = demo_os.find_cores_by_expr("kitchen knife", lang="en")
+    assert knife
+    for variant in ("Kitchen Knife", "kitchen-knife", "ＫＩＴＣＨＥＮ　ＫＮＩＦＥ", "kitchen knive"):
+        assert demo_os.find_cores_by_expr(variant, lang="en") == knife
+    assert demo_os.find_cores_by_expr("ないふ", lang="ja") == demo_os.find_cores_by_expr("ナイフ", lang="ja")
+    assert demo_os.find_cores_by_expr("zzzzzzzz") == []
+
+
+def test_suggest_exprs(demo_os):
+    suggestions = demo_os.suggest_exprs("kitchen knif")
+    assert suggestions[0] == {"expr_label": "kitchen knife", "distance": 1}
+    assert [s["distance"] for s in suggestions] == sorted(s["distance"] for s in suggestions)
+
+
+def test_deletion_index_matches_brute_force():
+    rng = random.Random(1)
+    words = {"".join(rng.choice("abcde") for _ in range(rng.randint(3, 7))) for _ in range(300)}
+    index = DeletionIndex(max_distance=2)
+    for w in words:
+        index.add(w)
+    for query in ["abcd", "eeee", "abcab", "dcbae", "aaaaaaa"]:
+        for k in (0, 1, 2):
+            got = {term: dist for dist, term in index.lookup(query, k)}
+            expected = {w: osa_distance(query, w) for w in words if osa_distance(query, w) <= k}
+            assert got == expected, (query, k)
@@ -0,0 +1,31 @@
+import itertools
+
+from conftest import scan_ids
+
+
+def test_find_triples_matches_full_scan(synthetic_os):
+    os = synthetic_os
+    sample = os.triples[::97]
+    srcs = [None] + [t.src for t in sample[:5]]
+    rels = [None, "core:material-001", "core:category-of-001"]
+    dsts = [None] + [t.dst for t in sample[5:8]]
+    for src, rel, dst in itertools.product(srcs, rels, dsts):
+        if not (src or rel or dst):
+            continue
+        for polarity in ("positive", "negative"):
+            got = [t.triple_id for t in os.find_triples(src=src, rel=rel, dst=dst, polarity=polarity)]
+            assert got == scan_ids(os, src=src, rel=rel, dst=dst, polarity=polarity)
+
+
+def test_find_triples_with_domain(synthetic_os):
+    os = synthetic_os
+    for rel in ("core:use-purpose-001", "core:material-for-001"):
+        for domain in ("cooking", "medicine", "law"):
+            got = [t.triple_id for t in os.find_triples(rel=rel, domain=domain)]
+            assert got == scan_ids(os, rel=rel, domain=domain)
+
+
+def test_find_triples_on_bundled_data(demo_os):
+    found = demo_os.find_triples(src="core:knife.kitchen-001", rel="core:material-001")
+    assert {t.dst for t in found} == {"core:steel-001", "core:ceramic-001"}
+    assert demo_os.find_triples(src="core:no-such-core") == []
@@ -0,0 +1,41 @@
+import mini_os_demo
+
+
+def sorted_labels(os, core_id, lang):
+    """ranked table を使わずに freq 降順のラベル列を作る（比較用）。"""
+    scored = [
+        (float(e.conditions.get("freq", 1.0)), e.expr_label)
+        for e in os.exprs
+        if e.core_id == core_id and (lang is None or e.conditions.get("lang") == lang)
+    ]
+    return [label for _, label in sorted(scored, reverse=True)]
+
+
+def test_labels_for_core_ranked(synthetic_os):
+    os = synthetic_os
+    for core_id in list(os.labels_by_core)[:50]:
+        for lang in (None, "ja", "en"):
+            expected = sorted_labels(os, core_id, lang)
+            assert os.labels_for_core(core_id, lang=lang, top_k=10) == expected[:10]
+            assert os.labels_for_core(core_id, lang=lang, top_k=1) == expected[:1]
+
+
+def test_labels_for_unknown_core(demo_os):
+    assert demo_os.labels_for_core("core:no-such-core", lang="ja") == []
+
+
+def test_add_expr_links_updates_ranking(data_copy):
+    os = mini_os_demo.MiniMeaningOS(data_dir=data_copy)
+    core_id = "core:knife.kitchen-001"
+    before = os.labels_for_core(core_id, lang="ja")
+    os.add_expr_links([
+        mini_os_demo.ExprLink(
+            expr_id="e-test", expr_label="菜切り", core_id=core_id,
+            conditions={"lang": "ja", "freq": 99.0}, source_kind="test", source_detail="",
+            status="active", created_at="", updated_at="", note="",
+        )
+    ])
+    after = os.labels_for_core(core_id, lang="ja")
+    assert after[0] == "菜切り"
+    assert after[1:] == before[: len(after) - 1]
+    assert os.find_cores_by_expr("菜切り", lang="ja") == [core_id]
@@ -0,0 +1,62 @@
+import pytest
+
+from mini_os_demo import (
+    INTENT_CUES,
+    SubjectMatcher,
+    on_token_boundary,
+    parse_en_question,
+    parse_ja_question,
+)
+
+
+@pytest.fixture(scope="module")
+def matcher(demo_os):
+    return demo_os.subject_matcher
+
+
+@pytest.mark.parametrize("text, pattern_id, subject", [
+    ("What is a kitchen knife made of?", "MAT_EN_1", "kitchen knife"),
+    ("What is a knife used for?", "USE_EN_1", "knife"),
+    ("Tell me about kitchen knife.", "PROFILE_EN_1", "kitchen knife"),
+    # 語の途中にかかるラベル / 手がかり語は使わない（regex パーサに任せる）
+    ("What is a cutting board made of?", "MAT_EN_1", "cutting board"),
+    ("Tell me about cutlery", "PROFILE_EN_1", "cutlery"),
+    ("Tell me about a knife museum.", "PROFILE_EN_1", "knife"),
+])
+def test_parse_en(matcher, text, pattern_id, subject):
+    q = parse_en_question(text, matcher)
+    assert (q["pattern_id"], q["subject"]) == (pattern_id, subject)
+
+
+@pytest.mark.parametrize("text, pattern_id, subject", [
+    ("包丁の用途は？", "USE_1", "包丁"),
+    ("この包丁の用途は？", "USE_1", "包丁"),
+    ("ナイフの素材は？", "MAT_1", "ナイフ"),
+    ("ペティナイフの用途は？", "USE_1", "ペティナイフ"),
+])
+def test_parse_ja(matcher, text, pattern_id, subject):
+    q = parse_ja_question(text, matcher)
+    assert (q["pattern_id"], q["subject"]) == (pattern_id, subject)
+
+
+def test_matcher_agrees_with_regex_parser(matcher):
+    for text in ("包丁の用途は？", "包丁の素材は？", "包丁の分類は？", "包丁の英語は？"):
+        assert parse_ja_question(text, matcher) == parse_ja_question(text)
+
+
+def test_token_boundaries():
+    assert on_token_boundary("a cut here", 2, 5)
+    assert not on_token_boundary("cutting", 0, 3)
+    assert not on_token_boundary("museum", 2, 5)
+    assert not on_token_boundary("ペティナイフ", 3, 6)
+    assert not on_token_boundary("出刃包丁", 2, 4)
+    assert on_token_boundary("この包丁の", 2, 4)
+    assert on_token_boundary("ペティ・ナイフ", 4, 7)
+
+
+def test_scan_prefers_longest_and_marks_partial_labels():
+    m = SubjectMatcher(["knife", "kitchen knife", "cut"], INTENT_CUES)
+    kinds = [(p[0], p[1]) for _, _, p in m.scan("Is a kitchen knife for cutting?")]
+    assert kinds == [("label", "kitchen knife"), ("partial", "cut")]
+    m.add_labels(["cutting board"])
+    assert [p[1] for _, _, p in m.scan("a cutting board")] == ["cutting board"]
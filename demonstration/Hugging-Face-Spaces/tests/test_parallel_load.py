@@ -0,0 +1,55 @@
+import csv
+
+import pytest
+
+from mini_os_demo import MiniMeaningOS, find_table_files
+
+
+def split_csv(path, n_parts):
+    """CSV を n_parts 個のシャード（path.stem.part-0001.csv …）に分けて元ファイルを消す。"""
+    with path.open(encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    header, body = rows[0], rows[1:]
+    size = -(-len(body) // n_parts)
+    for i in range(n_parts):
+        part = path.with_name(f"{path.stem}.part-{i + 1:04d}{path.suffix}")
+        with part.open("w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            w.writerows(body[i * size:(i + 1) * size])
+    path.unlink()
+
+
+@pytest.fixture(scope="module")
+def sharded_dir(tmp_path_factory, synthetic_dir):
+    d = tmp_path_factory.mktemp("sharded")
+    for p in synthetic_dir.iterdir():
+        (d / p.name).write_bytes(p.read_bytes())
+    split_csv(d / "meaning_triples_with_reverse.csv", 3)
+    split_csv(d / "expr_links.csv", 2)
+    return d
+
+
+def loaded_ids(os):
+    return [t.triple_id for t in os.triples], [e.expr_id for e in os.exprs]
+
+
+def test_shards_are_found_in_order(sharded_dir):
+    files = find_table_files(sharded_dir)
+    assert [p.name for p in files["triples"]] == [
+        f"meaning_triples_with_reverse.part-000{i}.csv" for i in (1, 2, 3)
+    ]
+    assert len(files["exprs"]) == 2
+
+
+def test_parallel_load_matches_sequential(synthetic_os, sharded_dir):
+    sequential = MiniMeaningOS(data_dir=sharded_dir)
+    parallel = MiniMeaningOS(data_dir=sharded_dir, workers=2)
+    assert [t.triple_id for t in sequential.triples] == [t.triple_id for t in synthetic_os.triples]
+    assert loaded_ids(parallel) == loaded_ids(sequential)
+    for label in ("合成2", "合成99"):
+        assert parallel.render_profile(label) == sequential.render_profile(label)
+    t = sequential.triples[1234]
+    assert [x.triple_id for x in parallel.find_triples(src=t.src)] == [
+        x.triple_id for x in sequential.find_triples(src=t.src)
+    ]
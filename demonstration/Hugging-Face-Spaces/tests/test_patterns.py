@@ -0,0 +1,53 @@
+import mini_os_demo
+from mini_os_demo import (
+    MATCHED_QUERY_FIELDS,
+    PATTERN_REGISTRY,
+    QueryPattern,
+    answer_en_question,
+    answer_ja_question,
+    answer_parsed,
+    lookup_pattern,
+    pattern_latency_stats,
+)
+
+
+def test_every_parsed_pattern_is_registered():
+    for pattern_id, fields in MATCHED_QUERY_FIELDS.items():
+        pattern = PATTERN_REGISTRY[pattern_id]
+        assert pattern.qtype == fields["type"]
+    for pattern_id in ("DIFF_1", "ISA_1"):
+        assert pattern_id in PATTERN_REGISTRY
+
+
+def test_lookup_checks_type_and_lang():
+    q = {"pattern_id": "USE_1", "type": "slot_query"}
+    assert lookup_pattern(q, "ja").pattern_id == "USE_1"
+    assert lookup_pattern(q, "en") is None
+    assert lookup_pattern({**q, "type": "profile_query"}, "ja") is None
+    assert lookup_pattern({"pattern_id": "NOPE_1", "type": "slot_query"}, "ja") is None
+
+
+def test_registered_pattern_is_dispatched(demo_os, monkeypatch):
+    def handler(os, q, pattern, context):
+        return [{"value": q["subject"].upper(), "slot": pattern.slot}]
+
+    pattern = QueryPattern("ECHO_1", "echo_query", "en", handler, slot="WHAT")
+    monkeypatch.setitem(PATTERN_REGISTRY, "ECHO_1", pattern)
+    monkeypatch.setattr(mini_os_demo, "PATTERN_LATENCY", mini_os_demo.defaultdict(lambda: [0, 0.0, 0.0]))
+
+    q = {"query": "echo knife", "type": "echo_query", "pattern_id": "ECHO_1", "subject": "knife"}
+    ans = answer_parsed(demo_os, q, "en")
+    assert ans["results"] == [{"value": "KNIFE", "slot": "WHAT"}]
+    assert pattern_latency_stats()["ECHO_1"]["count"] == 1
+
+
+def test_unsupported_questions_get_a_note(demo_os):
+    ans = answer_ja_question(demo_os, "これは質問ではありません")
+    assert ans["results"] == [] and ans["note"] == mini_os_demo.UNSUPPORTED_NOTES["ja"]
+
+
+def test_shared_result_schema(demo_os):
+    ja = answer_ja_question(demo_os, "包丁の用途は？")["results"]
+    en = answer_en_question(demo_os, "What is a kitchen knife used for?")["results"]
+    assert {tuple(sorted(r)) for r in ja} == {tuple(sorted(r)) for r in en}
+    assert ja[0]["from_relation"] == en[0]["from_relation"] == "core:use-purpose-001"
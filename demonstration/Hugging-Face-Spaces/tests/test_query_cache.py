@@ -0,0 +1,66 @@
+import mini_os_demo
+from conftest import without_stats
+from mini_os_demo import MiniMeaningOS, QueryCache, TripleEvidence, answer_ja_question
+
+
+def test_query_cache_lru_and_generation():
+    cache = QueryCache(maxsize=2)
+    calls = []
+
+    def compute(v):
+        return lambda: calls.append(v) or v
+
+    assert cache.get_or_compute("a", 0, compute(1)) == 1
+    assert cache.get_or_compute("a", 0, compute(2)) == 1
+    cache.get_or_compute("b", 0, compute(3))
+    cache.get_or_compute("c", 0, compute(4))  # "a" が追い出される
+    assert cache.get_or_compute("a", 0, compute(5)) == 5
+    assert cache.get_or_compute("a", 1, compute(6)) == 6  # 世代が変われば全破棄
+    stats = cache.stats()
+    assert calls == [1, 3, 4, 5, 6]
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 5, 2)
+    assert stats["invalidations"] == 1 and stats["generation"] == 1
+
+
+def test_query_cache_ttl():
+    cache = QueryCache(maxsize=8, ttl=0.0)
+    cache.get_or_compute("a", 0, lambda: 1)
+    assert cache.get_or_compute("a", 0, lambda: 2) == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_paraphrases_share_one_entry(data_copy):
+    os = MiniMeaningOS(data_dir=data_copy)
+    first = answer_ja_question(os, "包丁の用途は？")
+    second = answer_ja_question(os, "包丁の用途は何？")
+    stats = os.query_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert without_stats(first)["results"] == without_stats(second)["results"]
+
+
+def test_new_evidence_invalidates_answers(data_copy):
+    os = MiniMeaningOS(data_dir=data_copy)
+    before = answer_ja_question(os, "包丁の用途は？")
+    triple_id = before["results"][0]["triple_id"]
+    os.add_evidence([
+        TripleEvidence(
+            evidence_id="ev-test", triple_id=triple_id, evidence_type="test", source_kind="test",
+            stance="negative", weight=100.0, source_detail="", note="", created_at="",
+        )
+    ])
+    after = answer_ja_question(os, "包丁の用途は？")
+    assert os.query_cache_stats()["misses"] == 2
+    assert after["results"] != before["results"]
+
+
+def test_new_labels_invalidate_answers(data_copy):
+    os = MiniMeaningOS(data_dir=data_copy)
+    assert answer_ja_question(os, "菜切りの用途は？")["results"] == []
+    os.add_expr_links([
+        mini_os_demo.ExprLink(
+            expr_id="e-test", expr_label="菜切り", core_id="core:knife.kitchen-001",
+            conditions={"lang": "ja"}, source_kind="test", source_detail="",
+            status="active", created_at="", updated_at="", note="",
+        )
+    ])
+    assert answer_ja_question(os, "菜切りの用途は？")["results"]
@@ -0,0 +1,76 @@
+import itertools
+
+import pytest
+
+from conftest import scan_ids
+from mini_os_demo import (
+    MiniMeaningOS,
+    compile_conditions,
+    compile_wanted,
+    cond_match,
+    era_year_range,
+    eras_overlapping,
+    region_ancestors,
+)
+
+TRIPLE_CONDITIONS = [
+    {},
+    {"region": ["JP"]},
+    {"region": ["JP-Kyoto"], "era": ["Edo"]},
+    {"region": ["JP-Tokyo", "US"]},
+    {"era": ["Showa", "Heisei"]},
+    {"year_range": [1950, 1960]},
+    {"year_range": [1600, 1700], "region": "UK"},
+]
+
+WANTED = [
+    {"region": "JP"},
+    {"region": ["JP-Kansai"]},
+    {"region": "JP-Kyoto"},
+    {"region": ["US", "UK"]},
+    {"era": "Edo"},
+    {"era": ["Meiji", "Showa"]},
+    {"year_range": [1955, 1955]},
+    {"year_range": [1700, 1900]},
+    {"region": "JP", "era": "Edo"},
+]
+
+
+def test_region_ancestors():
+    assert region_ancestors("JP-Kyoto") == {"JP-Kyoto", "JP-Kansai", "JP"}
+    assert region_ancestors("JP-Foo-Bar") == {"JP-Foo-Bar", "JP-Foo", "JP"}
+    assert region_ancestors("US") == {"US"}
+
+
+def test_era_year_ranges():
+    assert era_year_range("Edo") == (1603.0, 1868.0)
+    assert era_year_range(["Meiji", "Taisho"]) == (1868.0, 1926.0)
+    assert era_year_range("Unknown") is None
+    assert eras_overlapping(1900, 1930) == ("Meiji", "Taisho", "Showa")
+
+
+def test_hierarchy_semantics():
+    kyoto = {"region": ["JP-Kyoto"]}
+    assert cond_match(kyoto, {"region": "JP"})
+    assert cond_match(kyoto, {"region": "JP-Kansai"})
+    assert not cond_match({"region": ["JP"]}, {"region": "JP-Kyoto"})
+    assert cond_match({"era": ["Showa"]}, {"year_range": [1970, 1970]})
+    assert cond_match({"year_range": [1700, 1710]}, {"era": "Edo"})
+    assert not cond_match({"year_range": [1700, 1710]}, {"era": "Meiji"})
+
+
+def test_compiled_matches_cond_match():
+    for cond, wanted in itertools.product(TRIPLE_CONDITIONS, WANTED):
+        assert compile_wanted(wanted)(compile_conditions(cond)) == cond_match(cond, wanted), (cond, wanted)
+
+
+@pytest.mark.parametrize("backend", ["python", "columnar"])
+def test_find_triples_with_hierarchy(synthetic_dir, backend):
+    if backend == "columnar":
+        pytest.importorskip("numpy")
+    os = MiniMeaningOS(data_dir=synthetic_dir, backend=backend)
+    for wanted in WANTED:
+        got = [t.triple_id for t in os.find_triples(rel="core:material-001", conditions=wanted)]
+        assert got == scan_ids(os, rel="core:material-001", conditions=wanted)
+    kyoto = os.find_triples(rel="core:material-001", conditions={"region": "JP-Kansai"})
+    assert kyoto and all("JP-Kyoto" in t.conditions["region"] for t in kyoto)
@@ -0,0 +1,41 @@
+from collections import defaultdict
+
+
+def scan_profile(os, focus, lang):
+    """全 triple を走査して 9スロットビューのスロット → ラベル集合を作る（比較用）。"""
+    slots = defaultdict(set)
+    for t in os.triples:
+        if t.polarity != "positive" or t.rel not in os.REL_TO_SLOT:
+            continue
+        out_slot, in_slot = os.REL_TO_SLOT[t.rel]
+        if out_slot and t.src == focus:
+            slots[out_slot].update(os._display_labels(t.dst, lang))
+        if in_slot and t.dst == focus and t.src != focus:
+            slots[in_slot].update(os._display_labels(t.src, lang))
+    return dict(slots)
+
+
+def test_render_profile_bundled(demo_os):
+    view = demo_os.render_profile("包丁")
+    assert view["WHAT"] == ["刃物", "ナイフ"]
+    assert view["HOW"] == ["鋼", "セラミック"]
+    assert view["OUTCOME"] == ["切る"]
+    assert view["labels"]["ja"] == ["包丁"]
+    assert demo_os.render_profile("存在しない語") == {}
+
+
+def test_render_profile_matches_scan(synthetic_os):
+    os = synthetic_os
+    for label in ("合成1", "合成17", "合成150"):
+        focus = os.find_cores_by_expr(label, lang="ja")[0]
+        view = os.render_profile(label)
+        slots = {k: set(v) for k, v in view.items() if k != "labels" and v}
+        assert slots == scan_profile(os, focus, "ja")
+
+
+def test_render_profiles_matches_single(synthetic_os):
+    labels = ["合成3", "合成4", "合成3", "存在しない語"]
+    profiles = synthetic_os.render_profiles(labels)
+    assert set(profiles) == set(labels)
+    for label in labels:
+        assert profiles[label] == synthetic_os.render_profile(label)
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+import mini_os_service
+from mini_os_demo import MiniMeaningOS
+from mini_os_service import MiniOSService, ServiceError, create_app
+
+
+async def call(app, method, path, query="", body=None):
+    """ASGI アプリを 1 リクエスト分だけ直接呼び、(status, JSON) を返す。"""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "root_path": "",
+        "query_string": query.encode("utf-8"),
+        "headers": [],
+    }
+    payload = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else b""
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], json.loads(sent[1]["body"].decode("utf-8"))
+
+
+@pytest.fixture
+def service(data_copy):
+    return MiniOSService(MiniMeaningOS(data_dir=data_copy))
+
+
+def test_endpoints(service):
+    app = create_app(service)
+
+    async def scenario():
+        status, ans = await call(app, "POST", "/ask", body={"question": "包丁の用途は？"})
+        assert status == 200 and ans["results"][0]["value"] == "切る"
+        status, ans = await call(app, "GET", "/ask", "q=What+is+a+knife+made+of%3F&lang=en")
+        assert status == 200 and ans["pattern_id"] == "MAT_EN_1"
+
+        status, out = await call(app, "POST", "/ask/batch", body={"questions": ["包丁の用途は？", "包丁の素材は？"]})
+        assert status == 200 and len(out["answers"]) == 2
+
+        status, out = await call(app, "GET", "/triples", "src=core:knife.kitchen-001&rel=core:material-001")
+        assert status == 200
+        assert {t["dst"] for t in out["triples"]} == {"core:steel-001", "core:ceramic-001"}
+        assert all("stats" in t for t in out["triples"])
+        triple_id = out["triples"][0]["triple_id"]
+
+        status, out = await call(app, "GET", "/profile", "label=包丁")
+        assert status == 200 and out["profile"]["OUTCOME"] == ["切る"]
+
+        status, out = await call(app, "GET", "/evidence", f"triple_id={triple_id}")
+        assert status == 200 and set(out) >= {"summary", "stats", "evidence"}
+
+        status, out = await call(app, "GET", "/stats")
+        assert status == 200 and out["requests"] == 6
+
+    asyncio.run(scenario())
+
+
+def test_errors(service):
+    app = create_app(service)
+
+    async def scenario():
+        assert (await call(app, "GET", "/nowhere"))[0] == 404
+        assert (await call(app, "DELETE", "/ask"))[0] == 405
+        assert (await call(app, "POST", "/ask", body={"question": " "}))[0] == 400
+        assert (await call(app, "GET", "/ask", "q=x&lang=fr"))[0] == 400
+        assert (await call(app, "GET", "/triples"))[0] == 400
+        assert (await call(app, "GET", "/triples", "src=x&limit=many"))[0] == 400
+        status, out = await call(app, "POST", "/ask/batch", body={"questions": "not a list"})
+        assert status == 400 and "error" in out
+
+    asyncio.run(scenario())
+
+
+def test_coalesced_request_survives_cancelled_originator(service, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow_answer(os, question, context=None):
+        calls.append(question)
+        release.wait(5)
+        return {"query": question, "results": []}
+
+    monkeypatch.setattr(mini_os_service, "answer_ja_question", slow_answer)
+
+    async def scenario():
+        first = asyncio.ensure_future(service.ask("包丁の用途は？"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(service.ask("包丁の用途は？"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        assert (await second)["query"] == "包丁の用途は？"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert calls == ["包丁の用途は？"]
+        assert service.coalesced == 1
+        assert service.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_coalesced_errors_reach_every_waiter(service, monkeypatch):
+    def failing_answer(os, question, context=None):
+        raise ServiceError(500, "boom")
+
+    monkeypatch.setattr(mini_os_service, "answer_ja_question", failing_answer)
+
+    async def scenario():
+        results = await asyncio.gather(
+            service.ask("包丁の用途は？"), service.ask("包丁の用途は？"), return_exceptions=True
+        )
+        assert all(isinstance(r, ServiceError) for r in results)
+        assert service.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_lifespan_flushes_and_saves_stats(service, data_copy):
+    async def scenario():
+        async with service.lifespan():
+            assert service._flusher is not None
+            await service.ask("包丁の用途は？")
+            await service.ask("包丁の用途は？")
+        assert service._flusher is None
+        assert service.os.triple_stats.summary()["pending"] == 0
+        assert service.os.stats_for("t0001")["usage_total"] == 2
+
+    asyncio.run(scenario())
+    # 終了時に保存した集計は次の起動で読み戻される
+    reloaded = MiniMeaningOS(data_dir=data_copy)
+    assert reloaded.stats_for("t0001")["usage_total"] == 2
+
+
+def test_asgi_lifespan_protocol(service):
+    app = create_app(service)
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(app({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert service._flusher is None
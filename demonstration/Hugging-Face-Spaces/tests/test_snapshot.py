@@ -0,0 +1,128 @@
+import pytest
+
+import mini_os_demo
+from conftest import without_stats
+from mini_os_demo import (
+    MiniMeaningOS,
+    SnapshotError,
+    answer_en_question,
+    answer_ja_question,
+    load_snapshot,
+    snapshot_is_fresh,
+)
+
+
+def triple_ids(os):
+    return [t.triple_id for t in os.triples]
+
+
+def test_snapshot_round_trip(synthetic_os, synthetic_dir, tmp_path):
+    path = tmp_path / "mini_os.snapshot"
+    synthetic_os.save_snapshot(path)
+    assert snapshot_is_fresh(path, synthetic_dir)
+
+    loaded = MiniMeaningOS.from_snapshot(path)
+    assert triple_ids(loaded) == triple_ids(synthetic_os)
+    assert loaded.source_hash == synthetic_os.source_hash
+    for label in ("合成1", "合成42"):
+        assert loaded.render_profile(label) == synthetic_os.render_profile(label)
+    t = synthetic_os.triples[5]
+    assert [x.triple_id for x in loaded.find_triples(src=t.src, rel=t.rel)] == [
+        x.triple_id for x in synthetic_os.find_triples(src=t.src, rel=t.rel)
+    ]
+    # 実行時の状態はスナップショットに含めず、ロード後に空で作り直す
+    assert loaded.query_cache_stats()["size"] == 0
+
+
+def test_snapshot_answers_match(demo_os, tmp_path):
+    path = tmp_path / "demo.snapshot"
+    demo_os.save_snapshot(path)
+    loaded = MiniMeaningOS.from_snapshot(path)
+    for q in ("包丁の素材は？", "包丁の用途は？"):
+        assert without_stats(answer_ja_question(loaded, q)) == without_stats(answer_ja_question(demo_os, q))
+    q = "What is a knife made of?"
+    assert without_stats(answer_en_question(loaded, q)) == without_stats(answer_en_question(demo_os, q))
+
+
+def test_snapshot_goes_stale_when_csv_changes(data_copy, tmp_path):
+    path = tmp_path / "copy.snapshot"
+    mini_os_demo.compile_snapshot(data_copy, path)
+    assert snapshot_is_fresh(path, data_copy)
+    csv_path = data_copy / "meaning_triples_with_reverse.csv"
+    csv_path.write_text(csv_path.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+    assert not snapshot_is_fresh(path, data_copy)
+
+
+def test_bad_snapshot_files(demo_os, tmp_path):
+    bogus = tmp_path / "bogus.snapshot"
+    bogus.write_bytes(b"not a snapshot at all, just some bytes" * 4)
+    with pytest.raises(SnapshotError):
+        load_snapshot(bogus)
+    assert not snapshot_is_fresh(bogus)
+
+    path = tmp_path / "demo.snapshot"
+    demo_os.save_snapshot(path)
+    data = path.read_bytes()
+    truncated = tmp_path / "truncated.snapshot"
+    truncated.write_bytes(data[: len(data) // 2])
+    with pytest.raises(SnapshotError):
+        load_snapshot(truncated)
+
+    corrupted = tmp_path / "corrupted.snapshot"
+    corrupted.write_bytes(data[:-1] + bytes([data[-1] ^ 0xFF]))
+    with pytest.raises(SnapshotError):
+        load_snapshot(corrupted, verify_payload=True)
+
+
+@pytest.mark.parametrize("kw", [dict(compact=True), dict(backend="columnar"), dict(compact=True, backend="columnar")])
+def test_snapshot_round_trip_other_layouts(synthetic_dir, tmp_path, kw):
+    pytest.importorskip("numpy")
+    os = MiniMeaningOS(data_dir=synthetic_dir, **kw)
+    path = tmp_path / "layout.snapshot"
+    os.save_snapshot(path)
+    loaded = MiniMeaningOS.from_snapshot(path)
+    t = os.triples[7]
+    for query in (dict(src=t.src), dict(rel=t.rel, conditions={"domain": "cooking"})):
+        assert [x.triple_id for x in loaded.find_triples(**query)] == [x.triple_id for x in os.find_triples(**query)]
+
+
+class _Reduce:
+    """unpickle 時に func(*args) を呼ばせる細工用のオブジェクト。"""
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __reduce__(self):
+        return self.func, self.args
+
+
+def test_snapshot_rejects_functions(tmp_path):
+    victim = tmp_path / "victim.log.jsonl"
+    victim.write_text("keep me\n", encoding="utf-8")
+    payloads = [
+        _Reduce(mini_os_demo.truncate_triple_log, victim, 0),
+        _Reduce(mini_os_demo.write_snapshot, {}, b"\0" * 32, victim),
+        _Reduce(print, "hello"),
+    ]
+    np = pytest.importorskip("numpy")
+    payloads.append(_Reduce(np.load, str(victim)))
+    for i, payload in enumerate(payloads):
+        path = tmp_path / f"evil{i}.snapshot"
+        mini_os_demo.write_snapshot({"x": payload}, b"\0" * 32, path)
+        with pytest.raises(SnapshotError, match="unexpected class"):
+            load_snapshot(path)
+    assert victim.read_text(encoding="utf-8") == "keep me\n"
+
+
+def test_older_snapshot_version_is_rejected(demo_os, tmp_path):
+    path = tmp_path / "demo.snapshot"
+    demo_os.save_snapshot(path)
+    data = bytearray(path.read_bytes())
+    # ヘッダの version（magic 8B の直後の uint32）を 1 つ前の版にする
+    data[8:12] = (mini_os_demo.SNAPSHOT_VERSION - 1).to_bytes(4, "little")
+    old = tmp_path / "old.snapshot"
+    old.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError, match="version"):
+        MiniMeaningOS.from_snapshot(old)
+    assert not snapshot_is_fresh(old)
@@ -0,0 +1,23 @@
+from mini_os_demo import MiniMeaningOS, iter_triples, load_triples
+
+
+def test_iter_triples_chunks(synthetic_dir):
+    path = synthetic_dir / "meaning_triples_with_reverse.csv"
+    chunks = list(iter_triples(path, chunk_size=333))
+    assert all(len(c) == 333 for c in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= 333
+    assert [t.triple_id for c in chunks for t in c] == [t.triple_id for t in load_triples(path)]
+
+
+def test_small_chunks_load_the_same_graph(synthetic_os, synthetic_dir):
+    calls = []
+    os = MiniMeaningOS(data_dir=synthetic_dir, chunk_size=500, progress=lambda name, n: calls.append((name, n)))
+    assert [t.triple_id for t in os.triples] == [t.triple_id for t in synthetic_os.triples]
+    assert [e.expr_id for e in os.exprs] == [e.expr_id for e in synthetic_os.exprs]
+    assert os.render_profile("合成7") == synthetic_os.render_profile("合成7")
+
+    triple_counts = [n for name, n in calls if name == "triples"]
+    assert triple_counts == sorted(triple_counts)
+    assert triple_counts[0] == 500
+    assert triple_counts[-1] == len(os.triples)
+    assert {name for name, _ in calls} >= {"triples", "expr_links"}
@@ -0,0 +1,99 @@
+from collections import defaultdict
+
+import pytest
+
+from mini_os_demo import cond_match
+
+CATEGORY = "core:category-001"
+
+
+def adjacency(os, rels=None, wanted=None):
+    """全 triple を走査して作った src → {dst}（比較用）。"""
+    adj = defaultdict(set)
+    for t in os.triples:
+        if t.polarity != "positive" or (rels and t.rel not in rels):
+            continue
+        if wanted and not cond_match(t.conditions, wanted):
+            continue
+        adj[t.src].add(t.dst)
+    return adj
+
+
+def bfs(adj, start, k=None):
+    dist = {start: 0}
+    frontier = [start]
+    depth = 0
+    while frontier and (k is None or depth < k):
+        depth += 1
+        nxt = []
+        for core in frontier:
+            for other in adj.get(core, ()):
+                if other not in dist:
+                    dist[other] = depth
+                    nxt.append(other)
+        frontier = nxt
+    return dist
+
+
+@pytest.fixture(scope="module")
+def starts(synthetic_os):
+    return [t.src for t in synthetic_os.triples[:4000:400]]
+
+
+def test_k_hop_matches_bfs(synthetic_os, starts):
+    adj = adjacency(synthetic_os, rels={CATEGORY, "core:material-001"})
+    for core in starts:
+        for k in (1, 2, 3):
+            got = synthetic_os.k_hop(core, k=k, rels=[CATEGORY, "core:material-001"])
+            assert got == bfs(adj, core, k)
+
+
+def test_k_hop_with_domain(synthetic_os, starts):
+    adj = adjacency(synthetic_os, rels={CATEGORY}, wanted={"domain": ["medicine"]})
+    for core in starts:
+        assert synthetic_os.k_hop(core, k=3, rels=[CATEGORY], domain="medicine") == bfs(adj, core, 3)
+
+
+def test_shortest_path_is_shortest_and_valid(synthetic_os, starts):
+    adj = adjacency(synthetic_os, rels={CATEGORY})
+    for src in starts:
+        dist = bfs(adj, src, 4)
+        for dst in sorted(dist)[:20]:
+            path = synthetic_os.shortest_path(src, dst, rels=[CATEGORY], max_depth=4)
+            assert path is not None and len(path) == dist[dst]
+            core = src
+            for t in path:
+                assert t.src == core and t.rel == CATEGORY and t.polarity == "positive"
+                core = t.dst
+            assert core == dst
+    assert synthetic_os.shortest_path(starts[0], "core:no-such-core", rels=[CATEGORY]) is None
+
+
+def test_reachable_is_cached(synthetic_os, starts):
+    adj = adjacency(synthetic_os, rels={CATEGORY})
+    core = starts[0]
+    expected = set(bfs(adj, core)) - {core}
+    assert synthetic_os.reachable(core, CATEGORY) == expected
+    before = synthetic_os.reach_cache.stats()["hits"]
+    assert synthetic_os.reachable(core, CATEGORY) == expected
+    assert synthetic_os.reach_cache.stats()["hits"] == before + 1
+
+
+def test_match_path(synthetic_os, starts):
+    core = starts[1]
+    closure = synthetic_os.reachable(core, CATEGORY)
+    assert synthetic_os.match_path(core, "category-001*") == sorted(closure | {core})
+    assert synthetic_os.match_path(core, "category-001+") == sorted(closure)
+    one = {t.dst for t in synthetic_os.find_triples(src=core, rel=CATEGORY)}
+    assert synthetic_os.match_path(core, "category-001?") == sorted(one | {core})
+    users = {t.src for t in synthetic_os.find_triples(dst=core, rel="core:material-001")}
+    assert synthetic_os.match_path(core, "^material-001") == sorted(users)
+    with pytest.raises(ValueError):
+        synthetic_os.match_path(core, "category-001**")
+
+
+def test_bundled_kind_of(demo_os):
+    knife = "core:knife.kitchen-001"
+    assert demo_os.match_path(knife, "category-001+")
+    for ancestor in demo_os.match_path(knife, "category-001+"):
+        assert demo_os.is_reachable(knife, ancestor, CATEGORY)
@@ -0,0 +1,68 @@
+import io
+
+from mini_os_demo import STATS_CORPUS, MiniMeaningOS, TripleStatsStore, run_batch
+
+QUESTIONS = "包丁の用途は？\n包丁の素材は？\n包丁の用途は？\n包丁の分類は？\n" * 3
+
+
+def test_record_only_buffers():
+    store = TripleStatsStore(flush_interval=0.0)
+    for _ in range(5):
+        store.record(["t1", "t2"])
+    store.record(["t1"], STATS_CORPUS, 4)
+    assert store.summary()["pending"] == 6
+    assert store.get("t1") is None
+    assert store.flush() == 6
+    assert store.get("t1")["usage_total"] == 5
+    assert store.get("t1")["corpus_total"] == 4
+    assert store.dirty
+
+
+def test_find_triples_does_not_flush(data_copy):
+    os = MiniMeaningOS(data_dir=data_copy)
+    os.triple_stats.flush_interval = 0.0
+    before = os.triple_stats.summary()["flushes"]
+    for _ in range(3):
+        os.find_triples(src="core:knife.kitchen-001")
+    summary = os.triple_stats.summary()
+    assert summary["flushes"] == before
+    assert summary["pending"] == 3
+
+
+def test_save_and_reload(data_copy):
+    os = MiniMeaningOS(data_dir=data_copy)
+    os.find_triples(src="core:knife.kitchen-001", rel="core:material-001")
+    os.record_corpus_counts({"t0002": 7})
+    assert os.triple_stats.save()
+    assert not os.triple_stats.dirty
+
+    for reloaded in (MiniMeaningOS(data_dir=data_copy), _via_snapshot(os, data_copy)):
+        for triple_id in ("t0002", "t0003"):
+            assert reloaded.stats_for(triple_id) == os.stats_for(triple_id)
+        assert reloaded.stats_for("t0002")["corpus_total"] == 7
+
+
+def _via_snapshot(os, data_dir):
+    path = data_dir / "mini_os.snapshot"
+    os.save_snapshot(path)
+    return MiniMeaningOS.from_snapshot(path)
+
+
+def test_broken_stats_file_is_ignored(data_copy, capsys):
+    (data_copy / "triple_stats.json").write_text("{not json", encoding="utf-8")
+    os = MiniMeaningOS(data_dir=data_copy)
+    assert "[WARN] triple_stats" in capsys.readouterr().out
+    assert os.triple_stats.summary()["triples"] == 0
+
+
+def test_batch_workers_stats_reach_parent(data_copy):
+    serial = MiniMeaningOS(data_dir=data_copy)
+    run_batch(serial, io.StringIO(QUESTIONS), io.StringIO(), workers=0, chunk_size=2)
+    parallel = MiniMeaningOS(data_dir=data_copy)
+    run_batch(parallel, io.StringIO(QUESTIONS), io.StringIO(), workers=2, chunk_size=2)
+
+    assert parallel.triple_stats.summary()["pending"] == 0
+    assert set(parallel.triple_stats.stats) == set(serial.triple_stats.stats)
+    for triple_id in serial.triple_stats.stats:
+        assert parallel.stats_for(triple_id)["usage_total"] == serial.stats_for(triple_id)["usage_total"]
+    assert serial.stats_for("t0001")["usage_total"] == 6
@@ -1,114 +1,167 @@
-# app.py - パブリック UI スペース（プライベート バックエンド スペースを gradio_client で叩く）
+# app.py - Public UI Space（Private Backend Space を gradio_client で叩く）
 
-インポートOS
-JSONをインポート
-gradio をgrとしてインポート
-gradio_clientからクライアントをインポート
+import os
 
-# ==== バックエンドスペースのIDを書く場所 ====
+import gradio as gr
+
+from backend_client import QUERY_API, BackendClient, BackendError
+
+
+# ==== Backend Space の ID を書く場所 ====
 # 例: https://huggingface.co/spaces/akito/mini-os-backend
 # の場合 → "akito/mini-os-backend"
-BACKEND_SPACE_ID = "aki117463/mini-meaning-os"
+# （環境変数 BACKEND_SPACE_ID で上書き可。ローカルのスタブなら http://127.0.0.1:7861 など）
+BACKEND_SPACE_ID = os.environ.get("BACKEND_SPACE_ID", "aki117463/mini-meaning-os")
+
+# Secrets に保存したトークンを読む
+HF_TOKEN = os.environ.get("HF_TOKEN")
+
+# バックエンド呼び出しの設定（秒）
+BACKEND_TIMEOUT = float(os.environ.get("BACKEND_TIMEOUT", "15"))
+BACKEND_POOL_SIZE = int(os.environ.get("BACKEND_POOL_SIZE", "4"))
+
+
+def make_backend_connection():
+    """
+    バックエンドへの接続を 1 つ作る（BackendClient のプールから必要な分だけ呼ばれる）。
+    MINI_OS_BACKEND=stub ならプロセス内のスタブを使う（ローカル確認用）。
+    """
+    if os.environ.get("MINI_OS_BACKEND") == "stub":
+        from stub_backend import stub_from_env
 
-#秘密に保存したついでにを
-HF_TOKEN = os.environ[ "HF_TOKEN" ]
+        return stub_from_env()
 
-#gradio_client でプライベートスペースに接続
-backend_client = クライアント(BACKEND_SPACE_ID、トークン=HF_TOKEN)
+    from gradio_client import Client
+
+    # gradio_client で Private Space に接続
+    return Client(BACKEND_SPACE_ID, hf_token=HF_TOKEN)
+
+
+backend = BackendClient(
+    make_backend_connection,
+    pool_size=BACKEND_POOL_SIZE,
+    timeout=BACKEND_TIMEOUT,
+    # バックエンドの query_fn は api_name="query"（/eras と区別するため名前で呼ぶ）
+    api_name=QUERY_API,
+)
 
 
 # ==========================
-#バックエンド呼び出し関数
+# Backend 呼び出し関数
 # ==========================
-def  call_backend (テキスト: str、 言語: str ):
-    「」
-    パブリックUIから呼ばれる1回分の処理。
-    Private Backend Space に入力を渡し、結果(dict)を受け取ります。
-    「」
-    text = (テキストまたは "" ).strip()
-     テキストでない場合:
-        return  "質問を入力してください。" , "{}"
-
-    試す：
-        # バックエンドのquery_fn(text, lang) に対応
-        # backend側はdictを返す想定：
-        # { "回答テキスト": "...", "生データ": {...} }
-        データ = backend_client.predict(
-            文章、
-            ラン、
-            # api_name="/predict" # 必要なら付けるが、単一エンドポイントなら省略でOKなことが多い
-        ）
-    except Exceptionをeとして:
-        return  f"バックエンドAPIエラー: {e} "、"{}"
-
-    #gradio_client は dict をそのまま返してくれる想定
-     isinstance (data, dict )でない 場合:
-        #もしかしたら違う形だったときの保険
-        試す：
-            データ = json.loads( str (データ))
-        例外を除く:
-            return  f"予期しないバックエンド応答: { type (data)} "、"{}"
-
-    Answer_text = data.get( "answer_text" , "（答えなし）" )
-    raw_json = json.dumps(data.get( "raw" , {}), ensure_ascii= False , indent= 2 )
-
-    answer_text、raw_jsonを返す
+def call_backend(text: str, lang: str, domain: str, region: str, era: str, year, min_trust, include_evidence):
+    """
+    Public UI から呼ばれる 1 回分の処理。
+    Private Backend Space に入力（質問・言語・文脈）を渡し、結果を受け取る。
+    """
+    text = (text or "").strip()
+    if not text:
+        return "質問を入力してください。", "{}"
+
+    try:
+        # backend 側の query_fn(text, lang, domain, region, era, year, min_trust, include_evidence) に対応
+        # 戻り値は (answer_text, pretty_json)
+        context = {
+            "domain": domain,
+            "region": region,
+            "era": era,
+            "year": year,
+            "min_trust": min_trust,
+            "include_evidence": include_evidence,
+        }
+        return backend.ask(text, lang, context)
+    except BackendError as e:
+        return f"バックエンドAPIエラー: {e}", "{}"
+
+
+def load_era_choices():
+    """時代ドロップダウンの選択肢をバックエンドから取る（取れなければ「指定なし」だけ）。"""
+    try:
+        choices = backend.era_choices()
+    except BackendError as e:
+        print(f"[WARN] era choices unavailable: {e}")
+        choices = [""]
+    return gr.update(choices=choices, value="")
 
 
 # ==========================
 # Gradio UI レイアウト
 # ==========================
-gr.Blocks()をデモとして使用します:
-
-    gr.マークダウン(
-        「」
-        # ミニ意味OS（パブリックUI）
-        日本語 / 日本語で質問できます（実際の処理は Private Backend が実行）
-        **日本語の例:**  
-        - 包丁の用途は何ですか？  
-        - 包丁の素材は？  
-        - 包丁の分類は？  
-        - 切るのに使う道具は？  
+with gr.Blocks() as demo:
+
+    gr.Markdown(
+        """
+        # Mini Meaning OS (Public UI)
+        日本語 / English で質問できます（実際の処理は Private Backend が実行）
+
+        **日本語例:**
+        - 包丁の用途は何？
+        - 包丁の素材は？
+        - 包丁の分類は？
+        - 切るのに使う道具は？
         - 包丁の英語は？
-        **英語の例:**  
-        - ナイフは何に使いますか？  
-        - 日本の包丁は何でできていますか？  
-        - ナイフはどのカテゴリーに入りますか?  
-        「」
-    ）
-
-    gr.Row()を使用する場合:
-        inp = gr.テキストボックス(
-            label= "質問 / 質問" ,
-            placeholder= "例: ナイフの用途は何ですか? / ナイフは何に使用されますか?"、
-            行数= 2、
-        ）
-
-    gr.Row()を使用する場合:
-        lang_select = gr.ラジオ(
-            [ "ja" , "en" ],
-            値= "ja"、
-            label= "言語 / 言語" ,
-        ）
-
-    btn = gr.Button( "実行 / Run" )
+
+        **English examples:**
+        - What is a knife used for?
+        - What is a kitchen knife made of?
+        - What category is a knife?
+        """
+    )
+
+    with gr.Row():
+        inp = gr.Textbox(
+            label="質問 / Question",
+            placeholder="例: 包丁の用途は何？ / What is a knife used for?",
+            lines=2,
+        )
+
+    with gr.Row():
+        lang_select = gr.Radio(
+            ["ja", "en"],
+            value="ja",
+            label="Language / 言語",
+        )
+
+    with gr.Accordion("文脈 / Context", open=False):
+        with gr.Row():
+            domain_input = gr.Textbox(label="分野 / Domain（空なら絞らない）", value="cooking")
+            region_input = gr.Textbox(label="地域 / Region", placeholder="例: JP, JP-Kyoto（カンマ区切り）")
+            # 選択肢はバックエンドの時代ラベル（ERA_YEAR_RANGES）をページ表示時に取得する
+            era_input = gr.Dropdown([""], value="", label="時代 / Era")
+            year_input = gr.Number(label="年 / Year", value=None, precision=0)
+        with gr.Row():
+            min_trust_input = gr.Number(label="最低 trust / Min trust（-1〜1、空なら絞らない）", value=None)
+            evidence_input = gr.Checkbox(label="evidence を全件表示 / Show all evidence", value=True)
+
+    btn = gr.Button("実行 / Run")
 
     out_answer = gr.Textbox(
-        label= "答え（簡易） / 短い答え" ,
-        インタラクティブ= False、
-    ）
+        label="答え（簡易） / Answer (short)",
+        interactive=False,
+    )
 
-    out_json = gr.コード(
-        label= "生JSON / 生のJSON" ,
-        言語 = "json"、
-    ）
+    out_json = gr.Code(
+        label="生JSON / Raw JSON",
+        language="json",
+    )
 
     btn.click(
-        fn=コールバックエンド、
-        入力=[inp, lang_select],
-        出力=[out_answer, out_json],
-    ）
-
-
-__name__ == "__main__"の場合:
-    デモ.launch()
+        fn=call_backend,
+        inputs=[
+            inp,
+            lang_select,
+            domain_input,
+            region_input,
+            era_input,
+            year_input,
+            min_trust_input,
+            evidence_input,
+        ],
+        outputs=[out_answer, out_json],
+    )
+
+    demo.load(fn=load_era_choices, outputs=era_input)
+
+
+if __name__ == "__main__":
+    demo.launch()
@@ -0,0 +1,339 @@
+# backend_client.py - Public UI から Private Backend Space を呼ぶクライアント層
+#
+# gradio_client.Client をそのまま 1 つ共有して同期 predict するのではなく、
+#   - 接続（Client）をプールして使い回す（スレッドセーフ、同時呼び出し数の上限つき）
+#   - 1 回の呼び出しごとに締め切り（deadline）を持たせる
+#   - 失敗したらジッター付き指数バックオフで再試行する
+#   - 失敗が続いたらサーキットブレーカーで一定時間バックエンドを呼ばない
+#   - 同じ質問への応答を小さな LRU キャッシュで返す
+# をまとめて行う。
+
+import json
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class BackendError(Exception):
+    """バックエンド呼び出しの失敗（UI にはメッセージだけを出す）。"""
+
+
+class BackendTimeout(BackendError):
+    """締め切りまでに応答が得られなかった。"""
+
+
+class BackendUnavailable(BackendError):
+    """サーキットブレーカーが開いていて呼び出しを見送った。"""
+
+
+class PoolExhausted(BackendTimeout):
+    """接続プールに空きが出なかった（こちら側の混雑で、バックエンドの失敗ではない）。"""
+
+
+# ========== サーキットブレーカー ==========
+
+class CircuitBreaker:
+    """
+    連続 failure_threshold 回失敗したら open にし、reset_timeout 秒は呼び出しを拒否する。
+    その後 half-open で 1 件だけ試し、成功すれば closed に戻る。
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self) -> None:
+        """allow() で通したが、バックエンドを呼ばずに終わった（成否として数えない）。"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._probing = False
+
+
+# ========== 応答キャッシュ ==========
+
+class ResponseCache:
+    """(text, lang) → 応答 のスレッドセーフな LRU + TTL キャッシュ。"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() < entry[0]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+# ========== 接続プール ==========
+
+class ClientPool:
+    """
+    factory() で作った接続を最大 size 個まで使い回す。
+    gradio_client.Client は作成時に Space の設定を取りに行くので、必要になったときだけ作る。
+    空きが無ければ timeout 秒まで待ち、それでも空かなければ PoolExhausted。
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 4):
+        self._factory = factory
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolExhausted("no backend connection available before the deadline")
+        try:
+            try:
+                client = self._idle.get_nowait()
+            except queue.Empty:
+                client = self._factory()
+            ok = False
+            try:
+                yield client
+                ok = True
+            finally:
+                # 失敗した接続は捨てて、次回は作り直す
+                if ok:
+                    self._idle.put(client)
+        finally:
+            self._slots.release()
+
+
+# ========== クライアント本体 ==========
+
+# バックエンドの query_fn(text, lang, domain, region, era, year, min_trust, include_evidence)
+# の文脈入力（順番どおり）と既定値
+CONTEXT_INPUTS = (
+    ("domain", "cooking"),
+    ("region", ""),
+    ("era", ""),
+    ("year", None),
+    ("min_trust", None),
+    ("include_evidence", True),
+)
+
+
+# バックエンドの名前付き API（Hugging-Face-Spaces/app.py）。
+# バックエンドに API が複数あると gradio_client は api_name なしでは呼び先を決められないので、常に指定する
+QUERY_API = "/query"  # query_fn
+ERAS_API = "/eras"    # era_choices（時代ラベル一覧）
+
+
+def context_args(context: Optional[dict]) -> tuple:
+    """context（dict）をバックエンドへ渡す位置引数にする。None なら文脈を渡さない。"""
+    if context is None:
+        return ()
+    return tuple(context.get(name, default) for name, default in CONTEXT_INPUTS)
+
+
+def parse_backend_response(data: Any) -> Tuple[str, str]:
+    """
+    バックエンドの応答を (answer_text, raw_json) にそろえる。
+    - query_fn の出力 2 つ（answer_text, pretty_json）のタプル/リスト
+    - {"answer_text": ..., "raw": {...}} の dict（旧形式）
+    """
+    if isinstance(data, (list, tuple)) and len(data) == 2:
+        answer_text, raw = data
+        if not isinstance(raw, str):
+            raw = json.dumps(raw, ensure_ascii=False, indent=2)
+        return str(answer_text), raw
+
+    if not isinstance(data, dict):
+        # もしかしたら違う形だったときの保険
+        try:
+            data = json.loads(str(data))
+        except ValueError:
+            raise BackendError(f"予期しないバックエンド応答: {type(data)}")
+        if not isinstance(data, dict):
+            raise BackendError(f"予期しないバックエンド応答: {type(data)}")
+
+    answer_text = data.get("answer_text", "（答えなし）")
+    raw_json = json.dumps(data.get("raw", {}), ensure_ascii=False, indent=2)
+    return answer_text, raw_json
+
+
+class BackendClient:
+    """
+    ask(text, lang, context) でバックエンドの query_fn(text, lang, *文脈) を api_name（既定 QUERY_API）で呼ぶ
+    （context を省略すると query_fn(text, lang)）。
+    接続（factory が返すもの）は gradio_client.Client と同じく
+    submit(*args, api_name=...) → result(timeout=...) / cancel() を持つジョブを返すこと。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        pool_size: int = 4,
+        timeout: float = 15.0,
+        attempt_timeout: float = 8.0,
+        max_attempts: int = 3,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        api_name: str = QUERY_API,
+        breaker: Optional[CircuitBreaker] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        """
+        timeout: 1 回の ask 全体（再試行込み）の締め切り秒数
+        attempt_timeout: 1 回の試行の締め切り秒数（残り時間の方が短ければそちら）
+        max_attempts: 最大試行回数
+        backoff_base / backoff_max: 再試行前の待ち時間（フルジッター付き指数バックオフ）
+        """
+        self.pool = ClientPool(factory, size=pool_size)
+        self.timeout = timeout
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.api_name = api_name
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = cache if cache is not None else ResponseCache()
+        self._eras: Optional[List[str]] = None
+
+    def ask(
+        self,
+        text: str,
+        lang: str,
+        context: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[str, str]:
+        args = context_args(context)
+        key = (text, lang, args)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_attempts):
+            # 締め切りを先に確かめる（allow() の後だと half-open の試行枠を持ったまま抜けてしまう）
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.breaker.allow():
+                raise BackendUnavailable("バックエンドが一時的に利用できません（サーキットブレーカー作動中）")
+
+            try:
+                data = self._call_once(text, lang, args, min(remaining, self.attempt_timeout))
+                result = parse_backend_response(data)
+            except PoolExhausted as e:
+                # プールの空き待ちはこちら側の混雑なので、バックエンドの失敗には数えない
+                self.breaker.release()
+                last_error = e
+            except Exception as e:
+                self.breaker.record_failure()
+                last_error = e
+            else:
+                self.breaker.record_success()
+                self.cache.put(key, result)
+                return result
+
+            if attempt + 1 < self.max_attempts:
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                if time.monotonic() + delay >= deadline:
+                    break
+                time.sleep(delay)
+
+        if isinstance(last_error, BackendError):
+            raise last_error
+        if last_error is None or isinstance(last_error, (TimeoutError, FutureTimeout)):
+            raise BackendTimeout("バックエンドの応答が締め切りまでに返りませんでした")
+        raise BackendError(str(last_error)) from last_error
+
+    def era_choices(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        バックエンドの時代ラベル一覧（先頭は「指定なし」の ""）。一度取れたら使い回す。
+        取れなければ BackendError。
+        """
+        if self._eras is None:
+            timeout = timeout if timeout is not None else self.attempt_timeout
+            start = time.monotonic()
+            try:
+                with self.pool.connection(timeout=timeout) as client:
+                    job = client.submit(api_name=ERAS_API)
+                    data = job.result(timeout=max(0.0, timeout - (time.monotonic() - start)))
+            except BackendError:
+                raise
+            except (TimeoutError, FutureTimeout):
+                raise BackendTimeout("時代ラベルの取得が締め切りまでに返りませんでした")
+            except Exception as e:
+                raise BackendError(str(e)) from e
+            if not isinstance(data, (list, tuple)):
+                raise BackendError(f"予期しない時代ラベル応答: {type(data)}")
+            self._eras = [str(e) for e in data]
+        return list(self._eras)
+
+    def _call_once(self, text: str, lang: str, args: tuple, timeout: float):
+        start = time.monotonic()
+        with self.pool.connection(timeout=timeout) as client:
+            job = client.submit(text, lang, *args, api_name=self.api_name)
+            try:
+                return job.result(timeout=max(0.0, timeout - (time.monotonic() - start)))
+            except (TimeoutError, FutureTimeout):
+                job.cancel()
+                raise
@@ -0,0 +1,123 @@
+# stub_backend.py - Private Backend Space の代わりに使うローカルのスタブ
+#
+# 本物と同じ query_fn(text, lang[, domain, region, era, year, min_trust, include_evidence])
+# → (answer_text, pretty_json) の API（/query）と、時代ラベル一覧の API（/eras）を持つ。
+# 遅延と失敗率を指定でき、BackendClient の締め切り・再試行・ブレーカーの確認に使う。
+#
+# 使い方:
+#   1) UI と同じプロセスで使う:  MINI_OS_BACKEND=stub python app.py
+#   2) 別プロセスの Gradio アプリとして立てる:
+#        STUB_LATENCY=0.5 STUB_FAILURE_RATE=0.2 python stub_backend.py --port 7861
+#        BACKEND_SPACE_ID=http://127.0.0.1:7861 python app.py
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend_client import ERAS_API, QUERY_API
+
+
+STUB_ANSWERS = {
+    ("包丁の用途は何？", "ja"): "切る",
+    ("包丁の素材は？", "ja"): "鋼 / セラミック",
+    ("包丁の分類は？", "ja"): "刃物",
+    ("What is the use of a kitchen knife?", "en"): "cut",
+}
+
+
+# 本物の era_choices と同じ形（先頭は「指定なし」）。スタブなので中身は固定
+STUB_ERAS = ["", "Edo", "Meiji", "Showa"]
+
+
+def query_fn(text: str, lang: str, latency: float = 0.0, failure_rate: float = 0.0, context: tuple = ()):
+    """
+    本物の query_fn と同じ形の応答を返す（latency 秒待ち、failure_rate の確率で失敗）。
+    context は文脈入力（backend_client.CONTEXT_INPUTS の順）で、応答の JSON にそのまま載せる。
+    """
+    if latency:
+        time.sleep(latency)
+    if failure_rate and random.random() < failure_rate:
+        raise RuntimeError("stub backend: injected failure")
+    text = (text or "").strip()
+    if not text:
+        return "質問 / Question を入力してください。", "{}"
+    answer = STUB_ANSWERS.get((text, lang), "（答え候補なし / no candidate answer）")
+    raw = {"query": text, "lang": lang, "results": [{"value": answer}], "backend": "stub"}
+    if context:
+        names = ("domain", "region", "era", "year", "min_trust", "include_evidence")
+        raw["context"] = dict(zip(names, context))
+    return answer, json.dumps(raw, ensure_ascii=False, indent=2)
+
+
+class StubClient:
+    """
+    gradio_client.Client の submit() と同じ使い方ができるプロセス内スタブ。
+    submit() は result(timeout=...) / cancel() を持つ Future を返す。
+    本物と同じく api_name が無い・知らない名前なら ValueError（呼び先を決められない）。
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, max_workers: int = 4):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stub-backend")
+
+    def submit(self, *args, api_name=None):
+        if api_name == ERAS_API:
+            return self._executor.submit(list, STUB_ERAS)
+        if api_name != QUERY_API:
+            raise ValueError(f"stub backend: unknown api_name {api_name!r} (expected {QUERY_API!r} or {ERAS_API!r})")
+        text, lang, *context = args
+        return self._executor.submit(query_fn, text, lang, self.latency, self.failure_rate, tuple(context))
+
+    def predict(self, *args, api_name=None):
+        return self.submit(*args, api_name=api_name).result()
+
+
+def stub_from_env() -> StubClient:
+    return StubClient(
+        latency=float(os.environ.get("STUB_LATENCY", "0")),
+        failure_rate=float(os.environ.get("STUB_FAILURE_RATE", "0")),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mini Meaning OS stub backend")
+    parser.add_argument("--port", type=int, default=7861)
+    args = parser.parse_args()
+
+    import gradio as gr
+
+    stub = stub_from_env()
+
+    def stub_query_fn(text: str, lang: str, *context):
+        return query_fn(text, lang, stub.latency, stub.failure_rate, context)
+
+    with gr.Blocks() as demo:
+        inp = gr.Textbox(label="Question")
+        lang_select = gr.Radio(["ja", "en"], value="ja", label="Language")
+        context_inputs = [
+            gr.Textbox(label="Domain", value="cooking"),
+            gr.Textbox(label="Region"),
+            gr.Textbox(label="Era"),
+            gr.Number(label="Year", value=None, precision=0),
+            gr.Number(label="Min trust", value=None),
+            gr.Checkbox(label="Include evidence", value=True),
+        ]
+        out_answer = gr.Textbox(label="Answer")
+        out_json = gr.Code(label="Raw JSON", language="json")
+        gr.Button("Run").click(
+            fn=stub_query_fn,
+            inputs=[inp, lang_select, *context_inputs],
+            outputs=[out_answer, out_json],
+            api_name="query",
+        )
+        gr.Button(visible=False).click(fn=lambda: list(STUB_ERAS), outputs=gr.JSON(visible=False), api_name="eras")
+
+    demo.launch(server_port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+# conftest.py - Public UI Space のテスト共通の準備
+#
+# 使い方（Public-UI-Space/ 直下で）:
+#   python -m pytest -q tests
+
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
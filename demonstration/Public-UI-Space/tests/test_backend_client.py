@@ -0,0 +1,222 @@
+import threading
+import time
+
+import pytest
+
+from backend_client import (
+    BackendClient,
+    BackendError,
+    BackendTimeout,
+    BackendUnavailable,
+    CircuitBreaker,
+    PoolExhausted,
+    QUERY_API,
+    ResponseCache,
+    context_args,
+    parse_backend_response,
+)
+from stub_backend import StubClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyClient:
+    """最初の failures 回は例外を投げ、その後は成功するジョブを返す接続。"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+
+    def submit(self, *args, api_name=None):
+        self.calls += 1
+        fail = self.calls <= self.failures
+        return _Job(RuntimeError("boom") if fail else ("ok", "{}"))
+
+
+class _Job:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def result(self, timeout=None):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+    def cancel(self):
+        pass
+
+
+def make_client(conn, **kw):
+    kw.setdefault("backoff_base", 0.0)
+    kw.setdefault("cache", ResponseCache(maxsize=0))
+    return BackendClient(lambda: conn, **kw)
+
+
+def test_breaker_opens_and_half_opens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    clock.now = 10.0
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()  # 試行は同時に 1 件だけ
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_breaker_release_frees_the_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 1.0
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+
+def test_retries_until_success():
+    conn = FlakyClient(failures=2)
+    client = make_client(conn, max_attempts=3)
+    assert client.ask("q", "ja") == ("ok", "{}")
+    assert conn.calls == 3
+    assert client.breaker.state == "closed"
+
+
+def test_failures_open_the_breaker():
+    conn = FlakyClient(failures=100)
+    client = make_client(conn, max_attempts=2, breaker=CircuitBreaker(failure_threshold=2))
+    with pytest.raises(BackendError):
+        client.ask("q", "ja")
+    with pytest.raises(BackendUnavailable):
+        client.ask("q", "ja")
+    assert conn.calls == 2
+
+
+def test_expired_deadline_does_not_hold_the_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 1.0
+    client = make_client(FlakyClient(), breaker=breaker)
+    with pytest.raises(BackendTimeout):
+        client.ask("q", "ja", timeout=0.0)
+    # 締め切り切れで抜けても、half-open の試行枠は残っている
+    assert client.ask("q", "ja") == ("ok", "{}")
+    assert breaker.state == "closed"
+
+
+def test_pool_exhaustion_is_not_a_backend_failure():
+    started = threading.Event()
+    release = threading.Event()
+
+    class BlockingClient:
+        def submit(self, *args, api_name=None):
+            return self
+
+        def result(self, timeout=None):
+            started.set()
+            release.wait(5)
+            return ("slow", "{}")
+
+        def cancel(self):
+            pass
+
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = BackendClient(
+        BlockingClient, pool_size=1, max_attempts=2, backoff_base=0.0,
+        breaker=breaker, cache=ResponseCache(maxsize=0),
+    )
+    holder = threading.Thread(target=client.ask, args=("slow", "ja"))
+    holder.start()
+    try:
+        assert started.wait(5)
+        with pytest.raises(PoolExhausted):
+            client.ask("q", "ja", timeout=0.05)
+        assert breaker.state == "closed"
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_cache_and_context_args():
+    conn = FlakyClient()
+    client = BackendClient(lambda: conn, cache=ResponseCache(maxsize=8))
+    client.ask("q", "ja", {"domain": "law"})
+    client.ask("q", "ja", {"domain": "law"})
+    client.ask("q", "ja", {"domain": "cooking"})
+    assert conn.calls == 2
+    assert context_args(None) == ()
+    assert context_args({"era": "Edo"}) == ("cooking", "", "Edo", None, None, True)
+
+
+def test_response_shapes():
+    assert parse_backend_response(("a", {"x": 1})) == ("a", '{\n  "x": 1\n}')
+    assert parse_backend_response({"answer_text": "b", "raw": {}}) == ("b", "{}")
+    with pytest.raises(BackendError):
+        parse_backend_response(42)
+
+
+def test_stub_backend_round_trip():
+    client = BackendClient(lambda: StubClient(latency=0.0))
+    answer, raw = client.ask("包丁の用途は何？", "ja", {"region": "JP"})
+    assert answer == "切る"
+    assert '"region": "JP"' in raw
+
+
+def test_stub_requires_a_known_api_name():
+    conn = StubClient()
+    for api_name in (None, "/predict"):
+        with pytest.raises(ValueError):
+            conn.submit("包丁の用途は何？", "ja", api_name=api_name)
+    assert conn.submit("包丁の用途は何？", "ja", api_name=QUERY_API).result()[0] == "切る"
+
+
+def test_ask_names_the_query_api():
+    conn = StubClient()
+    names = []
+    submit = conn.submit
+
+    def recording_submit(*args, api_name=None):
+        names.append(api_name)
+        return submit(*args, api_name=api_name)
+
+    conn.submit = recording_submit
+    BackendClient(lambda: conn).ask("包丁の用途は何？", "ja", {"region": "JP"})
+    assert names == [QUERY_API]
+
+
+def test_slow_backend_times_out():
+    client = BackendClient(lambda: StubClient(latency=0.5), max_attempts=1, cache=ResponseCache(maxsize=0))
+    start = time.monotonic()
+    with pytest.raises(BackendTimeout):
+        client.ask("包丁の用途は何？", "ja", timeout=0.1)
+    assert time.monotonic() - start < 0.4
+
+
+def test_era_choices_come_from_the_backend():
+    from stub_backend import STUB_ERAS
+
+    conn = StubClient()
+    client = BackendClient(lambda: conn)
+    assert client.era_choices() == STUB_ERAS
+    assert client.era_choices() == STUB_ERAS
+
+
+def test_era_choices_errors():
+    client = BackendClient(lambda: FlakyClient(failures=1))
+    with pytest.raises(BackendError):
+        client.era_choices()